@@ -13,724 +13,322 @@ Comprehensive Stock and Crypto Analyzer - Technical + Fundamental Analysis
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import contextvars
+import re
 import threading
-import time
-import random
-from functools import lru_cache
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any
 from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass, field
-from datetime import datetime
 
 # Core data libraries
 import pandas as pd
 import numpy as np
 
-# Try to import heavy libraries with fallback
-try:
-    import yfinance as yf
-    YFINANCE_AVAILABLE = True
-except ImportError:
-    print("Warning: yfinance not available. Please install with: pip install yfinance")
-    YFINANCE_AVAILABLE = False
-
-try:
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    from matplotlib.lines import Line2D
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
+# Data loading, caching, fundamentals and indicators (no GUI dependencies)
+from analysis_core import (
+    LazyModule, module_available, preload_modules, YFINANCE_AVAILABLE, CORE_LAZY_MODULES,
+    PRIORITY_INTERACTIVE, SR_WINDOW, BAR_SIZES, MA_PERIODS, MA_KINDS, CHART_PX_PER_CANDLE,
+    MIN_PROFIT_MARGIN, MIN_OPER_MARGIN, MIN_QTR_REV_GROWTH, MIN_POSITIVE_QTRS,
+    MIN_REV_TO_DEBT, MIN_OCF_TO_DEBT, MAX_DECLINE_FROM_HIGH,
+    run_with_priority, get_chart_indicators, analyze_symbol,
+    downsample_chart, get_base_price, ma_column,
+    StockDataError, ValidationError, Trace, metrics, _pipeline_executor,
+)
+from provider_replay import install_from_env
+
+# Plotting libraries are imported on first use so the window can appear first
+MATPLOTLIB_AVAILABLE = module_available("matplotlib", "PIL")  # Pillow ships with matplotlib
+if not MATPLOTLIB_AVAILABLE:
     print("Warning: matplotlib not available. Please install with: pip install matplotlib")
-    MATPLOTLIB_AVAILABLE = False
-
-try:
-    import mplfinance as mpf
-    MPLFINANCE_AVAILABLE = True
-except ImportError:
+mpl_figure = LazyModule("matplotlib.figure")
+mpl_agg = LazyModule("matplotlib.backends.backend_agg")
+mpl_lines = LazyModule("matplotlib.lines")
+mpl_collections = LazyModule("matplotlib.collections")
+Image = LazyModule("PIL.Image")
+ImageTk = LazyModule("PIL.ImageTk")
+
+MPLFINANCE_AVAILABLE = module_available("mplfinance")
+if not MPLFINANCE_AVAILABLE:
     print("Warning: mplfinance not available. Please install with: pip install mplfinance")
-    MPLFINANCE_AVAILABLE = False
+mpf = LazyModule("mplfinance")
 
-try:
-    import requests
-    from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-    from requests_cache import CachedSession
-    REQUESTS_AVAILABLE = True
-except ImportError:
-    print("Warning: requests/tenacity/requests_cache not available. Social sentiment analysis will be disabled.")
-    REQUESTS_AVAILABLE = False
+# Warm-up order: what the first chart and analysis need first
+_LAZY_MODULES = [mpl_figure, mpl_agg, mpl_lines, mpl_collections, Image, ImageTk, mpf] + CORE_LAZY_MODULES
 
-# -----------------------------------------------------------------------------
-# FUNDAMENTAL ANALYSIS CONFIGURATION
-# -----------------------------------------------------------------------------
-
-# Rate Limiting Configuration
-YAHOO_MAX_RPS = 1.2          # Be conservative; yfinance now uses curl_cffi internally
-STOCKTWITS_MAX_RPS = 1.0     # StockTwits stricter
-HTTP_CACHE_TTL = 60          # seconds for HTTP GET cache
-REQUEST_TIMEOUT = 12         # seconds
-
-# Fundamental Scoring Thresholds
-MIN_PROFIT_MARGIN = 0.10        # 10%
-MIN_OPER_MARGIN = 0.10          # 10%
-MIN_QTR_REV_GROWTH = 0.05       # 5% QoQ revenue growth
-MIN_POSITIVE_QTRS = 60.0        # 60% of last 5y quarters positive
-MIN_REV_TO_DEBT = 2.0           # Revenue / Total Debt
-MIN_OCF_TO_DEBT = 0.50          # OCF must be >= 50% of Total Debt
-MAX_DECLINE_FROM_HIGH = 0.30    # within 30% of 52w high
-REQUIRED_PASS_COUNT = 4         # need 4/5 pillars to PASS
+def start_background_preload() -> threading.Thread:
+    """Warm the heavy imports on a daemon thread so first use does not stall the UI."""
+    thread = threading.Thread(target=preload_modules, args=(_LAZY_MODULES,), name="import-warmup", daemon=True)
+    thread.start()
+    return thread
 
 # -----------------------------------------------------------------------------
-# DATA CACHING AND PERFORMANCE
+# CHART VIEW
 # -----------------------------------------------------------------------------
 
-class DataCache:
-    """Simple cache for stock data to improve performance."""
-    
-    def __init__(self, max_size: int = 32, ttl_seconds: int = 300):
-        self.cache: Dict[str, Tuple[pd.DataFrame, float]] = {}
-        self.max_size = max_size
-        self.ttl_seconds = ttl_seconds
-    
-    def _is_expired(self, timestamp: float) -> bool:
-        """Check if cached data is expired."""
-        return time.time() - timestamp > self.ttl_seconds
-    
-    def get(self, symbol: str, period: str) -> Optional[pd.DataFrame]:
-        """Get cached data if available and not expired."""
-        key = f"{symbol.upper()}_{period}"
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if not self._is_expired(timestamp):
-                return data.copy()
-            else:
-                del self.cache[key]
-        return None
-    
-    def set(self, symbol: str, period: str, data: pd.DataFrame) -> None:
-        """Cache the data."""
-        key = f"{symbol.upper()}_{period}"
-        
-        # Simple LRU: remove oldest if cache is full
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(self.cache.keys(), 
-                           key=lambda k: self.cache[k][1])
-            del self.cache[oldest_key]
-        
-        self.cache[key] = (data.copy(), time.time())
-
-# Global cache instance
-_data_cache = DataCache()
-
-# -----------------------------------------------------------------------------
-# RATE LIMITING AND HTTP CLIENT
-# -----------------------------------------------------------------------------
-
-class TokenBucket:
+class ChartView:
     """
-    Simple token-bucket limiter for per-host throttling.
-    capacity tokens refill at 'rate' (tokens per second).
+    Persistent candlestick chart rendered off the Tk thread.
+
+    One Agg figure is drawn by a single render worker into an RGBA buffer; the
+    Tk thread only swaps the finished image into a label. Each submit() bumps
+    a generation counter, so renders that are still queued or in progress when
+    a newer one arrives are dropped instead of shown. Nothing is rebuilt per
+    update, and long series are downsampled to CHART_PX_PER_CANDLE pixels
+    per candle before drawing.
     """
-    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
-        self.rate = float(rate)
-        self.capacity = float(capacity) if capacity is not None else float(rate)
-        self.tokens = self.capacity
-        self.timestamp = time.monotonic()
-        self._lock = threading.Lock()
 
-    def acquire(self) -> None:
-        with self._lock:
-            now = time.monotonic()
-            # Refill tokens based on elapsed time
-            elapsed = now - self.timestamp
-            self.timestamp = now
-            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
-            # If no tokens, wait
-            if self.tokens < 1.0:
-                need = 1.0 - self.tokens
-                sleep_for = need / self.rate
-                time.sleep(max(0.0, sleep_for))
-                # after sleeping, consume immediately
-                self.timestamp = time.monotonic()
-                self.tokens = max(0.0, self.tokens + sleep_for * self.rate)
-            # Consume 1 token
-            self.tokens -= 1.0
-
-class HttpClient:
-    def __init__(self) -> None:
-        if not REQUESTS_AVAILABLE:
-            raise ImportError("requests/tenacity/requests_cache required for HTTP client")
-        
-        # Cached session for REST GETs (StockTwits only)
-        self.session = CachedSession(
-            cache_name="http_cache",
-            backend="memory",
-            expire_after=HTTP_CACHE_TTL,
-            allowable_methods=("GET",),
-        )
-        self.session.headers.update({
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            )
-        })
-        self._limiter = TokenBucket(STOCKTWITS_MAX_RPS)
-
-    @retry(
-        retry=retry_if_exception_type((requests.HTTPError, requests.ConnectionError, requests.Timeout)),
-        wait=wait_exponential(multiplier=0.8, min=1, max=20),
-        stop=stop_after_attempt(5),
-        reraise=True,
-    )
-    def get(self, url: str, **kwargs) -> requests.Response:
-        self._limiter.acquire()
-        resp = self.session.get(url, timeout=REQUEST_TIMEOUT, **kwargs)
-        if resp.status_code == 429:
-            ra = resp.headers.get("Retry-After")
-            if ra:
-                try:
-                    time.sleep(min(float(ra), 30.0))
-                except ValueError:
-                    time.sleep(3 + random.random())
-            else:
-                time.sleep(2 + random.random())
-            resp.raise_for_status()
-        elif 500 <= resp.status_code < 600:
-            resp.raise_for_status()
-        return resp
-
-# Global HTTP client instance (only created if REQUESTS_AVAILABLE)
-http_client = None
-if REQUESTS_AVAILABLE:
-    try:
-        http_client = HttpClient()
-    except ImportError:
-        http_client = None
-
-# -----------------------------------------------------------------------------
-# YAHOO FINANCE CLIENT
-# -----------------------------------------------------------------------------
-
-@dataclass
-class YahooClient:
-    ticker_symbol: str
-    _ticker: yf.Ticker = field(init=False)
-    _cache: Dict[str, Any] = field(default_factory=dict, init=False)
-    _limiter: TokenBucket = field(default_factory=lambda: TokenBucket(YAHOO_MAX_RPS), init=False)
-
-    def __post_init__(self) -> None:
-        # IMPORTANT: do NOT pass a requests/session into yf.Ticker now
-        self._ticker = yf.Ticker(self.ticker_symbol)
-
-    def _throttled(self, fn_name: str, call) -> Any:
-        if fn_name in self._cache:
-            return self._cache[fn_name]
-        # throttle before any yfinance call (since we can't inject a session)
-        self._limiter.acquire()
-        val = call()
-        self._cache[fn_name] = val
-        return val
-
-    def _retryable(self, func, *args, **kwargs):
-        @retry(
-            retry=retry_if_exception_type(Exception),
-            wait=wait_exponential(multiplier=0.8, min=1, max=20),
-            stop=stop_after_attempt(6),
-            reraise=True,
-        )
-        def wrapped():
-            try:
-                return func(*args, **kwargs)
-            except Exception as e:
-                # yfinance surfaces 429s and rate messages as generic Exceptions
-                msg = str(e).lower()
-                if "too many requests" in msg or "rate limit" in msg or "429" in msg:
-                    time.sleep(1.5 + random.random())
-                raise
-        return wrapped()
-
-    # Prefer fast_info: lighter-weight
-    def fast_info(self) -> Dict[str, Any]:
-        return self._throttled(
-            "fast_info",
-            lambda: self._retryable(lambda: dict(self._ticker.fast_info or {}))
-        )
-
-    def history(self, **kwargs) -> pd.DataFrame:
-        key = f"history:{kwargs}"
-        return self._throttled(key, lambda: self._retryable(self._ticker.history, **kwargs))
-
-    def quarterly_financials(self) -> pd.DataFrame:
-        return self._throttled(
-            "quarterly_financials",
-            lambda: self._retryable(lambda: self._ticker.quarterly_financials)
-        )
-
-    def options(self) -> List[str]:
-        return self._throttled("options", lambda: self._retryable(lambda: list(self._ticker.options or [])))
-
-    def option_chain(self, expiration: str):
-        key = f"option_chain:{expiration}"
-        return self._throttled(key, lambda: self._retryable(self._ticker.option_chain, expiration))
-
-# -----------------------------------------------------------------------------
-# FUNDAMENTAL ANALYSIS FUNCTIONS
-# -----------------------------------------------------------------------------
-
-def fundamental_score(
-    data: Dict[str, Any],
-    positive_growth_pct: Optional[float],
-    earnings_date: Optional[str],
-) -> Dict[str, Any]:
-    """
-    Evaluate fundamentals across 5 pillars and return a detailed result dict:
-      {
-        'status': 'PASS'|'FAIL',
-        'score': int,
-        'required': int,
-        'pillars': {
-            'profitability': {'pass': bool, 'reason': str},
-            'growth':        {'pass': bool, 'reason': str},
-            'balance_sheet': {'pass': bool, 'reason': str},
-            'market_pos':    {'pass': bool, 'reason': str},
-            'forward':       {'pass': bool, 'reason': str},
-        }
-      }
-    """
-    pillars: Dict[str, Dict[str, Any]] = {}
-
-    # ----- Profitability -----
-    pm = data.get("profit_margin")
-    om = data.get("operating_margin")
-    profit_ok = (pm or 0) >= MIN_PROFIT_MARGIN and (om or 0) >= MIN_OPER_MARGIN
-    pillars["profitability"] = {
-        "pass": profit_ok,
-        "reason": (
-            f"Profit margin={pm:.2%} (≥{MIN_PROFIT_MARGIN:.0%}) and "
-            f"Operating margin={om:.2%} (≥{MIN_OPER_MARGIN:.0%})"
-            if pm is not None and om is not None else
-            "Missing profitability data"
-        )
-    }
-
-    # ----- Growth -----
-    qtr_growth = data.get("quarterly_revenue_change")
-    pos_qtrs = positive_growth_pct if positive_growth_pct is not None else 0.0
-    growth_ok = ((qtr_growth or 0) >= MIN_QTR_REV_GROWTH) or (pos_qtrs >= MIN_POSITIVE_QTRS)
-    pillars["growth"] = {
-        "pass": growth_ok,
-        "reason": (
-            f"QoQ revenue change={ (qtr_growth or 0):.2%} (≥{MIN_QTR_REV_GROWTH:.0%}) "
-            f"or Positive quarters={pos_qtrs:.1f}% (≥{MIN_POSITIVE_QTRS:.0f}%)"
-        )
-    }
+    # Volume bars in the "charles" style colours, coloured by the change from the previous close
+    VOLUME_COLORS = ("#007a00", "#d50d18")
+    VOLUME_WIDTH = 0.8
 
-    # ----- Balance Sheet -----
-    rev = data.get("revenue")
-    debt = data.get("total_debt")
-    ocf = data.get("operating_cash_flow")
-    rev_debt = (rev / debt) if (rev is not None and debt not in (None, 0)) else None
-    ocf_debt = (ocf / debt) if (ocf is not None and debt not in (None, 0)) else None
-    bs_ok = (
-        (rev_debt is not None and rev_debt >= MIN_REV_TO_DEBT) and
-        (ocf_debt is not None and ocf_debt >= MIN_OCF_TO_DEBT)
-    )
-    pillars["balance_sheet"] = {
-        "pass": bs_ok,
-        "reason": (
-            f"Revenue/Debt={rev_debt:.2f} (≥{MIN_REV_TO_DEBT:.2f}) and "
-            f"OCF/Debt={ocf_debt:.2f} (≥{MIN_OCF_TO_DEBT:.2f})"
-            if rev_debt is not None and ocf_debt is not None else
-            "Missing leverage/coverage data"
-        )
-    }
-
-    # ----- Market Position -----
-    price = data.get("current_price")
-    high_52 = data.get("high_52")
-    decline = ((high_52 - price) / high_52) if (price not in (None, 0) and high_52 not in (None, 0)) else None
-    market_ok = (decline is not None) and (decline <= MAX_DECLINE_FROM_HIGH)
-    pillars["market_pos"] = {
-        "pass": market_ok,
-        "reason": (
-            f"Decline from 52w high={decline:.1%} (≤{MAX_DECLINE_FROM_HIGH:.0%})"
-            if decline is not None else
-            "Missing price/high_52 to compute decline"
-        )
-    }
-
-    # ----- Forward Outlook -----
-    forward_ok = bool(earnings_date)
-    pillars["forward"] = {
-        "pass": forward_ok,
-        "reason": "Upcoming earnings date available" if forward_ok else "No upcoming earnings date"
-    }
-
-    score = sum(1 for p in pillars.values() if p["pass"])
-    status = "PASS" if score >= REQUIRED_PASS_COUNT else "FAIL"
-
-    return {
-        "status": status,
-        "score": score,
-        "required": REQUIRED_PASS_COUNT,
-        "pillars": pillars,
-    }
-
-def fetch_company_data(ticker_symbol: str) -> Dict[str, Any]:
-    """
-    Uses fast_info + 1y history for robust 52w stats; guarded fundamentals.
-    """
-    yh = YahooClient(ticker_symbol)
-    data: Dict[str, Any] = {}
-
-    # ---- Prices via fast_info ----
-    finfo = yh.fast_info()  # keys often: last_price, year_high, year_low
-    current_price = finfo.get("last_price")
-    if current_price is None:
-        hist_1d = yh.history(period="1d")
-        current_price = hist_1d["Close"].iloc[-1] if not hist_1d.empty else None
-    data["current_price"] = current_price
-
-    # ---- Robust 52w hi/lo + change from 1y history (works even when fast_info misses) ----
-    try:
-        h1y = yh.history(period="1y", interval="1d")
-        closes = h1y["Close"].dropna() if not h1y.empty else pd.Series(dtype=float)
-        if len(closes) >= 2:
-            data["high_52"] = float(closes.max())
-            data["low_52"]  = float(closes.min())
-            first = float(closes.iloc[0])
-            last  = float(closes.iloc[-1])
-            data["week_52_change"] = (last / first - 1.0) if first > 0 else None
-        else:
-            # fall back to fast_info when history is too short
-            data["high_52"] = finfo.get("year_high")
-            data["low_52"]  = finfo.get("year_low")
-            data["week_52_change"] = None
-    except Exception:
-        data["high_52"] = finfo.get("year_high")
-        data["low_52"]  = finfo.get("year_low")
-        data["week_52_change"] = None
-
-    # ---- Quarterly revenue change ----
-    profit_margin = None
-    operating_margin = None
-    revenue = None
-    total_debt = None
-    operating_cash_flow = None
-
-    try:
-        q_fin = yh.quarterly_financials()
-        if isinstance(q_fin, pd.DataFrame) and "Total Revenue" in q_fin.index:
-            revenues = pd.to_numeric(q_fin.loc["Total Revenue"], errors="coerce").dropna()
-            if len(revenues) >= 2:
-                data["quarterly_revenue_change"] = (revenues.iloc[0] - revenues.iloc[1]) / revenues.iloc[1]
-            else:
-                data["quarterly_revenue_change"] = None
-        else:
-            data["quarterly_revenue_change"] = None
-    except Exception:
-        data["quarterly_revenue_change"] = None
+    def __init__(self, master: Optional[Any] = None, figsize: Tuple[float, float] = (12, 8), dpi: int = 100):
+        """
+        Create the figure and, when a Tk master is given, the label showing it.
 
-    # ---- Heavy fundamentals: try once; swallow on fail ----
-    try:
-        finfo_heavy = yh._retryable(lambda: dict(yh._ticker.get_info() or {}))
-        profit_margin       = finfo_heavy.get("profitMargins")
-        operating_margin    = finfo_heavy.get("operatingMargins")
-        revenue             = finfo_heavy.get("totalRevenue")
-        total_debt          = finfo_heavy.get("totalDebt")
-        operating_cash_flow = finfo_heavy.get("operatingCashflow")
-    except Exception:
-        pass
+        Args:
+            master: Tk container for the chart image; None renders off-screen only
+            figsize: Initial figure size in inches (follows the widget once mapped)
+            dpi: Figure resolution
+        """
+        # Not registered with pyplot, so the worker thread owns it outright
+        self.figure = mpl_figure.Figure(figsize=figsize, dpi=dpi)
+        self.agg = mpl_agg.FigureCanvasAgg(self.figure)
+        # Price panel five times the height of the volume panel
+        self.price_ax = self.figure.add_axes([0.06, 0.30, 0.86, 0.62])
+        self.volume_ax = self.figure.add_axes([0.06, 0.08, 0.86, 0.12], sharex=self.price_ax)
+
+        self.master = master
+        self.label = None
+        self._photo = None
+        self._generation = 0
+        self._last_request = None
+        self._resize_job = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-render")
+        if master is not None:
+            self.label = tk.Label(master, background="white")
+            self.label.pack(fill="both", expand=True)
+            self.label.bind("<Configure>", self._on_configure)
+
+    def target_size(self) -> Tuple[int, int]:
+        """Pixel size to render at: the label's size, or the figure's when unmapped."""
+        if self.label is not None:
+            width, height = self.label.winfo_width(), self.label.winfo_height()
+            if width > 1 and height > 1:
+                return width, height
+        return int(self.figure.get_figwidth() * self.figure.dpi), int(self.figure.get_figheight() * self.figure.dpi)
+
+    def max_points(self, width: Optional[int] = None) -> int:
+        """Most candles worth drawing: the price axes' width in pixels over CHART_PX_PER_CANDLE."""
+        if width is None:
+            width = self.target_size()[0]
+        return max(1, int(width * self.price_ax.get_position().width / CHART_PX_PER_CANDLE))
+
+    def _draw_volume(self, df: pd.DataFrame) -> None:
+        """
+        Draw the volume panel as a single PolyCollection.
 
-    data["profit_margin"]       = profit_margin
-    data["operating_margin"]    = operating_margin
-    data["revenue"]             = revenue
-    data["total_debt"]          = total_debt
-    data["operating_cash_flow"] = operating_cash_flow
+        mplfinance draws volume with Axes.bar, one Rectangle patch per bar,
+        which cost more than the candles themselves.
+        """
+        volume = np.nan_to_num(df["Volume"].to_numpy(dtype=float))
+        close = df["Close"].to_numpy(dtype=float)
+        x = np.arange(len(df), dtype=float)   # mplfinance's x positions (non-trading days skipped)
+        left, right = x - self.VOLUME_WIDTH / 2, x + self.VOLUME_WIDTH / 2
+        base = np.zeros_like(volume)
+        verts = np.stack([np.column_stack(corner) for corner in
+                          ((left, base), (left, volume), (right, volume), (right, base))], axis=1)
+        rising = np.r_[True, close[1:] >= close[:-1]]
+        colors = np.where(rising, *self.VOLUME_COLORS)
+        self.volume_ax.add_collection(mpl_collections.PolyCollection(verts, facecolors=colors, edgecolors="none"))
+        self.volume_ax.set_ylim(0, max(float(volume.max()), 1.0) * 1.05)
+        # Date labels go under the volume panel only, slanted as mplfinance draws them
+        self.volume_ax.tick_params(axis="x", labelrotation=45)
+        self.price_ax.tick_params(labelbottom=False)
+
+    def render(self, df: pd.DataFrame, overlays: List[Tuple[Any, Dict[str, Any]]], title: str,
+               legend_handles: List[Any], legend_labels: List[str],
+               size: Optional[Tuple[int, int]] = None,
+               is_current: Optional[Callable[[], bool]] = None) -> Optional[Any]:
+        """
+        Draw the chart into the Agg buffer.
 
-    return data
+        Safe to call from the render worker; touches no Tk state.
 
-def get_social_sentiment(ticker_symbol: str):
-    """
-    Fetches recent messages from StockTwits for the given ticker symbol
-    and computes a simple sentiment ratio.
-    Returns (bullish_ratio, bullish_count, bearish_count)
-    """
-    if not REQUESTS_AVAILABLE or http_client is None:
-        return None, 0, 0
-        
-    url = f"https://api.stocktwits.com/api/2/streams/symbol/{ticker_symbol}.json"
-    try:
-        response = http_client.get(url)
-        if response.status_code != 200:
-            print(f"Error fetching social sentiment: Received status code {response.status_code}")
-            return None, 0, 0
+        Args:
+            df: OHLCV data to draw as candles
+            overlays: (series, make_addplot kwargs) pairs drawn on the price axes,
+                one value per row of df (moving averages included)
+            title: Title for the price axes
+            legend_handles: Legend artists
+            legend_labels: Legend labels
+            size: Pixel size to render at (defaults to target_size())
+            is_current: Returns False once this render has been superseded
 
-        if not response.text.strip():
-            print("Error fetching social sentiment: Response is empty.")
-            return None, 0, 0
+        Returns:
+            RGBA PIL image of the chart, or None if the render was superseded
+        """
+        width, height = size or self.target_size()
+        dpi = self.figure.dpi
+        if (round(self.figure.get_figwidth() * dpi), round(self.figure.get_figheight() * dpi)) != (width, height):
+            self.figure.set_size_inches(width / dpi, height / dpi)
 
-        data = response.json()
-        messages = data.get("messages", [])
-        bullish_count = 0
-        bearish_count = 0
-        for msg in messages:
-            sentiment = msg.get("entities", {}).get("sentiment", {})
-            if sentiment:
-                basic = sentiment.get("basic")
-                if basic == "Bullish":
-                    bullish_count += 1
-                elif basic == "Bearish":
-                    bearish_count += 1
-        total = bullish_count + bearish_count
-        if total > 0:
-            bullish_ratio = bullish_count / total
-            return bullish_ratio, bullish_count, bearish_count
-        else:
-            return None, 0, 0
-    except Exception as e:
-        print("Error fetching social sentiment:", e)
-        return None, 0, 0
+        df, overlays = downsample_chart(df, overlays, self.max_points(width))
 
-def compute_positive_quarterly_revenue_growth(ticker_symbol: str) -> Optional[float]:
-    """
-    Computes the percentage of quarters (in the past 5 years) with positive revenue growth.
-    Returns this percentage as a float, or None on failure.
-    """
-    yh = YahooClient(ticker_symbol)
-    try:
-        q_fin = yh.quarterly_financials()
-        if not (isinstance(q_fin, pd.DataFrame) and "Total Revenue" in q_fin.index):
-            print("Total Revenue not found in quarterly financials.")
-            return None
+        self.price_ax.clear()
+        self.volume_ax.clear()
 
-        # Convert revenue series to numeric to avoid dtype issues
-        revenue_series = q_fin.loc["Total Revenue"]
-        revenue_series = pd.to_numeric(revenue_series, errors='coerce')
-        revenue_series = revenue_series.sort_index()
+        addplots = [mpf.make_addplot(data, ax=self.price_ax, **kwargs) for data, kwargs in overlays]
+        with metrics.span("mpf_plot"):
+            mpf.plot(
+                df,
+                ax=self.price_ax,
+                type="candle",
+                style="charles",
+                addplot=addplots,
+                warn_too_much_data=len(df) + 1,
+            )
+            self._draw_volume(df)
 
-        pct_change = revenue_series.pct_change()
-        cutoff = pd.Timestamp.today() - pd.DateOffset(years=5)
-        try:
-            pct_change.index = pd.to_datetime(pct_change.index)
-        except Exception:
-            pass
+        self.price_ax.set_title(title, fontsize=14, fontweight='bold', pad=20)
+        if legend_handles:
+            self.price_ax.legend(legend_handles, legend_labels, loc="upper left", fontsize=9, framealpha=0.9)
 
-        pct_change = pct_change[pct_change.index >= cutoff]
-        total_quarters = pct_change.count()
-        if total_quarters == 0:
+        # Rasterizing is the expensive step; skip it if a newer chart is waiting
+        if is_current is not None and not is_current():
             return None
-        positive_quarters = (pct_change > 0).sum()
-        percent_positive = positive_quarters / total_quarters * 100
-        return float(percent_positive)
-    except Exception as e:
-        print("Error computing quarterly revenue growth:", e)
-        return None
-
-def get_upcoming_earnings_call(ticker_symbol: str) -> Optional[str]:
-    """
-    Fetch upcoming earnings date using yfinance (no external session).
-    Returns YYYY-MM-DD or None.
-    """
-    ticker = yf.Ticker(ticker_symbol)  # DO NOT pass a requests session here
-    try:
-        cal = ticker.calendar
-        earnings_date = None
-        if isinstance(cal, dict):
-            if "Earnings Date" in cal and cal["Earnings Date"]:
-                earnings_date = cal["Earnings Date"][0]
-        elif hasattr(cal, "empty") and not cal.empty:
-            if "Earnings Date" in cal.index:
-                earnings_date = cal.loc["Earnings Date"].values[0]
-
-        if not earnings_date:
-            ed = ticker.earnings_dates(limit=5)
-            if hasattr(ed, "empty") and not ed.empty:
-                ed['Earnings Date'] = pd.to_datetime(ed['Earnings Date'])
-                future_dates = ed[ed['Earnings Date'] >= pd.Timestamp.today()]
-                if not future_dates.empty:
-                    earnings_date = future_dates.iloc[0]['Earnings Date']
-
-        if earnings_date is not None:
-            if hasattr(earnings_date, 'strftime'):
-                return earnings_date.strftime("%Y-%m-%d")
-            return pd.to_datetime(earnings_date).strftime("%Y-%m-%d")
-        return None
-    except Exception as e:
-        print("Error fetching earnings call date:", e)
-        return None
-
-def evaluate_options(ticker_symbol: str, current_price: float, high_52: Optional[float]) -> Dict[str, Any]:
-    """
-    Checks the options chain for two expiration dates:
-      - The expiration nearest to the end of the current year.
-      - The first expiration in the new year.
-    For each expiration, filters call options to show only those with strike prices
-    at or up to $10 above the current stock price.
-    Returns a dictionary with options data.
-    """
-    try:
-        yh = YahooClient(ticker_symbol)
-        expirations = yh.options()
-        
-        if not expirations:
-            return {"error": "No options available for this ticker."}
-    except Exception as e:
-        return {"error": f"Error fetching options: {e}"}
-
-    # Convert expiration strings to datetime objects
-    exp_dates = []
-    for exp in expirations:
-        try:
-            dt = pd.to_datetime(exp)
-            exp_dates.append((exp, dt))
-        except Exception:
-            continue
-
-    # Separate expirations into those in the current year and next year
-    current_year = datetime.today().year
-    current_year_exps = [exp for exp, dt in exp_dates if dt.year == current_year]
-    next_year_exps = [exp for exp, dt in exp_dates if dt.year == current_year + 1]
-
-    # Choose the expiration nearest the end of the current year (if available)
-    exp_current = max(current_year_exps) if current_year_exps else None
-    # Choose the first expiration in the new year (if available)
-    exp_next = max(next_year_exps) if next_year_exps else None
-
-    result = {
-        "current_price": current_price,
-        "strike_range": f"{current_price:.2f} - {current_price + 10:.2f}",
-        "expirations": {}
-    }
+        with metrics.span("canvas_draw"):
+            self.agg.draw()
+        return Image.frombuffer("RGBA", self.agg.get_width_height(), self.agg.buffer_rgba(), "raw", "RGBA", 0, 1).copy()
 
-    def process_expiration(expiration: str):
-        try:
-            chain = yh.option_chain(expiration)
-            calls = chain.calls
-            
-            filtered = calls[(calls['strike'] >= current_price) & (calls['strike'] <= current_price + 10)]
-            
-            if not filtered.empty:
-                options_data = filtered[['contractSymbol', 'strike', 'lastPrice', 'bid', 'ask', 'impliedVolatility']].to_dict('records')
-                result["expirations"][expiration] = {
-                    "options": options_data,
-                    "count": len(filtered)
-                }
-            else:
-                result["expirations"][expiration] = {
-                    "options": [],
-                    "count": 0
-                }
-        except Exception as e:
-            result["expirations"][expiration] = {
-                "error": str(e),
-                "options": [],
-                "count": 0
-            }
+    def submit(self, df: pd.DataFrame, overlays: List[Tuple[Any, Dict[str, Any]]], title: str,
+               legend_handles: List[Any], legend_labels: List[str],
+               on_error: Optional[Callable[[str], None]] = None) -> None:
+        """
+        Render on the worker and show the result; call from the Tk thread.
 
-    if exp_current:
-        result["expirations"]["current_year"] = {"expiration": exp_current}
-        process_expiration(exp_current)
-    else:
-        result["expirations"]["current_year"] = {"error": "No expiration dates available in the current year."}
+        Any render submitted earlier and not yet shown is superseded.
 
-    if exp_next:
-        result["expirations"]["next_year"] = {"expiration": exp_next}
-        process_expiration(exp_next)
-    else:
-        result["expirations"]["next_year"] = {"error": "No expiration dates available in the new year."}
+        Args:
+            df, overlays, title, legend_handles, legend_labels: As for render()
+            on_error: Called on the Tk thread with a message if rendering fails
+        """
+        self._generation += 1
+        generation = self._generation
+        self._last_request = (df, overlays, title, legend_handles, legend_labels, on_error)
+        size = self.target_size()
 
-    return result
+        def is_current() -> bool:
+            return generation == self._generation
 
-# -----------------------------------------------------------------------------
-# TECHNICAL INDICATORS
-# -----------------------------------------------------------------------------
+        def job() -> None:
+            if not is_current():
+                return
+            try:
+                image = self.render(df, overlays, title, legend_handles, legend_labels, size, is_current)
+            except Exception as e:
+                if on_error is not None and self.master is not None and is_current():
+                    self.master.after(0, on_error, f"Chart rendering error: {str(e)}")
+                return
+            if image is not None and self.master is not None and is_current():
+                self.master.after(0, self._show, generation, image)
+
+        # Carry the caller's trace (if any) onto the render worker
+        self._executor.submit(contextvars.copy_context().run, job)
+
+    def _show(self, generation: int, image: Any) -> None:
+        """Swap a finished render into the label (Tk thread)."""
+        if generation != self._generation or self.label is None:
+            return
+        # Keep a reference: Tk drops images that Python garbage-collects
+        self._photo = ImageTk.PhotoImage(image)
+        self.label.configure(image=self._photo)
 
-def calculate_indicators(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Compute Support/Resistance (20d) and RSI.
-    
-    Args:
-        df: DataFrame with OHLCV data
-        
-    Returns:
-        DataFrame with additional indicator columns
+    def _on_configure(self, event: Any) -> None:
+        """Re-render the last chart at the new size once resizing settles."""
+        if self._last_request is None:
+            return
+        if self._resize_job is not None:
+            self.label.after_cancel(self._resize_job)
+        self._resize_job = self.label.after(150, self._rerender)
+
+    def _rerender(self) -> None:
+        """Submit the last chart again if the label size changed."""
+        self._resize_job = None
+        if self._last_request is not None and self.target_size() != self.agg.get_width_height():
+            self.submit(*self._last_request)
+
+    def close(self) -> None:
+        """Drop pending renders and stop the render worker."""
+        self._generation += 1
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+class DebugPanel:
     """
-    if df.empty:
-        return df
-        
-    df = df.copy()
-    
-    # Support/Resistance calculation
-    df["Support"] = df["Low"].rolling(window=20, min_periods=1).min()
-    df["Resistance"] = df["High"].rolling(window=20, min_periods=1).max()
+    Window listing the last analyses and chart updates with their time split.
 
-    # RSI Calculation with proper error handling
-    try:
-        delta = df["Close"].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14, min_periods=1).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=1).mean()
-        
-        # Avoid division by zero
-        rs = gain / (loss + 1e-10)
-        df["RSI"] = 100 - (100 / (1 + rs))
-    except Exception:
-        # Fallback to NaN if calculation fails
-        df["RSI"] = np.nan
-    
-    return df
-
-def get_base_price(df: pd.DataFrame) -> float:
+    Opened with F12. Columns add up span time per trace (parallel stages count
+    once per thread): limiter wait, network (Yahoo/StockTwits calls minus the
+    limiter wait inside them), indicator compute and chart rendering, plus
+    cache hits, retries and 429s. A chart's render finishes after its trace
+    closes, so Total excludes it. Refreshes itself while open.
     """
-    Calculate base price using support levels and RSI oversold conditions.
-    
-    Args:
-        df: DataFrame with indicator data
-        
-    Returns:
-        Calculated base price or NaN if calculation fails
-    """
-    if df.empty or len(df) < 20:
-        return np.nan
-
-    try:
-        recent = df.tail(20)
-        
-        # Get support levels
-        avg_support = recent["Support"].mean() if "Support" in recent else np.nan
-        min_low = recent["Low"].min()
-        
-        # RSI-based entry point
-        rsi_buy = np.nan
-        if "RSI" in recent:
-            oversold = recent[recent["RSI"] < 30]
-            if not oversold.empty:
-                rsi_buy = oversold["Close"].min()
-
-        # Combine all possibilities
-        possibilities = [p for p in [avg_support, min_low, rsi_buy] 
-                        if not np.isnan(p)]
-        
-        if not possibilities:
-            return np.nan
-            
-        return round(float(np.mean(possibilities)), 2)
-        
-    except Exception:
-        return np.nan
 
-# -----------------------------------------------------------------------------
-# CUSTOM EXCEPTIONS
-# -----------------------------------------------------------------------------
-
-class StockDataError(Exception):
-    """Custom exception for stock data related errors."""
-    pass
-
-class ValidationError(Exception):
-    """Custom exception for input validation errors."""
-    pass
+    COLUMNS = [
+        ("trace", "Trace", 190), ("total", "Total (s)", 70), ("limiter", "Limiter (s)", 75),
+        ("network", "Network (s)", 80), ("compute", "Compute (s)", 80), ("render", "Render (s)", 75),
+        ("hits", "Cache hits", 70), ("retries", "Retries", 60), ("limited", "429s", 45), ("error", "Error", 200),
+    ]
+    REFRESH_MS = 1000
+
+    def __init__(self, master: tk.Misc):
+        self.window = tk.Toplevel(master)
+        self.window.title("Debug: recent analyses")
+        self.window.geometry("1000x320")
+        self.tree = ttk.Treeview(self.window, columns=[key for key, _, _ in self.COLUMNS], show="headings")
+        for key, heading, width in self.COLUMNS:
+            self.tree.heading(key, text=heading)
+            self.tree.column(key, width=width, anchor="w" if key in ("trace", "error") else "e")
+        self.tree.pack(fill="both", expand=True)
+        buttons = ttk.Frame(self.window, padding=5)
+        buttons.pack(fill="x")
+        ttk.Button(buttons, text="Save Prometheus metrics...", command=self.save_metrics).pack(side="right")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self._job = None
+        self.refresh()
+
+    @staticmethod
+    def _row(trace: Trace) -> Tuple[Any, ...]:
+        totals = trace.totals()
+        limiter = totals.get("limiter_wait", 0.0)
+        network = max(0.0, totals.get("yahoo", 0.0) + totals.get("http_get", 0.0) - limiter)
+        compute = totals.get("calculate_indicators", 0.0) + totals.get("indicator_engine", 0.0)
+        render = totals.get("mpf_plot", 0.0) + totals.get("canvas_draw", 0.0)
+        total = "running" if trace.duration is None else f"{trace.duration:.2f}"
+        return (trace.label, total, f"{limiter:.2f}", f"{network:.2f}", f"{compute:.3f}", f"{render:.3f}",
+                trace.counters.get("cache_hit", 0), trace.counters.get("retry", 0),
+                trace.counters.get("rate_limited", 0), trace.error or "")
+
+    def refresh(self) -> None:
+        """Redraw the rows from the latest traces, newest first."""
+        self.tree.delete(*self.tree.get_children())
+        for trace in reversed(metrics.recent()):
+            self.tree.insert("", "end", values=self._row(trace))
+        self._job = self.window.after(self.REFRESH_MS, self.refresh)
+
+    def save_metrics(self) -> None:
+        """Write the process-wide span summaries and counters in Prometheus text format."""
+        path = filedialog.asksaveasfilename(parent=self.window, defaultextension=".prom",
+                                            filetypes=[("Prometheus text", "*.prom"), ("All files", "*.*")])
+        if path:
+            metrics.write_prometheus(path)
+
+    def close(self) -> None:
+        if self._job is not None:
+            self.window.after_cancel(self._job)
+        self.window.destroy()
+
+    def exists(self) -> bool:
+        return bool(self.window.winfo_exists())
 
 # -----------------------------------------------------------------------------
 # MAIN APPLICATION CLASS
@@ -759,7 +357,9 @@ class StockAnalyzerApp:
         self.root = root
         self.current_symbol: Optional[str] = None
         self.current_df: Optional[pd.DataFrame] = None
-        self.canvas: Optional[Any] = None
+        self.current_bar_size = "D"
+        self.chart_view: Optional[ChartView] = None
+        self.debug_panel: Optional[DebugPanel] = None
         self.executor = ThreadPoolExecutor(max_workers=2)
         
         # Fundamental analysis data
@@ -802,6 +402,7 @@ class StockAnalyzerApp:
                                      font=("Segoe UI", 12))
         self.symbol_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
         self.symbol_entry.bind('<Return>', lambda e: self.analyze_stock())
+        self.root.bind('<F12>', lambda e: self.toggle_debug_panel())
         
         self.analyze_button = ttk.Button(input_control_frame, text="Analyze", 
                                         command=self.analyze_stock)
@@ -848,12 +449,17 @@ class StockAnalyzerApp:
         
         ttk.Label(ma_frame, text="Moving Averages:").pack(side="left", padx=(0, 10))
         
-        # Better organized MA periods
-        ma_periods = [10, 20, 30, 50, 72, 100, 200, 400, 420]
-        for period in ma_periods:
+        # All periods are precomputed, so toggling only redraws the chart
+        self.ma_kind_var = tk.StringVar(value="SMA")
+        ma_kind_cb = ttk.Combobox(ma_frame, textvariable=self.ma_kind_var, values=list(MA_KINDS),
+                                  state="readonly", width=5)
+        ma_kind_cb.pack(side="left", padx=(0, 10))
+        ma_kind_cb.bind("<<ComboboxSelected>>", lambda e: self.redraw_chart())
+        
+        for period in MA_PERIODS:
             var = tk.BooleanVar(value=(period in [50, 200]))  # Default to 50 and 200 MA
             self.ma_vars[period] = var
-            cb = ttk.Checkbutton(ma_frame, text=f"{period} MA", variable=var)
+            cb = ttk.Checkbutton(ma_frame, text=f"{period} MA", variable=var, command=self.redraw_chart)
             cb.pack(side="left", padx=(0, 8))
         
         # Update button
@@ -891,18 +497,17 @@ class StockAnalyzerApp:
         Returns:
             True if valid, False otherwise
         """
-        import re
         if not symbol or len(symbol) < 1 or len(symbol) > 20:
             return False
         return bool(re.match(self.symbol_pattern, symbol))
     
-    def display_stock_info(self, ticker: str, stock_info: Any) -> None:
+    def display_stock_info(self, ticker: str, stock_info: Dict[str, Any]) -> None:
         """
         Display basic stock/crypto information in the combined analysis frame.
         
         Args:
             ticker: Stock/crypto symbol
-            stock_info: yfinance Ticker object
+            stock_info: Company info dict from YahooClient.info()
         """
         # Clear existing info
         for widget in self.analysis_frame.winfo_children():
@@ -919,8 +524,8 @@ class StockAnalyzerApp:
         info_text = f"Symbol: {ticker.upper()}\n"
         
         try:
-            if hasattr(stock_info, 'info') and stock_info.info:
-                info = stock_info.info
+            if stock_info:
+                info = stock_info
                 info_text += f"Name: {info.get('longName', info.get('shortName', 'N/A'))}\n"
                 
                 # Only show relevant info based on asset type
@@ -1296,8 +901,8 @@ class StockAnalyzerApp:
         # Disable button during analysis
         self.analyze_button.config(state="disabled", text="Loading...")
         
-        # Start async analysis
-        self.executor.submit(self._analyze_stock_async, symbol)
+        # Start async analysis; user-triggered fetches jump ahead of background work
+        self.executor.submit(run_with_priority, PRIORITY_INTERACTIVE, self._analyze_stock_async, symbol)
     
     def _analyze_stock_async(self, symbol: str) -> None:
         """
@@ -1311,59 +916,30 @@ class StockAnalyzerApp:
             if not YFINANCE_AVAILABLE:
                 raise ImportError("yfinance is not available. Please install it with: pip install yfinance")
             
-            # Validate symbol by trying to get stock info
-            stock = yf.Ticker(symbol)
-            
-            # Test if we can get price data (with timeout)
-            test_data = stock.history(period="5d")
-            if test_data.empty:
-                raise StockDataError(f"No price data found for symbol: {symbol}")
-            
-            # Fetch fundamental analysis data
-            try:
-                self.fundamental_data = fetch_company_data(symbol)
-                self.social_sentiment = get_social_sentiment(symbol)
-                self.positive_growth_percent = compute_positive_quarterly_revenue_growth(symbol)
-                self.earnings_date = get_upcoming_earnings_call(symbol)
-                
-                # Calculate fundamental score
-                self.fundamental_score = fundamental_score(
-                    self.fundamental_data, 
-                    self.positive_growth_percent, 
-                    self.earnings_date
-                )
-                
-                # Fetch options data if we have price data
-                if self.fundamental_data and self.fundamental_data.get('current_price') and self.fundamental_data.get('high_52'):
-                    self.options_data = evaluate_options(
-                        symbol, 
-                        self.fundamental_data['current_price'], 
-                        self.fundamental_data.get('high_52')
-                    )
-                else:
-                    self.options_data = None
-                    
-            except Exception as e:
-                print(f"Warning: Could not fetch fundamental data: {e}")
-                self.fundamental_data = None
-                self.social_sentiment = None
-                self.positive_growth_percent = None
-                self.earnings_date = None
-                self.fundamental_score = None
-                self.options_data = None
+            # Validate the symbol, load company info and fetch fundamentals
+            # (stages run concurrently; no network call happens on the UI thread)
+            with metrics.trace(f"analyze {symbol}"):
+                results = analyze_symbol(symbol)
+            stock_info = results["stock_info"]
+            self.fundamental_data = results["fundamental_data"]
+            self.social_sentiment = results["social_sentiment"]
+            self.positive_growth_percent = results["positive_growth_percent"]
+            self.earnings_date = results["earnings_date"]
+            self.fundamental_score = results["fundamental_score"]
+            self.options_data = results["options_data"]
             
             # Update UI in main thread
-            self.root.after(0, self._on_analysis_success, symbol, stock)
+            self.root.after(0, self._on_analysis_success, symbol, stock_info)
             
         except StockDataError as e:
             self.root.after(0, self._on_analysis_error, str(e))
         except Exception as e:
             self.root.after(0, self._on_analysis_error, f"Error analyzing {symbol}: {str(e)}")
     
-    def _on_analysis_success(self, symbol: str, stock: Any) -> None:
+    def _on_analysis_success(self, symbol: str, stock_info: Dict[str, Any]) -> None:
         """Handle successful analysis."""
         self.current_symbol = symbol
-        self.display_stock_info(symbol, stock)
+        self.display_stock_info(symbol, stock_info)
         self.display_fundamental_analysis(symbol)
         self.display_options_analysis(symbol)
         self.update_chart()
@@ -1384,7 +960,7 @@ class StockAnalyzerApp:
         self.update_button.config(state="disabled", text="Updating...")
         
         # Start async chart update
-        self.executor.submit(self._update_chart_async)
+        self.executor.submit(run_with_priority, PRIORITY_INTERACTIVE, self._update_chart_async)
     
     def _update_chart_async(self) -> None:
         """Asynchronous chart update."""
@@ -1392,136 +968,31 @@ class StockAnalyzerApp:
             # Get timeframe
             period = self.timeframe_map[self.timeframe_var.get()]
             
-            # Check cache first
-            df = _data_cache.get(self.current_symbol, period)
-            
-            if df is None:
-                # Check if yfinance is available
-                if not YFINANCE_AVAILABLE:
-                    raise ImportError("yfinance is not available. Please install it with: pip install yfinance")
-                
-                # Fetch data
-                stock = yf.Ticker(self.current_symbol)
-                df = stock.history(period=period)
-                
-                if df.empty:
-                    raise StockDataError(f"No data for {self.current_symbol} in '{period}' timeframe.")
-                
-                # Cache the data
-                _data_cache.set(self.current_symbol, period, df)
+            # Check if yfinance is available
+            if not YFINANCE_AVAILABLE:
+                raise ImportError("yfinance is not available. Please install it with: pip install yfinance")
             
-            # Prepare data
-            df = df[["Open", "High", "Low", "Close", "Volume"]].copy()
-            df.index.name = "Date"
+            # The render started from _on_chart_success reports into the same trace
+            with metrics.trace(f"chart {self.current_symbol} {period}") as trace:
+                # Indicators on the cached full history, sliced to the timeframe; long spans are
+                # drawn as weekly/monthly/quarterly candles (only new bars are processed on refresh)
+                df_ind, bar_size = get_chart_indicators(self.current_symbol, period)
             
-            # Calculate indicators
-            df_ind = calculate_indicators(df)
-            self.current_df = df_ind
+                if df_ind.empty:
+                    raise StockDataError(f"No data for {self.current_symbol} in '{period}' timeframe.")
             
             # Update UI in main thread
-            self.root.after(0, self._on_chart_success, df_ind)
+            self.root.after(0, self._on_chart_success, df_ind, bar_size, trace)
             
         except Exception as e:
             self.root.after(0, self._on_chart_error, str(e))
     
-    def _on_chart_success(self, df_ind: pd.DataFrame) -> None:
+    def _on_chart_success(self, df_ind: pd.DataFrame, bar_size: str = "D", trace: Optional[Trace] = None) -> None:
         """Handle successful chart update."""
         try:
-            # Clear existing chart
-            if self.canvas:
-                self.canvas.get_tk_widget().destroy()
-                self.canvas = None
-            
-            # Check if charting libraries are available
-            if not MATPLOTLIB_AVAILABLE or not MPLFINANCE_AVAILABLE:
-                raise ImportError("Charting libraries not available. Please install matplotlib and mplfinance")
-            
-            # Calculate base price and levels
-            base_price = get_base_price(df_ind)
-            below_5p = round(base_price * 0.95, 2) if not np.isnan(base_price) else None
-            
-            # Get last values for legend
-            last_support = df_ind["Support"].iloc[-1] if "Support" in df_ind and not df_ind.empty else np.nan
-            last_resistance = df_ind["Resistance"].iloc[-1] if "Resistance" in df_ind and not df_ind.empty else np.nan
-            last_rsi = df_ind["RSI"].iloc[-1] if "RSI" in df_ind and not df_ind.empty else np.nan
-            
-            # Build moving averages list
-            mav_list = [period for period, var in self.ma_vars.items() if var.get()]
-            
-            # Create additional plots
-            addplots = []
-            if "Support" in df_ind and df_ind["Support"].notna().any():
-                addplots.append(mpf.make_addplot(df_ind["Support"], color="green", linestyle="--", width=1.5))
-            if "Resistance" in df_ind and df_ind["Resistance"].notna().any():
-                addplots.append(mpf.make_addplot(df_ind["Resistance"], color="red", linestyle="--", width=1.5))
-            if not np.isnan(base_price):
-                addplots.append(mpf.make_addplot([base_price] * len(df_ind), color="orange", linestyle="--", width=1.5))
-            if below_5p:
-                addplots.append(mpf.make_addplot([below_5p] * len(df_ind), color="purple", linestyle="--", width=1.5))
-                
-            # MA colors
-            mav_colors = [self.ma_color_map[ma] for ma in mav_list]
-            
-            # Create the plot
-            fig, axlist = mpf.plot(
-                df_ind,
-                type="candle",
-                mav=mav_list if mav_list else None,
-                mavcolors=mav_colors if mav_list else None,
-                addplot=addplots or [],
-                volume=True,
-                style="charles",
-                returnfig=True,
-                figsize=(12, 8),
-                tight_layout=True
-            )
-            
-            # Add legend
-            main_ax = axlist[0]
-            legend_handles = []
-            legend_labels = []
-            
-            # Add MA legends
-            for ma in mav_list:
-                color = self.ma_color_map[ma]
-                legend_handles.append(Line2D([], [], color=color, linewidth=2, label=f"{ma}-day MA"))
-                legend_labels.append(f"{ma}-day MA")
-                
-            # Add indicator legends
-            if "Support" in df_ind and df_ind["Support"].notna().any():
-                sup_label = f"Support (20d): ${last_support:.2f}" if not np.isnan(last_support) else "Support (20d)"
-                legend_handles.append(Line2D([], [], color="green", linestyle="--", linewidth=1.5, label=sup_label))
-                legend_labels.append(sup_label)
-                
-            if "Resistance" in df_ind and df_ind["Resistance"].notna().any():
-                res_label = f"Resistance (20d): ${last_resistance:.2f}" if not np.isnan(last_resistance) else "Resistance (20d)"
-                legend_handles.append(Line2D([], [], color="red", linestyle="--", linewidth=1.5, label=res_label))
-                legend_labels.append(res_label)
-                
-            if not np.isnan(base_price):
-                bp_label = f"Base Price: ${base_price:.2f}"
-                legend_handles.append(Line2D([], [], color="orange", linestyle="--", linewidth=1.5, label=bp_label))
-                legend_labels.append(bp_label)
-                
-            if below_5p:
-                b5_label = f"5% Below Base: ${below_5p:.2f}"
-                legend_handles.append(Line2D([], [], color="purple", linestyle="--", linewidth=1.5, label=b5_label))
-                legend_labels.append(b5_label)
-                
-            # Add RSI info to title
-            current_price = df_ind["Close"].iloc[-1]
-            title_text = f"{self.current_symbol} - Current: ${current_price:.2f}"
-            if not np.isnan(last_rsi):
-                title_text += f" | RSI: {last_rsi:.1f}"
-            main_ax.set_title(title_text, fontsize=14, fontweight='bold', pad=20)
-            
-            if legend_handles:
-                main_ax.legend(legend_handles, legend_labels, loc="upper left", fontsize=9, framealpha=0.9)
-                
-            # Display chart
-            self.canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-            self.canvas.draw()
-            self.canvas.get_tk_widget().pack(fill="both", expand=True)
+            self.current_df, self.current_bar_size = df_ind, bar_size
+            with metrics.use(trace):
+                current_price, last_rsi, base_price = self._draw_chart(df_ind, bar_size)
             
             # Show analysis summary
             self.show_analysis_summary(df_ind, current_price, last_rsi, base_price)
@@ -1531,6 +1002,103 @@ class StockAnalyzerApp:
         except Exception as e:
             self._on_chart_error(f"Chart rendering error: {str(e)}")
     
+    def redraw_chart(self) -> None:
+        """Redraw the current chart after a moving average toggle (no data reload)."""
+        if self.current_df is None or self.chart_view is None:
+            return
+        try:
+            self._draw_chart(self.current_df, self.current_bar_size)
+        except Exception as e:
+            self._on_chart_error(f"Chart rendering error: {str(e)}")
+    
+    def _draw_chart(self, df_ind: pd.DataFrame, bar_size: str) -> Tuple[float, float, float]:
+        """
+        Build overlays and legend from the indicator frame and submit a render.
+        
+        Returns:
+            (current price, last RSI, base price) for the analysis summary
+        """
+        bar_name, bar_abbr = BAR_SIZES[bar_size]
+        
+        # Check if charting libraries are available
+        if not MATPLOTLIB_AVAILABLE or not MPLFINANCE_AVAILABLE:
+            raise ImportError("Charting libraries not available. Please install matplotlib and mplfinance")
+        
+        # Calculate base price and levels
+        base_price = get_base_price(df_ind)
+        below_5p = round(base_price * 0.95, 2) if not np.isnan(base_price) else None
+        
+        # Get last values for legend
+        last_support = df_ind["Support"].iloc[-1] if "Support" in df_ind and not df_ind.empty else np.nan
+        last_resistance = df_ind["Resistance"].iloc[-1] if "Resistance" in df_ind and not df_ind.empty else np.nan
+        last_rsi = df_ind["RSI"].iloc[-1] if "RSI" in df_ind and not df_ind.empty else np.nan
+        
+        # Build moving averages list (periods longer than the data have nothing to draw)
+        ma_kind = self.ma_kind_var.get()
+        mav_list = [period for period, var in self.ma_vars.items() if var.get() and period <= len(df_ind)]
+        
+        # Create additional plots; MAs come precomputed on the full series so
+        # toggling is free and downsampling for display cannot distort them
+        overlays = []
+        for ma in mav_list:
+            overlays.append((df_ind[ma_column(ma_kind, ma)], dict(color=self.ma_color_map[ma])))
+        if "Support" in df_ind and df_ind["Support"].notna().any():
+            overlays.append((df_ind["Support"], dict(color="green", linestyle="--", width=1.5)))
+        if "Resistance" in df_ind and df_ind["Resistance"].notna().any():
+            overlays.append((df_ind["Resistance"], dict(color="red", linestyle="--", width=1.5)))
+        if not np.isnan(base_price):
+            overlays.append(([base_price] * len(df_ind), dict(color="orange", linestyle="--", width=1.5)))
+        if below_5p:
+            overlays.append(([below_5p] * len(df_ind), dict(color="purple", linestyle="--", width=1.5)))
+        
+        # Build legend
+        legend_handles = []
+        legend_labels = []
+        
+        # Add MA legends
+        for ma in mav_list:
+            color = self.ma_color_map[ma]
+            legend_handles.append(mpl_lines.Line2D([], [], color=color, linewidth=2, label=f"{ma}-{bar_name} {ma_kind}"))
+            legend_labels.append(f"{ma}-{bar_name} {ma_kind}")
+            
+        # Add indicator legends
+        if "Support" in df_ind and df_ind["Support"].notna().any():
+            sup_label = (f"Support ({SR_WINDOW}{bar_abbr}): ${last_support:.2f}" if not np.isnan(last_support)
+                         else f"Support ({SR_WINDOW}{bar_abbr})")
+            legend_handles.append(mpl_lines.Line2D([], [], color="green", linestyle="--", linewidth=1.5, label=sup_label))
+            legend_labels.append(sup_label)
+            
+        if "Resistance" in df_ind and df_ind["Resistance"].notna().any():
+            res_label = (f"Resistance ({SR_WINDOW}{bar_abbr}): ${last_resistance:.2f}" if not np.isnan(last_resistance)
+                         else f"Resistance ({SR_WINDOW}{bar_abbr})")
+            legend_handles.append(mpl_lines.Line2D([], [], color="red", linestyle="--", linewidth=1.5, label=res_label))
+            legend_labels.append(res_label)
+            
+        if not np.isnan(base_price):
+            bp_label = f"Base Price: ${base_price:.2f}"
+            legend_handles.append(mpl_lines.Line2D([], [], color="orange", linestyle="--", linewidth=1.5, label=bp_label))
+            legend_labels.append(bp_label)
+            
+        if below_5p:
+            b5_label = f"5% Below Base: ${below_5p:.2f}"
+            legend_handles.append(mpl_lines.Line2D([], [], color="purple", linestyle="--", linewidth=1.5, label=b5_label))
+            legend_labels.append(b5_label)
+            
+        # Add RSI info to title
+        current_price = df_ind["Close"].iloc[-1]
+        title_text = f"{self.current_symbol} - Current: ${current_price:.2f}"
+        if not np.isnan(last_rsi):
+            title_text += f" | RSI: {last_rsi:.1f}"
+        if bar_size != "D":
+            title_text += f" | {bar_name.title()}ly bars"
+        
+        # Render on the chart worker; only the finished image is swapped in here
+        if self.chart_view is None:
+            self.chart_view = ChartView(self.chart_frame)
+        self.chart_view.submit(df_ind, overlays, title_text, legend_handles, legend_labels,
+                               on_error=self._on_chart_error)
+        return current_price, last_rsi, base_price
+    
     def _on_chart_error(self, error_msg: str) -> None:
         """Handle chart error."""
         messagebox.showerror("Chart Error", error_msg)
@@ -1592,10 +1160,21 @@ class StockAnalyzerApp:
         # Print to console for now (can be enhanced with GUI summary later)
         print(summary)
     
+    def toggle_debug_panel(self) -> None:
+        """Open the debug panel, or close it if it is already open."""
+        if self.debug_panel is not None and self.debug_panel.exists():
+            self.debug_panel.close()
+            self.debug_panel = None
+        else:
+            self.debug_panel = DebugPanel(self.root)
+
     def cleanup(self) -> None:
         """Cleanup resources when application closes."""
         if hasattr(self, 'executor'):
             self.executor.shutdown(wait=False)
+        _pipeline_executor.shutdown(wait=False)
+        if self.chart_view is not None:
+            self.chart_view.close()
 
 # -----------------------------------------------------------------------------
 # MAIN APPLICATION
@@ -1617,6 +1196,9 @@ def main() -> None:
                            "pip install matplotlib mplfinance")
         return
     
+    # STOCK_ANALYZER_RECORD / STOCK_ANALYZER_REPLAY: record or replay provider responses
+    install_from_env()
+    
     try:
         root = tk.Tk()
         app = StockAnalyzerApp(root)
@@ -1624,6 +1206,9 @@ def main() -> None:
         # Set focus to symbol entry
         app.symbol_entry.focus()
         
+        # Import the charting and data libraries once the window is up
+        root.after(100, start_background_preload)
+        
         # Handle window closing
         def on_closing():
             app.cleanup()
@@ -1640,4 +1225,3 @@ def main() -> None:
 
 if __name__ == "__main__":
     main()
-
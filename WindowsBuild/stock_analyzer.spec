@@ -10,9 +10,12 @@ a = Analysis(
     hiddenimports=[
         'yfinance',
         'mplfinance',
+        'tenacity',  # imported lazily, invisible to the analysis
         'pandas',
         'numpy',
         'matplotlib',
+        'matplotlib.backends.backend_tkagg',
+        'matplotlib.lines',  # imported lazily, invisible to the analysis
         'tkinter',
         'PIL._tkinter_finder',
     ],
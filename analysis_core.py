@@ -0,0 +1,2851 @@
+#!/usr/bin/env python3
+"""
+Headless analysis core for the Stock and Crypto Analyzer
+- Price history loading, caching and the persistent history store
+- Host-scoped rate limiting, HTTP and Yahoo Finance clients
+- 5-Pillar fundamental analysis, social sentiment, options and earnings
+- Technical indicators (NumPy kernels and the incremental engine)
+- Bar resampling and chart downsampling
+
+No tkinter or plotting imports: safe to use from servers, batch jobs and
+worker processes. Both GUI entry points build on this module.
+"""
+
+import asyncio
+import contextvars
+import functools
+import heapq
+import importlib
+import importlib.util
+import itertools
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Any
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from urllib.parse import urlparse
+
+# Core data libraries
+import pandas as pd
+import numpy as np
+
+# Copy-on-Write lets cached frames be shared instead of defensively copied
+# (always enabled from pandas 3.0, where the option is deprecated)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# Heavy libraries are imported on first use so callers only pay for what they
+# touch; availability is checked without importing them
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self) -> Any:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+def module_available(*names: str) -> bool:
+    """Check that top-level packages are installed without importing them."""
+    return all(importlib.util.find_spec(name) is not None for name in names)
+
+def preload_modules(modules: List[LazyModule]) -> None:
+    """Import the given lazy modules now (e.g. from a background thread)."""
+    for module in modules:
+        try:
+            module._load()
+        except Exception:
+            # Missing or broken packages are reported when actually used
+            pass
+
+YFINANCE_AVAILABLE = module_available("yfinance")
+if not YFINANCE_AVAILABLE:
+    print("Warning: yfinance not available. Please install with: pip install yfinance")
+yf = LazyModule("yfinance")
+
+REQUESTS_AVAILABLE = module_available("requests", "tenacity", "requests_cache")
+if not REQUESTS_AVAILABLE:
+    print("Warning: requests/tenacity/requests_cache not available. Social sentiment analysis will be disabled.")
+requests = LazyModule("requests")
+# Yahoo retries fall back to a built-in loop without tenacity (see _retry_without_tenacity)
+TENACITY_AVAILABLE = module_available("tenacity")
+tenacity = LazyModule("tenacity")
+requests_cache = LazyModule("requests_cache")
+
+# Enables the Parquet history store (pandas imports it when needed)
+PARQUET_AVAILABLE = module_available("pyarrow")
+
+# Data and network modules, in warm-up order
+CORE_LAZY_MODULES = [yf, requests, tenacity, requests_cache]
+
+# -----------------------------------------------------------------------------
+# FUNDAMENTAL ANALYSIS CONFIGURATION
+# -----------------------------------------------------------------------------
+
+# Rate Limiting Configuration
+YAHOO_MAX_RPS = 1.2          # Be conservative; yfinance now uses curl_cffi internally
+STOCKTWITS_MAX_RPS = 1.0     # StockTwits stricter
+DEFAULT_MAX_RPS = 1.0        # any other host
+HTTP_CACHE_TTL = 60          # seconds for HTTP GET cache (StockTwits sentiment while a session is open)
+REQUEST_TIMEOUT = 12         # seconds
+
+# Upstream hosts; every request to a host shares one process-wide limiter
+YAHOO_HOST = "finance.yahoo.com"
+STOCKTWITS_HOST = "api.stocktwits.com"
+HOST_RATE_LIMITS = {
+    YAHOO_HOST: YAHOO_MAX_RPS,
+    STOCKTWITS_HOST: STOCKTWITS_MAX_RPS,
+}
+
+# Limiter priority classes (lower value is served first)
+PRIORITY_INTERACTIVE = 0     # fetches triggered by a click
+PRIORITY_BACKGROUND = 10     # refreshes and batch work
+ASYNC_POLL_INTERVAL = 0.05   # seconds between checks for asyncio waiters queued behind others
+
+# Yahoo client response cache (lifetimes come from cache_ttl, see Market Sessions)
+YAHOO_CLIENT_REGISTRY_SIZE = 64     # tickers whose clients (and responses) are kept
+NEGATIVE_CACHE_TTL = 600            # seconds a permanent failure (unknown symbol, no data) is remembered
+
+# Market Sessions: regular hours by ticker suffix as (time zone, open, close); holidays are not modeled
+MARKET_SESSIONS = {
+    "": ("America/New_York", "09:30", "16:00"),     # US listings and ^ indices
+    ".TO": ("America/Toronto", "09:30", "16:00"),
+    ".L": ("Europe/London", "08:00", "16:30"),
+    ".DE": ("Europe/Berlin", "09:00", "17:30"),
+    ".PA": ("Europe/Paris", "09:00", "17:30"),
+    ".AS": ("Europe/Amsterdam", "09:00", "17:30"),
+    ".SW": ("Europe/Zurich", "09:00", "17:30"),
+    ".HK": ("Asia/Hong_Kong", "09:30", "16:00"),
+    ".T": ("Asia/Tokyo", "09:00", "15:30"),
+    ".AX": ("Australia/Sydney", "10:00", "16:00"),
+}
+CRYPTO_QUOTE_CURRENCIES = ("USD", "USDT", "USDC", "EUR", "GBP", "BTC", "ETH")  # BTC-USD style pairs
+SESSION_SETTLE_TIME = 20 * 60       # seconds after the close during which the day's bar may still change
+QUOTE_TTL = 60                      # seconds for quotes and option chains while a session is open
+BARS_TTL = 300                      # seconds for daily bars while the day's bar is still forming
+SENTIMENT_CLOSED_TTL = 15 * 60      # seconds for StockTwits sentiment outside trading hours
+REFERENCE_TTL = 12 * 3600           # seconds for earnings calendars and option expirations
+FINANCIALS_TTL = 24 * 3600          # seconds for financials when the next earnings date is unknown
+FINANCIALS_MAX_TTL = 100 * 86400    # longest financials are kept waiting for the next earnings date
+
+# In-memory Data Cache
+DATA_CACHE_MAX_BYTES = 256 * 1024 * 1024   # total DataFrame memory kept in the LRU cache
+
+# Persistent History Store
+HISTORY_STORE_DIR = os.path.join(os.path.expanduser("~"), ".stock_analyzer", "history")
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# yfinance periods from shortest to longest; a stored period covers every period before it
+PERIOD_ORDER = ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "max"]
+CHART_HISTORY_PERIOD = "max"                 # downloaded once per symbol; timeframes are slices of it
+SEPARATE_FETCH_PERIODS = ("1d", "5d")        # short views fetched on their own
+BULK_DOWNLOAD_THREADS = 4       # symbols per yf.download call in bulk_download_history (one thread each)
+
+# Fundamental Pipeline
+PIPELINE_MAX_WORKERS = 4        # stages fetched concurrently per analysis
+STAGE_TIMEOUTS = {              # seconds each stage may take before its result is dropped
+    "company": 60.0,
+    "sentiment": 30.0,
+    "growth": 45.0,
+    "earnings": 30.0,
+    "options": 60.0,
+}
+
+# Technical Indicators
+SR_WINDOW = 20                  # bars in the rolling support/resistance window
+RSI_WINDOW = 14                 # bars in the RSI gain/loss averages
+BASE_PRICE_LOOKBACK = 20        # recent bars considered by get_base_price
+INDICATOR_BACKEND = "numpy"     # "numpy" kernels or the reference "pandas" implementation
+MA_PERIODS = [10, 20, 30, 50, 72, 100, 200, 400, 420]  # moving averages offered on the chart
+MA_KINDS = ("SMA", "EMA")       # simple and exponential variants, both precomputed
+
+# Chart Bar Sizes: (name, short label) for daily, weekly, monthly and quarterly candles
+BAR_SIZES = {"D": ("day", "d"), "W": ("week", "w"), "M": ("month", "mo"), "Q": ("quarter", "q")}
+# Longest visible span in days drawn with each bar size; longer spans use quarterly bars
+BAR_SIZE_SPANS = [(3 * 365, "D"), (10 * 365, "W"), (30 * 365, "M")]
+CHART_PX_PER_CANDLE = 3         # plot-width pixels per drawn candle; longer series are downsampled to fit
+INDICATOR_ENGINE_SIZE = 256     # series whose incremental indicator state is kept
+
+# Fundamental Scoring Thresholds
+MIN_PROFIT_MARGIN = 0.10        # 10%
+MIN_OPER_MARGIN = 0.10          # 10%
+MIN_QTR_REV_GROWTH = 0.05       # 5% QoQ revenue growth
+MIN_POSITIVE_QTRS = 60.0        # 60% of last 5y quarters positive
+MIN_REV_TO_DEBT = 2.0           # Revenue / Total Debt
+MIN_OCF_TO_DEBT = 0.50          # OCF must be >= 50% of Total Debt
+MAX_DECLINE_FROM_HIGH = 0.30    # within 30% of 52w high
+REQUIRED_PASS_COUNT = 4         # need 4/5 pillars to PASS
+
+# Options
+OPTION_STRIKE_RANGE = 10.0      # calls shown from the current price up to this many dollars above
+OPTION_COLUMNS = ["contractSymbol", "strike", "lastPrice", "bid", "ask", "impliedVolatility"]
+
+# Tracing and Metrics
+TRACE_HISTORY = 20                                              # finished analyses kept for the debug panel
+METRICS_PROM_PATH = os.environ.get("STOCK_ANALYZER_METRICS_PROM")   # Prometheus text file, rewritten per trace
+TRACE_JSONL_PATH = os.environ.get("STOCK_ANALYZER_TRACE_JSONL")     # span events appended as JSON lines
+
+# -----------------------------------------------------------------------------
+# TRACING AND METRICS
+# -----------------------------------------------------------------------------
+
+@dataclass
+class Trace:
+    """Spans and counters recorded for one user-visible operation (an analysis, a chart update)."""
+    trace_id: int
+    label: str
+    started: float                      # wall-clock start (time.time())
+    _start: float = field(repr=False)   # perf_counter at start
+    duration: Optional[float] = None    # None while still running
+    error: Optional[str] = None
+    # (span name, labels, seconds after trace start, duration, thread name)
+    spans: List[Tuple[str, Dict[str, str], float, float, str]] = field(default_factory=list)
+    counters: Dict[str, int] = field(default_factory=dict)
+
+    def totals(self) -> Dict[str, float]:
+        """Seconds spent per span name (spans on parallel threads add up)."""
+        totals: Dict[str, float] = {}
+        for name, _, _, duration, _ in list(self.spans):
+            totals[name] = totals.get(name, 0.0) + duration
+        return totals
+
+_current_trace: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("current_trace", default=None)
+
+class Metrics:
+    """
+    Process-wide span timings and event counters.
+
+    span() times a block; every span is aggregated per (name, labels) into a
+    count/sum/max summary and, when it runs inside trace(), also attached to
+    that trace. The current trace is a contextvar, so pipeline stages and
+    renders started with a copied context report into the analysis that
+    started them. The last `history` traces are kept for the debug panel.
+
+    Optional exports: span events as JSON lines (jsonl_path, appended as
+    they happen) and the summaries in Prometheus text format (prom_path,
+    rewritten whenever a trace finishes, or via write_prometheus()).
+    """
+
+    def __init__(self, history: int = TRACE_HISTORY, prom_path: Optional[str] = METRICS_PROM_PATH,
+                 jsonl_path: Optional[str] = TRACE_JSONL_PATH):
+        self.prom_path = prom_path
+        self.jsonl_path = jsonl_path
+        self.traces: "deque[Trace]" = deque(maxlen=history)
+        self._spans: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        """Append one JSON line to the trace log. Caller must hold the lock."""
+        try:
+            with open(self.jsonl_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(event, default=str) + "\n")
+        except OSError as e:
+            print(f"Warning: Could not write trace log {self.jsonl_path}: {e}")
+            self.jsonl_path = None
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        """Record a span of known duration that ended just now."""
+        trace = _current_trace.get()
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self._spans.setdefault(key, [0, 0.0, 0.0])
+            summary[0] += 1
+            summary[1] += seconds
+            summary[2] = max(summary[2], seconds)
+            offset = None
+            if trace is not None:
+                offset = time.perf_counter() - trace._start - seconds
+                trace.spans.append((name, dict(key[1]), offset, seconds, threading.current_thread().name))
+            if self.jsonl_path:
+                self._emit({"event": "span", "ts": time.time(), "name": name, "labels": dict(key[1]),
+                            "seconds": round(seconds, 6), "trace": trace.trace_id if trace else None,
+                            "offset": round(offset, 6) if offset is not None else None})
+
+    @contextmanager
+    def span(self, name: str, **labels: Any):
+        """Time the enclosed block as a span."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def traced(self, name: str):
+        """Decorator timing every call of a function as a span."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name: str, amount: int = 1, **labels: Any) -> None:
+        """Increment an event counter (cache hits, retries, 429s, ...)."""
+        trace = _current_trace.get()
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            if trace is not None:
+                trace.counters[name] = trace.counters.get(name, 0) + amount
+
+    @contextmanager
+    def trace(self, label: str):
+        """Record the enclosed operation, and the spans it starts, as one trace."""
+        trace = Trace(next(self._ids), label, time.time(), time.perf_counter())
+        token = _current_trace.set(trace)
+        with self._lock:
+            self.traces.append(trace)
+            if self.jsonl_path:
+                self._emit({"event": "trace_start", "ts": trace.started, "trace": trace.trace_id, "label": label})
+        try:
+            yield trace
+        except BaseException as e:
+            trace.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_trace.reset(token)
+            trace.duration = time.perf_counter() - trace._start
+            with self._lock:
+                if self.jsonl_path:
+                    self._emit({"event": "trace_end", "ts": time.time(), "trace": trace.trace_id, "label": label,
+                                "seconds": round(trace.duration, 6), "error": trace.error,
+                                "counters": dict(trace.counters)})
+            if self.prom_path:
+                self.write_prometheus(self.prom_path)
+
+    @contextmanager
+    def use(self, trace: Optional[Trace]):
+        """Attribute spans in the enclosed block (and work it hands off) to an existing trace."""
+        if trace is None:
+            yield
+            return
+        token = _current_trace.set(trace)
+        try:
+            yield
+        finally:
+            _current_trace.reset(token)
+
+    def recent(self) -> List[Trace]:
+        """The most recent traces, newest last."""
+        with self._lock:
+            return list(self.traces)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Span summaries and counters as plain data."""
+        with self._lock:
+            spans = [{"name": name, "labels": dict(labels), "count": int(s[0]), "sum": s[1], "max": s[2]}
+                     for (name, labels), s in self._spans.items()]
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in self._counters.items()]
+        return {"spans": spans, "counters": counters}
+
+    def prometheus_text(self) -> str:
+        """Render the summaries and counters in the Prometheus text exposition format."""
+        def fmt(labels: Dict[str, str]) -> str:
+            if not labels:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                       for v in labels.values())
+            return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+        snap = self.snapshot()
+        lines = [
+            "# HELP stock_analyzer_span_seconds Time spent in instrumented spans.",
+            "# TYPE stock_analyzer_span_seconds summary",
+        ]
+        for s in snap["spans"]:
+            labels = fmt({"span": s["name"], **s["labels"]})
+            lines.append(f"stock_analyzer_span_seconds_count{labels} {s['count']}")
+            lines.append(f"stock_analyzer_span_seconds_sum{labels} {s['sum']:.6f}")
+        lines += [
+            "# HELP stock_analyzer_span_seconds_max Longest single span.",
+            "# TYPE stock_analyzer_span_seconds_max gauge",
+        ]
+        for s in snap["spans"]:
+            lines.append(f"stock_analyzer_span_seconds_max{fmt({'span': s['name'], **s['labels']})} {s['max']:.6f}")
+        lines += [
+            "# HELP stock_analyzer_events_total Cache hits, retries, rate-limit responses and other events.",
+            "# TYPE stock_analyzer_events_total counter",
+        ]
+        for c in snap["counters"]:
+            lines.append(f"stock_analyzer_events_total{fmt({'event': c['name'], **c['labels']})} {c['value']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Write prometheus_text() to a file atomically (for node_exporter's textfile collector)."""
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                fh.write(self.prometheus_text())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write metrics to {path}: {e}")
+
+    def reset(self) -> None:
+        """Drop all summaries, counters and traces."""
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self.traces.clear()
+
+# Global metrics instance
+metrics = Metrics()
+
+# -----------------------------------------------------------------------------
+# MARKET SESSIONS AND CACHE LIFETIMES
+# -----------------------------------------------------------------------------
+
+def asset_class(symbol: str) -> str:
+    """
+    Classify a Yahoo symbol as "crypto", "fx", "futures" or "equity".
+
+    Crypto pairs look like BTC-USD, FX pairs like EURUSD=X and futures like
+    ES=F; everything else (stocks, ETFs, ^ indices) is treated as an equity.
+    """
+    symbol = symbol.upper()
+    if symbol.endswith("=X"):
+        return "fx"
+    if symbol.endswith("=F"):
+        return "futures"
+    base, _, quote = symbol.rpartition("-")
+    if base and quote in CRYPTO_QUOTE_CURRENCIES:
+        return "crypto"
+    return "equity"
+
+@dataclass(frozen=True)
+class MarketSession:
+    """Regular trading hours of one exchange, Monday to Friday in its local time zone."""
+    tz: str
+    open: str
+    close: str
+
+    def _at(self, day: Any, hhmm: str) -> pd.Timestamp:
+        """Get a local wall-clock time on a calendar day as a UTC timestamp."""
+        hour, minute = map(int, hhmm.split(":"))
+        local = pd.Timestamp(day.year, day.month, day.day, hour, minute)
+        return local.tz_localize(self.tz).tz_convert("UTC")
+
+    def is_active(self, now: pd.Timestamp) -> bool:
+        """Check whether prices can still change: the session is open or its close is still settling."""
+        day = now.tz_convert(self.tz)
+        if day.weekday() >= 5:
+            return False
+        settled = self._at(day, self.close) + pd.Timedelta(seconds=SESSION_SETTLE_TIME)
+        return self._at(day, self.open) <= now < settled
+
+    def next_open(self, now: pd.Timestamp) -> pd.Timestamp:
+        """Get the start of the next session after now (UTC)."""
+        day = now.tz_convert(self.tz).normalize().tz_localize(None)
+        while day.weekday() >= 5 or self._at(day, self.open) <= now:
+            day += pd.Timedelta(days=1)
+        return self._at(day, self.open)
+
+@functools.lru_cache(maxsize=1024)
+def market_session(symbol: str) -> Optional[MarketSession]:
+    """
+    Get the trading session for a symbol's exchange.
+
+    Returns:
+        MarketSession picked by ticker suffix (US hours without one), or None
+        for crypto, FX and futures, which trade (nearly) around the clock
+    """
+    if asset_class(symbol) != "equity":
+        return None
+    dot = symbol.rfind(".")
+    # Unknown suffixes (BRK.B share classes) trade on US hours
+    hours = MARKET_SESSIONS.get(symbol[dot:].upper(), MARKET_SESSIONS[""]) if dot > 0 else MARKET_SESSIONS[""]
+    return MarketSession(*hours)
+
+def cache_ttl(symbol: str, kind: str, now: Optional[pd.Timestamp] = None,
+              next_earnings: Optional[pd.Timestamp] = None) -> float:
+    """
+    Get how long a response about symbol stays current, in seconds.
+
+    While a session is open quotes and bars expire quickly; once it has
+    closed (and on weekends) they cannot change before the next open, so
+    they are kept until then. Symbols without a session are always open.
+
+    Args:
+        symbol: Stock/crypto symbol
+        kind: "quote" (last price, option chains), "bars" (daily OHLCV,
+            company info), "sentiment" (StockTwits), "reference" (calendars,
+            expirations) or "financials" (quarterly statements)
+        now: Current time as a UTC timestamp (default: now)
+        next_earnings: Next earnings date; financials are kept until then
+
+    Returns:
+        Lifetime in seconds
+    """
+    now = pd.Timestamp.now(tz="UTC") if now is None else now
+    if kind == "financials":
+        if next_earnings is not None:
+            if next_earnings.tzinfo is None:
+                next_earnings = next_earnings.tz_localize("UTC")
+            until = (next_earnings - now).total_seconds()
+            if until > 0:
+                return min(max(until, FINANCIALS_TTL), FINANCIALS_MAX_TTL)
+        return FINANCIALS_TTL
+
+    session = market_session(symbol)
+    until_open = 0.0
+    if session is not None and not session.is_active(now):
+        until_open = (session.next_open(now) - now).total_seconds()
+    if kind == "reference":
+        return max(REFERENCE_TTL, until_open)
+    if kind == "sentiment":
+        # Posts keep coming outside trading hours, just far fewer
+        return max(HTTP_CACHE_TTL, min(until_open, SENTIMENT_CLOSED_TTL))
+    open_ttl = {"quote": QUOTE_TTL, "bars": BARS_TTL}[kind]
+    return max(open_ttl, until_open)
+
+# -----------------------------------------------------------------------------
+# DATA CACHING AND PERFORMANCE
+# -----------------------------------------------------------------------------
+
+class DataCache:
+    """
+    LRU cache for stock data bounded by total memory rather than entry count.
+
+    Entries are kept in recency order so lookups and evictions are O(1); the
+    least recently used frames are evicted once the summed DataFrame size
+    exceeds max_bytes.
+
+    Frames are handed out as shallow views: with Copy-on-Write the column
+    buffers are shared with the cache and any write by a caller copies first,
+    so the cached data is never modified and never duplicated on a hit.
+
+    Without a fixed ttl_seconds each entry lives for cache_ttl(symbol, "bars"):
+    a few minutes while the symbol's market is open, until the next open otherwise.
+    """
+    
+    def __init__(self, max_bytes: int = DATA_CACHE_MAX_BYTES, ttl_seconds: Optional[float] = None):
+        self.cache: "OrderedDict[str, Tuple[pd.DataFrame, float, int]]" = OrderedDict()
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+    
+    def _ttl(self, symbol: str) -> float:
+        """Get the lifetime of a new entry for symbol."""
+        return self.ttl_seconds if self.ttl_seconds is not None else cache_ttl(symbol, "bars")
+    
+    @staticmethod
+    def _frame_bytes(data: pd.DataFrame) -> int:
+        """Get the in-memory size of a DataFrame, including its index."""
+        return int(data.memory_usage(index=True, deep=True).sum())
+    
+    def _remove(self, key: str) -> None:
+        """Drop an entry and release its bytes from the budget."""
+        _, _, size = self.cache.pop(key)
+        self.total_bytes -= size
+    
+    def get(self, symbol: str, period: str) -> Optional[pd.DataFrame]:
+        """Get cached data if available and not expired."""
+        key = f"{symbol.upper()}_{period}"
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is not None:
+                data, expires, _ = entry
+                if time.time() < expires:
+                    self.cache.move_to_end(key)
+                    self.hits += 1
+                    metrics.count("cache_hit", cache="data")
+                    return data.copy(deep=False)
+                self._remove(key)
+            self.misses += 1
+        metrics.count("cache_miss", cache="data")
+        return None
+    
+    def set(self, symbol: str, period: str, data: pd.DataFrame) -> None:
+        """Cache the data, evicting least recently used entries to stay within budget."""
+        key = f"{symbol.upper()}_{period}"
+        data = data.copy(deep=False)
+        size = self._frame_bytes(data)
+        expires = time.time() + self._ttl(symbol)
+        
+        with self._lock:
+            if key in self.cache:
+                self._remove(key)
+            
+            # A single frame larger than the whole budget is not worth caching
+            if size > self.max_bytes:
+                return
+            
+            while self.cache and self.total_bytes + size > self.max_bytes:
+                oldest_key = next(iter(self.cache))
+                self._remove(oldest_key)
+                self.evictions += 1
+            
+            self.cache[key] = (data, expires, size)
+            self.total_bytes += size
+    
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss/eviction counters and current memory usage."""
+        with self._lock:
+            return {
+                "entries": len(self.cache),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+# Global cache instance
+_data_cache = DataCache()
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical fetches into a single in-flight call.
+
+    The first caller for a key runs the fetch; callers arriving while it is in
+    flight wait on the same future and share its result (or exception), so
+    overlapping Analyze/Update Chart clicks download a payload only once.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Any, Future] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: Any, func) -> Any:
+        """
+        Run func for key unless an identical call is already in flight.
+
+        Args:
+            key: Hashable call identity, e.g. (symbol, endpoint, params)
+            func: Zero-argument callable performing the fetch
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Get executed, coalesced and in-flight call counts."""
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+# Global single-flight instance shared by every fetch path
+_single_flight = SingleFlight()
+
+# -----------------------------------------------------------------------------
+# PERSISTENT HISTORY STORE
+# -----------------------------------------------------------------------------
+
+_PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+def period_covers(stored_period: Optional[str], period: str) -> bool:
+    """Check whether history downloaded for stored_period also spans period."""
+    if stored_period not in PERIOD_ORDER or period not in PERIOD_ORDER:
+        return False
+    return PERIOD_ORDER.index(stored_period) >= PERIOD_ORDER.index(period)
+
+def slice_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """
+    Return the trailing window of a daily frame that matches a yfinance period.
+
+    Args:
+        df: Daily OHLCV data sorted by date
+        period: yfinance-style period ("5d", "6mo", "2y", "max", ...)
+
+    Returns:
+        The rows of df that fall inside the period
+    """
+    if df.empty or period == "max":
+        return df
+    if period.endswith("d") and period[:-1].isdigit():
+        # Day periods count trading sessions, not calendar days
+        return df.iloc[-int(period[:-1]):]
+    offset = _PERIOD_OFFSETS.get(period)
+    if offset is None:
+        return df
+    start = df.index[-1] - offset
+    return df.iloc[df.index.searchsorted(start):]
+
+class HistoryStore:
+    """
+    Persistent per-symbol store of daily OHLCV history.
+
+    Each symbol is kept in its own file (Parquet when pyarrow is installed,
+    pickle otherwise) with a small JSON sidecar recording the widest period
+    downloaded so far, so refreshes only need the bars after the last stored date.
+    The sidecar also records when the stored bars stop being current (the
+    next session open if they were saved after the close), so a restart
+    outside trading hours needs no refresh at all.
+    """
+
+    def __init__(self, root_dir: str = HISTORY_STORE_DIR):
+        self.root_dir = root_dir
+        self.extension = ".parquet" if PARQUET_AVAILABLE else ".pkl"
+        self._lock = threading.Lock()
+
+    def _paths(self, symbol: str) -> Tuple[str, str]:
+        """Get the data and metadata file paths for a symbol."""
+        # Symbols may contain dots (BRK.B); keep file names flat and safe
+        name = re.sub(r"[^A-Z0-9\-]", "_", symbol.upper())
+        base = os.path.join(self.root_dir, name)
+        return base + self.extension, base + ".json"
+
+    def load(self, symbol: str) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """
+        Load stored history for a symbol.
+
+        Returns:
+            (DataFrame, period it covers), or (None, None) when nothing usable is stored
+        """
+        data_path, meta_path = self._paths(symbol)
+        with self._lock:
+            if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+                return None, None
+            try:
+                with open(meta_path, "r", encoding="utf-8") as fh:
+                    meta = json.load(fh)
+                if PARQUET_AVAILABLE:
+                    df = pd.read_parquet(data_path)
+                else:
+                    df = pd.read_pickle(data_path)
+            except Exception as e:
+                print(f"Warning: Could not read stored history for {symbol}: {e}")
+                return None, None
+        return df, meta.get("period")
+
+    def is_current(self, symbol: str) -> bool:
+        """Check whether stored history was saved recently enough to use without a refresh."""
+        _, meta_path = self._paths(symbol)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as fh:
+                return time.time() < json.load(fh).get("expires", 0)
+        except (OSError, ValueError):
+            return False
+
+    def save(self, symbol: str, df: pd.DataFrame, period: str) -> None:
+        """Write history for a symbol, replacing any previous file atomically."""
+        data_path, meta_path = self._paths(symbol)
+        now = time.time()
+        meta = {"symbol": symbol.upper(), "period": period, "updated": now,
+                "expires": now + cache_ttl(symbol, "bars")}
+        with self._lock:
+            try:
+                os.makedirs(self.root_dir, exist_ok=True)
+                tmp_path = data_path + ".tmp"
+                if PARQUET_AVAILABLE:
+                    df.to_parquet(tmp_path)
+                else:
+                    df.to_pickle(tmp_path)
+                os.replace(tmp_path, data_path)
+                with open(meta_path + ".tmp", "w", encoding="utf-8") as fh:
+                    json.dump(meta, fh)
+                os.replace(meta_path + ".tmp", meta_path)
+            except Exception as e:
+                # The store is an optimization; a failed write must not break charting
+                print(f"Warning: Could not store history for {symbol}: {e}")
+
+# Global history store instance
+_history_store = HistoryStore()
+
+def _download_history(symbol: str, **kwargs) -> pd.DataFrame:
+    """Download daily history from Yahoo Finance."""
+    return get_yahoo_client(symbol).download_history(**kwargs)
+
+def load_price_history(symbol: str, period: str) -> pd.DataFrame:
+    """
+    Get daily OHLCV history, reading the on-disk store first.
+
+    When the stored file already spans the requested period only the bars
+    after the last stored date are downloaded (nothing at all while it is
+    still current, see HistoryStore.is_current); otherwise the full period is
+    downloaded once and stored for next time. Concurrent loads of the same
+    symbol and period share one download.
+
+    Args:
+        symbol: Stock/crypto symbol
+        period: yfinance-style period
+
+    Returns:
+        DataFrame with OHLCV columns (empty if Yahoo has no data)
+    """
+    key = (symbol.upper(), "price_history", period)
+    return _single_flight.do(key, lambda: _load_price_history(symbol, period))
+
+def _match_tz(df: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    """Give df's index the same time zone handling as like's (daily bars keep their dates)."""
+    tz, like_tz = getattr(df.index, "tz", None), getattr(like.index, "tz", None)
+    if tz is None and like_tz is not None:
+        return df.tz_localize(like_tz)
+    if tz is not None and like_tz is None:
+        return df.tz_localize(None)
+    if tz is not None and str(tz) != str(like_tz):
+        return df.tz_convert(like_tz)
+    return df
+
+def _merge_tail(symbol: str, stored: pd.DataFrame, stored_period: str,
+                tail: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    Append freshly downloaded bars to stored history and save the result.
+
+    Returns:
+        The merged history, or None when a bar after the last stored one has a
+        split or dividend (which re-adjusts all earlier prices, so the full
+        period must be refetched)
+    """
+    tail = _match_tz(tail, stored)
+    # The tail re-requests the last stored bar; an action on it is already in the stored prices
+    new_bars = tail[tail.index > stored.index[-1]]
+    actions = [col for col in ("Dividends", "Stock Splits") if col in new_bars]
+    if actions and new_bars[actions].fillna(0).to_numpy().any():
+        return None
+    tail = tail[OHLCV_COLUMNS]
+    merged = pd.concat([stored[stored.index < tail.index[0]], tail])
+    _history_store.save(symbol, merged, stored_period)
+    return merged
+
+def _load_price_history(symbol: str, period: str) -> pd.DataFrame:
+    """Load price history from the store and Yahoo (see load_price_history)."""
+    stored, stored_period = _history_store.load(symbol)
+    fetch_period = period
+
+    if stored is not None and not stored.empty and period_covers(stored_period, period):
+        if _history_store.is_current(symbol):
+            return slice_period(stored, period)
+        # Re-request the last stored bar as well: it may have been a partial session
+        last_date = stored.index[-1].strftime("%Y-%m-%d")
+        tail = _download_history(symbol, start=last_date)
+
+        if tail.empty:
+            return slice_period(stored, period)
+
+        merged = _merge_tail(symbol, stored, stored_period, tail)
+        if merged is not None:
+            return slice_period(merged, period)
+
+        fetch_period = stored_period
+
+    df = _download_history(symbol, period=fetch_period)
+    if df.empty:
+        return df
+    df = df[OHLCV_COLUMNS]
+    _history_store.save(symbol, df, fetch_period)
+    return slice_period(df, period)
+
+def _split_download(frame: Optional[pd.DataFrame], symbols: List[str]) -> Dict[str, pd.DataFrame]:
+    """Split a grouped yf.download result into one frame per symbol."""
+    if frame is None or frame.empty:
+        return {}
+    if not isinstance(frame.columns, pd.MultiIndex):
+        return {symbols[0]: frame.dropna(subset=["Close"])} if len(symbols) == 1 else {}
+    # group_by="ticker" puts the symbol on the first level; be lenient about the order
+    level = 0 if set(symbols) & set(frame.columns.get_level_values(0)) else 1
+    frames = {}
+    for symbol in symbols:
+        if symbol in frame.columns.get_level_values(level):
+            df = frame.xs(symbol, axis=1, level=level)
+            df = df.dropna(subset=["Close"]) if "Close" in df else df.iloc[0:0]
+            if not df.empty:
+                frames[symbol] = df
+    return frames
+
+def _bulk_download(symbols: List[str], **kwargs) -> Dict[str, pd.DataFrame]:
+    """
+    Download daily history for many symbols with grouped yf.download calls.
+
+    yfinance still issues one chart request per symbol inside each call, all
+    at once on its threads, so symbols go BULK_DOWNLOAD_THREADS at a time and
+    the Yahoo host limiter is charged one token per symbol just before each
+    call. A watchlist is paced by the limiter instead of sent as one burst.
+    """
+    limiter = get_host_limiter(YAHOO_HOST)
+    frames: Dict[str, pd.DataFrame] = {}
+    for i in range(0, len(symbols), BULK_DOWNLOAD_THREADS):
+        chunk = symbols[i:i + BULK_DOWNLOAD_THREADS]
+        for _ in chunk:
+            limiter.acquire()
+        try:
+            with metrics.span("yahoo", endpoint="download"):
+                frame = yf.download(
+                    chunk, group_by="ticker", actions=True, auto_adjust=True, ignore_tz=True,
+                    threads=len(chunk), progress=False, **kwargs,
+                )
+        except Exception as e:
+            print(f"Warning: Bulk download failed for {len(chunk)} symbols: {e}")
+            continue
+        frames.update(_split_download(frame, chunk))
+    return frames
+
+def bulk_download_history(symbols: List[str], period: str = CHART_HISTORY_PERIOD,
+                          use_cache: bool = True) -> Dict[str, pd.DataFrame]:
+    """
+    Load daily history for a whole watchlist and populate the DataCache.
+
+    Symbols whose stored history already spans the period are used as stored
+    while still current, or refreshed with grouped tail downloads per
+    last-stored date; the rest are downloaded in full, BULK_DOWNLOAD_THREADS
+    symbols per yf.download call. Results are
+    written to the history store and cached under (symbol, period), so a
+    following get_chart_history/load for that period needs no network call.
+
+    Args:
+        symbols: Stock/crypto symbols (duplicates and case are normalized)
+        period: yfinance-style period to load
+        use_cache: Return live DataCache entries without downloading them again
+
+    Returns:
+        Dict of symbol -> OHLCV DataFrame; symbols without data are omitted
+    """
+    result: Dict[str, pd.DataFrame] = {}
+    pending = []
+    for symbol in dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()):
+        cached = _data_cache.get(symbol, period) if use_cache else None
+        if cached is not None:
+            result[symbol] = cached
+        else:
+            pending.append(symbol)
+
+    # Plan: current stored histories as they are, tail refreshes grouped by
+    # start date, full downloads grouped by period
+    histories: Dict[str, pd.DataFrame] = {}
+    stored_frames: Dict[str, Tuple[pd.DataFrame, str]] = {}
+    tails: Dict[str, List[str]] = {}
+    fulls: Dict[str, List[str]] = {}
+    for symbol in pending:
+        stored, stored_period = _history_store.load(symbol)
+        if stored is not None and not stored.empty and period_covers(stored_period, period):
+            if _history_store.is_current(symbol):
+                histories[symbol] = stored
+                continue
+            stored_frames[symbol] = (stored, stored_period)
+            tails.setdefault(stored.index[-1].strftime("%Y-%m-%d"), []).append(symbol)
+        else:
+            fulls.setdefault(period, []).append(symbol)
+
+    for start, group in tails.items():
+        downloaded = _bulk_download(group, start=start)
+        for symbol in group:
+            stored, stored_period = stored_frames[symbol]
+            tail = downloaded.get(symbol)
+            if tail is None or tail.empty:
+                histories[symbol] = stored
+                continue
+            merged = _merge_tail(symbol, stored, stored_period, tail)
+            if merged is None:
+                fulls.setdefault(stored_period, []).append(symbol)
+            else:
+                histories[symbol] = merged
+
+    for fetch_period, group in fulls.items():
+        downloaded = _bulk_download(group, period=fetch_period)
+        for symbol, df in downloaded.items():
+            df = df[OHLCV_COLUMNS]
+            _history_store.save(symbol, df, fetch_period)
+            histories[symbol] = df
+
+    for symbol, df in histories.items():
+        df = slice_period(df, period)
+        _data_cache.set(symbol, period, df)
+        result[symbol] = df
+    return result
+
+def get_chart_history(symbol: str, period: str) -> pd.DataFrame:
+    """
+    Get daily OHLCV for a chart timeframe.
+
+    Every daily timeframe is sliced in memory from one cached CHART_HISTORY_PERIOD
+    history per symbol, so switching between 1y, 2y and 5y makes no network call.
+    Only the short SEPARATE_FETCH_PERIODS views are loaded on their own.
+
+    Args:
+        symbol: Stock/crypto symbol
+        period: yfinance-style period selected in the timeframe box
+
+    Returns:
+        DataFrame with OHLCV columns (empty if Yahoo has no data)
+    """
+    fetch_period = period if period in SEPARATE_FETCH_PERIODS else CHART_HISTORY_PERIOD
+    df = _data_cache.get(symbol, fetch_period)
+    if df is None:
+        df = load_price_history(symbol, fetch_period)
+        if df.empty:
+            return df
+        _data_cache.set(symbol, fetch_period, df)
+    return slice_period(df, period)
+
+# -----------------------------------------------------------------------------
+# ERROR CLASSIFICATION AND NEGATIVE CACHE
+# -----------------------------------------------------------------------------
+
+# Exception class names (checked along the MRO, so yfinance, requests and
+# curl_cffi types are recognized without importing those packages)
+_RETRYABLE_ERROR_TYPES = {
+    "YFRateLimitError", "Timeout", "ConnectTimeout", "ReadTimeout", "ConnectionError",
+    "ChunkedEncodingError", "IncompleteRead", "TimeoutError",
+}
+_NOT_FOUND_ERROR_TYPES = {"YFTickerMissingError"}   # includes missing prices/timezone
+_RETRYABLE_MESSAGES = ("too many requests", "rate limit", "429", "timed out", "timeout",
+                       "temporarily unavailable", "service unavailable", "bad gateway",
+                       "connection reset", "connection aborted")
+_NOT_FOUND_MESSAGES = ("possibly delisted", "no price data found", "no timezone found",
+                       "symbol may be delisted", "quote not found")
+
+def _error_status(exc: BaseException) -> Optional[int]:
+    """HTTP status attached to an exception (requests/curl_cffi HTTPError), if any."""
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """
+    Check whether a failed request is worth retrying.
+
+    Retryable: HTTP 429 and 5xx, timeouts, dropped connections and Yahoo's
+    rate-limit errors. Everything else (not found, no data, 4xx, parse and
+    programming errors) is permanent and fails immediately.
+    """
+    status = _error_status(exc)
+    if status is not None:
+        return status == 429 or 500 <= status < 600
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if _RETRYABLE_ERROR_TYPES & {cls.__name__ for cls in type(exc).__mro__}:
+        return True
+    msg = str(exc).lower()
+    return any(text in msg for text in _RETRYABLE_MESSAGES)
+
+def is_not_found_error(exc: BaseException) -> bool:
+    """Check whether an error says the symbol itself does not exist (or has no data at all)."""
+    if _error_status(exc) == 404:
+        return True
+    if _NOT_FOUND_ERROR_TYPES & {cls.__name__ for cls in type(exc).__mro__}:
+        return True
+    msg = str(exc).lower()
+    return any(text in msg for text in _NOT_FOUND_MESSAGES)
+
+def _retry_without_tenacity(func, attempts: int, client: str) -> Any:
+    """
+    Call func, retrying transient errors with the same exponential backoff
+    as the tenacity policies (used when tenacity is not installed).
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt == attempts or not is_retryable_error(e):
+                raise
+            metrics.count("retry", client=client)
+            time.sleep(min(20.0, max(1.0, 0.8 * 2 ** (attempt - 1))))
+
+class NegativeCache:
+    """
+    Short-lived record of Yahoo lookups that failed permanently.
+
+    Entries are per (symbol, endpoint); the ANY endpoint marks a symbol that
+    does not exist at all, so every endpoint for it fails immediately. Entries
+    expire after ttl_seconds, after which the symbol is tried again.
+    """
+
+    ANY = "*"
+
+    def __init__(self, ttl_seconds: float = NEGATIVE_CACHE_TTL):
+        self.ttl_seconds = ttl_seconds
+        self.entries: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str, endpoint: str) -> Optional[str]:
+        """Get the recorded failure for a symbol/endpoint, or None if none is live."""
+        symbol = symbol.upper()
+        now = time.time()
+        with self._lock:
+            for key in ((symbol, self.ANY), (symbol, endpoint)):
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self.entries[key]
+                    continue
+                self.hits += 1
+                return entry[0]
+        return None
+
+    def add(self, symbol: str, endpoint: str, reason: str) -> None:
+        """Record a permanent failure for ttl_seconds."""
+        with self._lock:
+            self.entries[(symbol.upper(), endpoint)] = (reason, time.time() + self.ttl_seconds)
+
+    def discard(self, symbol: str) -> None:
+        """Forget every failure recorded for a symbol."""
+        symbol = symbol.upper()
+        with self._lock:
+            for key in [key for key in self.entries if key[0] == symbol]:
+                del self.entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self.entries), "hits": self.hits}
+
+# Global negative cache instance
+_negative_cache = NegativeCache()
+
+# -----------------------------------------------------------------------------
+# RATE LIMITING AND HTTP CLIENT
+# -----------------------------------------------------------------------------
+
+_request_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "request_priority", default=PRIORITY_BACKGROUND
+)
+
+@contextmanager
+def request_priority(priority: int):
+    """Run the enclosed fetches at the given limiter priority."""
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+def run_with_priority(priority: int, func, *args, **kwargs) -> Any:
+    """Call func with every limiter acquisition made at the given priority."""
+    with request_priority(priority):
+        return func(*args, **kwargs)
+
+class TokenBucket:
+    """
+    Token-bucket limiter for per-host throttling with priority classes.
+    capacity tokens refill at 'rate' (tokens per second).
+
+    Waiters queue by (priority, arrival order) and only the head of the queue
+    may take a token. The lock is held just long enough to compute the head's
+    reservation time and is released while waiting, so an interactive request
+    arriving later overtakes queued background requests instead of sleeping
+    behind them.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None, name: str = "") -> None:
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else float(rate)
+        self.tokens = self.capacity
+        self.timestamp = time.monotonic()
+        self._cond = threading.Condition(threading.Lock())
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        # Instrumentation
+        self.acquisitions = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _enqueue(self, priority: Optional[int]) -> Tuple[int, int]:
+        """Add a waiter to the queue. Caller must hold the lock."""
+        if priority is None:
+            priority = _request_priority.get()
+        ticket = (priority, next(self._seq))
+        heapq.heappush(self._waiters, ticket)
+        # A new head must recompute its reservation; wake everyone to re-check
+        self._cond.notify_all()
+        return ticket
+
+    def _cancel(self, ticket: Tuple[int, int]) -> None:
+        """Remove a waiter that gave up. Caller must hold the lock."""
+        if ticket in self._waiters:
+            self._waiters.remove(ticket)
+            heapq.heapify(self._waiters)
+            self._cond.notify_all()
+
+    def _try_take(self, ticket: Tuple[int, int]) -> Optional[float]:
+        """
+        Try to take a token for a queued waiter. Caller must hold the lock.
+
+        Returns:
+            0.0 if the token was taken, seconds until the next token if the waiter
+            is at the head of the queue, or None if other waiters are ahead
+        """
+        if self._waiters[0] != ticket:
+            return None
+        # Refill tokens based on elapsed time
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.rate)
+        self.timestamp = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            heapq.heappop(self._waiters)
+            self._cond.notify_all()
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def _record(self, waited: float) -> None:
+        """Update wait statistics. Caller must hold the lock."""
+        self.acquisitions += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def acquire(self, priority: Optional[int] = None) -> float:
+        """
+        Take one token, blocking until one is available.
+
+        Args:
+            priority: Priority class; defaults to the current request_priority()
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+            try:
+                while True:
+                    delay = self._try_take(ticket)
+                    if delay == 0.0:
+                        break
+                    # wait() releases the lock, so other waiters can queue meanwhile
+                    self._cond.wait(delay)
+            except BaseException:
+                self._cancel(ticket)
+                raise
+            waited = time.monotonic() - start
+            self._record(waited)
+        metrics.observe("limiter_wait", waited, host=self.name)
+        return waited
+
+    async def acquire_async(self, priority: Optional[int] = None) -> float:
+        """
+        Take one token without blocking the event loop.
+
+        Args:
+            priority: Priority class; defaults to the current request_priority()
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try_take(ticket)
+                    if delay == 0.0:
+                        waited = time.monotonic() - start
+                        self._record(waited)
+                        break
+                await asyncio.sleep(ASYNC_POLL_INTERVAL if delay is None else delay)
+        except BaseException:
+            with self._cond:
+                self._cancel(ticket)
+            raise
+        metrics.observe("limiter_wait", waited, host=self.name)
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth and wait-time statistics."""
+        with self._cond:
+            by_priority: Dict[int, int] = {}
+            for priority, _ in self._waiters:
+                by_priority[priority] = by_priority.get(priority, 0) + 1
+            return {
+                "rate": self.rate,
+                "queue_depth": len(self._waiters),
+                "queue_by_priority": by_priority,
+                "acquisitions": self.acquisitions,
+                "total_wait": self.total_wait,
+                "avg_wait": self.total_wait / self.acquisitions if self.acquisitions else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+_host_limiters: Dict[str, TokenBucket] = {}
+_host_limiters_lock = threading.Lock()
+
+def get_host_limiter(host: str) -> TokenBucket:
+    """
+    Get the process-wide limiter for an upstream host.
+
+    All clients talking to the same host share one bucket, so the combined
+    request rate stays within HOST_RATE_LIMITS no matter how many clients exist.
+    """
+    host = (host or "").lower()
+    # Map API subdomains (query1/query2.finance.yahoo.com) onto their configured host
+    configured = next((h for h in HOST_RATE_LIMITS if host == h or host.endswith("." + h)), host)
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(configured)
+        if limiter is None:
+            limiter = TokenBucket(HOST_RATE_LIMITS.get(configured, DEFAULT_MAX_RPS), name=configured)
+            _host_limiters[configured] = limiter
+        return limiter
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Get queue depth and wait statistics for every host limiter."""
+    with _host_limiters_lock:
+        limiters = dict(_host_limiters)
+    return {host: limiter.stats() for host, limiter in limiters.items()}
+
+class HttpClient:
+    def __init__(self) -> None:
+        if not REQUESTS_AVAILABLE:
+            raise ImportError("requests/tenacity/requests_cache required for HTTP client")
+        
+        # Cached session for REST GETs (StockTwits only)
+        self.session = requests_cache.CachedSession(
+            cache_name="http_cache",
+            backend="memory",
+            expire_after=HTTP_CACHE_TTL,
+            allowable_methods=("GET",),
+        )
+        self.session.headers.update({
+            "User-Agent": (
+                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                "Chrome/120.0.0.0 Safari/537.36"
+            )
+        })
+        self._get = tenacity.retry(
+            retry=tenacity.retry_if_exception(is_retryable_error),
+            wait=tenacity.wait_exponential(multiplier=0.8, min=1, max=20),
+            stop=tenacity.stop_after_attempt(5),
+            before_sleep=lambda state: metrics.count("retry", client="http"),
+            reraise=True,
+        )(self._get_once)
+
+    def get(self, url: str, **kwargs) -> "requests.Response":
+        # Identical concurrent GETs share one request
+        key = ("http", url, repr(sorted(kwargs.items())))
+        with metrics.span("http_get", host=urlparse(url).hostname):
+            return _single_flight.do(key, lambda: self._get(url, **kwargs))
+
+    def _get_once(self, url: str, **kwargs) -> "requests.Response":
+        host = urlparse(url).hostname
+        get_host_limiter(host).acquire()
+        resp = self.session.get(url, timeout=REQUEST_TIMEOUT, **kwargs)
+        if getattr(resp, "from_cache", False):
+            metrics.count("cache_hit", cache="http")
+        if resp.status_code == 429:
+            metrics.count("rate_limited", host=host)
+            ra = resp.headers.get("Retry-After")
+            if ra:
+                try:
+                    time.sleep(min(float(ra), 30.0))
+                except ValueError:
+                    time.sleep(3 + random.random())
+            else:
+                time.sleep(2 + random.random())
+            resp.raise_for_status()
+        elif 500 <= resp.status_code < 600:
+            resp.raise_for_status()
+        return resp
+
+# Global HTTP client instance (created on first use, only if REQUESTS_AVAILABLE)
+http_client: Optional[HttpClient] = None
+_http_client_lock = threading.Lock()
+
+def get_http_client() -> Optional[HttpClient]:
+    """Get the shared HTTP client, creating it on first use; None without requests."""
+    global http_client
+    if http_client is None and REQUESTS_AVAILABLE:
+        with _http_client_lock:
+            if http_client is None:
+                try:
+                    http_client = HttpClient()
+                except ImportError:
+                    return None
+    return http_client
+
+# -----------------------------------------------------------------------------
+# YAHOO FINANCE CLIENT
+# -----------------------------------------------------------------------------
+
+@dataclass
+class YahooClient:
+    ticker_symbol: str
+    _ticker: "yf.Ticker" = field(init=False)
+    _cache: Dict[str, Tuple[Any, float]] = field(default_factory=dict, init=False)
+    _limiter: TokenBucket = field(default_factory=lambda: get_host_limiter(YAHOO_HOST), init=False)
+
+    def __post_init__(self) -> None:
+        # IMPORTANT: do NOT pass a requests/session into yf.Ticker now
+        self._ticker = yf.Ticker(self.ticker_symbol)
+
+    def _check_negative(self, endpoint: str) -> None:
+        """Fail fast if this endpoint (or the whole symbol) recently failed permanently."""
+        reason = _negative_cache.get(self.ticker_symbol, endpoint)
+        if reason is not None:
+            metrics.count("cache_hit", cache="negative")
+            raise PermanentDataError(f"{self.ticker_symbol}: {reason}")
+
+    def _record_failure(self, endpoint: str, error: Exception) -> None:
+        """Remember a permanent failure so repeated calls do not reach Yahoo."""
+        if is_retryable_error(error):
+            return
+        metrics.count("permanent_error", endpoint=endpoint)
+        reason = f"{type(error).__name__}: {error}"
+        _negative_cache.add(self.ticker_symbol, NegativeCache.ANY if is_not_found_error(error) else endpoint, reason)
+
+    def _next_earnings(self) -> Optional[pd.Timestamp]:
+        """Get the next earnings date from an already cached calendar (never fetches), None if unknown."""
+        cached = self._cache.get("calendar")
+        if cached is None:
+            return None
+        earnings_date = _calendar_earnings_date(cached[0])
+        return pd.Timestamp(earnings_date) if earnings_date is not None else None
+
+    def _ttl(self, kind: str) -> float:
+        """Get the cache lifetime of a response of the given kind (see cache_ttl)."""
+        next_earnings = self._next_earnings() if kind == "financials" else None
+        return cache_ttl(self.ticker_symbol, kind, next_earnings=next_earnings)
+
+    def _throttled(self, fn_name: str, kind: str, call) -> Any:
+        cached = self._cache.get(fn_name)
+        if cached is not None and time.time() < cached[1]:
+            metrics.count("cache_hit", cache="yahoo")
+            return cached[0]
+        self._check_negative(fn_name)
+        metrics.count("cache_miss", cache="yahoo")
+
+        def fetch():
+            # Span covers limiter wait + download (limiter_wait is also reported on its own)
+            with metrics.span("yahoo", endpoint=fn_name.split(":", 1)[0]):
+                try:
+                    val = call()
+                except Exception as e:
+                    self._record_failure(fn_name, e)
+                    raise
+            self._cache[fn_name] = (val, time.time() + self._ttl(kind))
+            return val
+
+        # Callers racing on the same endpoint share one download
+        return _single_flight.do((self.ticker_symbol, fn_name), fetch)
+
+    def _retryable(self, func, *args, **kwargs):
+        # Only transient failures (429, 5xx, timeouts) are retried; permanent ones fail at once
+        def wrapped():
+            # Every attempt takes a token (we can't inject a session into yfinance),
+            # so retries after a 429 or 5xx stay under the shared host limit
+            self._limiter.acquire()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                # yfinance surfaces 429s and rate messages as generic Exceptions
+                msg = str(e).lower()
+                if "too many requests" in msg or "rate limit" in msg or "429" in msg:
+                    metrics.count("rate_limited", host=YAHOO_HOST)
+                    time.sleep(1.5 + random.random())
+                raise
+
+        if not TENACITY_AVAILABLE:
+            return _retry_without_tenacity(wrapped, attempts=6, client="yahoo")
+        return tenacity.retry(
+            retry=tenacity.retry_if_exception(is_retryable_error),
+            wait=tenacity.wait_exponential(multiplier=0.8, min=1, max=20),
+            stop=tenacity.stop_after_attempt(6),
+            before_sleep=lambda state: metrics.count("retry", client="yahoo"),
+            reraise=True,
+        )(wrapped)()
+
+    # Prefer fast_info: lighter-weight
+    def fast_info(self) -> Dict[str, Any]:
+        return self._throttled(
+            "fast_info", "quote",
+            lambda: self._retryable(lambda: dict(self._ticker.fast_info or {}))
+        )
+
+    # info carries price-driven fields (52W High/Low, marketCap, trailingPE), so it
+    # expires like daily bars rather than waiting for the next earnings date
+    def info(self) -> Dict[str, Any]:
+        return self._throttled("info", "bars", lambda: self._retryable(lambda: dict(self._ticker.get_info() or {})))
+
+    @staticmethod
+    def _history_key(kwargs: Dict[str, Any]) -> str:
+        """Cache key for history(**kwargs), independent of keyword order."""
+        return f"history:{sorted(kwargs.items())!r}"
+
+    def history(self, **kwargs) -> pd.DataFrame:
+        key = self._history_key(kwargs)
+        kind = "quote" if kwargs.get("period") == "1d" else "bars"
+        return self._throttled(key, kind, lambda: self._retryable(self._ticker.history, **kwargs))
+
+    def seed_history(self, df: pd.DataFrame, **kwargs) -> None:
+        """
+        Cache history loaded elsewhere (e.g. by bulk_download_history) as the
+        response to history(**kwargs).
+        """
+        self._cache[self._history_key(kwargs)] = (df, time.time() + self._ttl("bars"))
+
+    def download_history(self, **kwargs) -> pd.DataFrame:
+        # Throttled but not cached: chart history has its own cache and store
+        self._check_negative("download_history")
+
+        def fetch():
+            with metrics.span("yahoo", endpoint="download_history"):
+                try:
+                    return self._retryable(self._ticker.history, **kwargs)
+                except Exception as e:
+                    self._record_failure("download_history", e)
+                    raise
+
+        key = (self.ticker_symbol, "download_history", repr(sorted(kwargs.items())))
+        return _single_flight.do(key, fetch)
+
+    def quarterly_financials(self) -> pd.DataFrame:
+        return self._throttled(
+            "quarterly_financials", "financials",
+            lambda: self._retryable(lambda: self._ticker.quarterly_financials)
+        )
+
+    def options(self) -> List[str]:
+        return self._throttled("options", "reference", lambda: self._retryable(lambda: list(self._ticker.options or [])))
+
+    def option_chain(self, expiration: str):
+        key = f"option_chain:{expiration}"
+        return self._throttled(key, "quote", lambda: self._retryable(self._ticker.option_chain, expiration))
+
+    def calendar(self) -> Any:
+        return self._throttled("calendar", "reference", lambda: self._retryable(lambda: self._ticker.calendar))
+
+    def earnings_dates(self, limit: int = 12) -> Optional[pd.DataFrame]:
+        key = f"earnings_dates:{limit}"
+        return self._throttled(key, "reference", lambda: self._retryable(self._ticker.get_earnings_dates, limit=limit))
+
+class YahooClientRegistry:
+    """
+    Process-wide LRU registry of YahooClient instances.
+
+    Every analysis function asks the registry for its ticker's client, so
+    responses cached by one function (quarterly financials, info, ...) are
+    reused by the others and by repeated analyses of the same symbol. The
+    least recently used clients, with their cached responses, are dropped
+    once max_clients is exceeded.
+    """
+
+    def __init__(self, max_clients: int = YAHOO_CLIENT_REGISTRY_SIZE):
+        self.clients: "OrderedDict[str, YahooClient]" = OrderedDict()
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+
+    def get(self, ticker_symbol: str) -> YahooClient:
+        """Get the shared client for a ticker, creating it on first use."""
+        key = ticker_symbol.upper()
+        with self._lock:
+            client = self.clients.get(key)
+            if client is not None:
+                self.clients.move_to_end(key)
+                return client
+            client = YahooClient(key)
+            self.clients[key] = client
+            while len(self.clients) > self.max_clients:
+                self.clients.popitem(last=False)
+            return client
+
+    def clear(self) -> None:
+        """Drop every client and its cached responses."""
+        with self._lock:
+            self.clients.clear()
+
+# Global client registry instance
+_yahoo_clients = YahooClientRegistry()
+
+def get_yahoo_client(ticker_symbol: str) -> YahooClient:
+    """Get the shared YahooClient for a ticker."""
+    return _yahoo_clients.get(ticker_symbol)
+
+# -----------------------------------------------------------------------------
+# FUNDAMENTAL ANALYSIS FUNCTIONS
+# -----------------------------------------------------------------------------
+
+def fundamental_score(
+    data: Dict[str, Any],
+    positive_growth_pct: Optional[float],
+    earnings_date: Optional[str],
+) -> Dict[str, Any]:
+    """
+    Evaluate fundamentals across 5 pillars and return a detailed result dict:
+      {
+        'status': 'PASS'|'FAIL',
+        'score': int,
+        'required': int,
+        'pillars': {
+            'profitability': {'pass': bool, 'reason': str},
+            'growth':        {'pass': bool, 'reason': str},
+            'balance_sheet': {'pass': bool, 'reason': str},
+            'market_pos':    {'pass': bool, 'reason': str},
+            'forward':       {'pass': bool, 'reason': str},
+        }
+      }
+    """
+    pillars: Dict[str, Dict[str, Any]] = {}
+
+    # ----- Profitability -----
+    pm = data.get("profit_margin")
+    om = data.get("operating_margin")
+    profit_ok = (pm or 0) >= MIN_PROFIT_MARGIN and (om or 0) >= MIN_OPER_MARGIN
+    pillars["profitability"] = {
+        "pass": profit_ok,
+        "reason": (
+            f"Profit margin={pm:.2%} (≥{MIN_PROFIT_MARGIN:.0%}) and "
+            f"Operating margin={om:.2%} (≥{MIN_OPER_MARGIN:.0%})"
+            if pm is not None and om is not None else
+            "Missing profitability data"
+        )
+    }
+
+    # ----- Growth -----
+    qtr_growth = data.get("quarterly_revenue_change")
+    pos_qtrs = positive_growth_pct if positive_growth_pct is not None else 0.0
+    growth_ok = ((qtr_growth or 0) >= MIN_QTR_REV_GROWTH) or (pos_qtrs >= MIN_POSITIVE_QTRS)
+    pillars["growth"] = {
+        "pass": growth_ok,
+        "reason": (
+            f"QoQ revenue change={ (qtr_growth or 0):.2%} (≥{MIN_QTR_REV_GROWTH:.0%}) "
+            f"or Positive quarters={pos_qtrs:.1f}% (≥{MIN_POSITIVE_QTRS:.0f}%)"
+        )
+    }
+
+    # ----- Balance Sheet -----
+    rev = data.get("revenue")
+    debt = data.get("total_debt")
+    ocf = data.get("operating_cash_flow")
+    rev_debt = (rev / debt) if (rev is not None and debt not in (None, 0)) else None
+    ocf_debt = (ocf / debt) if (ocf is not None and debt not in (None, 0)) else None
+    bs_ok = (
+        (rev_debt is not None and rev_debt >= MIN_REV_TO_DEBT) and
+        (ocf_debt is not None and ocf_debt >= MIN_OCF_TO_DEBT)
+    )
+    pillars["balance_sheet"] = {
+        "pass": bs_ok,
+        "reason": (
+            f"Revenue/Debt={rev_debt:.2f} (≥{MIN_REV_TO_DEBT:.2f}) and "
+            f"OCF/Debt={ocf_debt:.2f} (≥{MIN_OCF_TO_DEBT:.2f})"
+            if rev_debt is not None and ocf_debt is not None else
+            "Missing leverage/coverage data"
+        )
+    }
+
+    # ----- Market Position -----
+    price = data.get("current_price")
+    high_52 = data.get("high_52")
+    decline = ((high_52 - price) / high_52) if (price not in (None, 0) and high_52 not in (None, 0)) else None
+    market_ok = (decline is not None) and (decline <= MAX_DECLINE_FROM_HIGH)
+    pillars["market_pos"] = {
+        "pass": market_ok,
+        "reason": (
+            f"Decline from 52w high={decline:.1%} (≤{MAX_DECLINE_FROM_HIGH:.0%})"
+            if decline is not None else
+            "Missing price/high_52 to compute decline"
+        )
+    }
+
+    # ----- Forward Outlook -----
+    forward_ok = bool(earnings_date)
+    pillars["forward"] = {
+        "pass": forward_ok,
+        "reason": "Upcoming earnings date available" if forward_ok else "No upcoming earnings date"
+    }
+
+    score = sum(1 for p in pillars.values() if p["pass"])
+    status = "PASS" if score >= REQUIRED_PASS_COUNT else "FAIL"
+
+    return {
+        "status": status,
+        "score": score,
+        "required": REQUIRED_PASS_COUNT,
+        "pillars": pillars,
+    }
+
+def fetch_company_data(ticker_symbol: str) -> Dict[str, Any]:
+    """
+    Uses fast_info + 1y history for robust 52w stats; guarded fundamentals.
+    """
+    yh = get_yahoo_client(ticker_symbol)
+    data: Dict[str, Any] = {}
+
+    # ---- Prices via fast_info ----
+    finfo = yh.fast_info()  # keys often: last_price, year_high, year_low
+    current_price = finfo.get("last_price")
+    if current_price is None:
+        hist_1d = yh.history(period="1d")
+        current_price = hist_1d["Close"].iloc[-1] if not hist_1d.empty else None
+    data["current_price"] = current_price
+
+    # ---- Robust 52w hi/lo + change from 1y history (works even when fast_info misses) ----
+    try:
+        h1y = yh.history(period="1y", interval="1d")
+        closes = h1y["Close"].dropna() if not h1y.empty else pd.Series(dtype=float)
+        if len(closes) >= 2:
+            data["high_52"] = float(closes.max())
+            data["low_52"]  = float(closes.min())
+            first = float(closes.iloc[0])
+            last  = float(closes.iloc[-1])
+            data["week_52_change"] = (last / first - 1.0) if first > 0 else None
+        else:
+            # fall back to fast_info when history is too short
+            data["high_52"] = finfo.get("year_high")
+            data["low_52"]  = finfo.get("year_low")
+            data["week_52_change"] = None
+    except Exception:
+        data["high_52"] = finfo.get("year_high")
+        data["low_52"]  = finfo.get("year_low")
+        data["week_52_change"] = None
+
+    # ---- Quarterly revenue change ----
+    profit_margin = None
+    operating_margin = None
+    revenue = None
+    total_debt = None
+    operating_cash_flow = None
+
+    try:
+        q_fin = yh.quarterly_financials()
+        if isinstance(q_fin, pd.DataFrame) and "Total Revenue" in q_fin.index:
+            revenues = pd.to_numeric(q_fin.loc["Total Revenue"], errors="coerce").dropna()
+            if len(revenues) >= 2:
+                data["quarterly_revenue_change"] = (revenues.iloc[0] - revenues.iloc[1]) / revenues.iloc[1]
+            else:
+                data["quarterly_revenue_change"] = None
+        else:
+            data["quarterly_revenue_change"] = None
+    except Exception:
+        data["quarterly_revenue_change"] = None
+
+    # ---- Heavy fundamentals: try once; swallow on fail ----
+    try:
+        finfo_heavy = yh.info()
+        profit_margin       = finfo_heavy.get("profitMargins")
+        operating_margin    = finfo_heavy.get("operatingMargins")
+        revenue             = finfo_heavy.get("totalRevenue")
+        total_debt          = finfo_heavy.get("totalDebt")
+        operating_cash_flow = finfo_heavy.get("operatingCashflow")
+    except Exception:
+        pass
+
+    data["profit_margin"]       = profit_margin
+    data["operating_margin"]    = operating_margin
+    data["revenue"]             = revenue
+    data["total_debt"]          = total_debt
+    data["operating_cash_flow"] = operating_cash_flow
+
+    return data
+
+def get_social_sentiment(ticker_symbol: str):
+    """
+    Fetches recent messages from StockTwits for the given ticker symbol
+    and computes a simple sentiment ratio.
+    Returns (bullish_ratio, bullish_count, bearish_count)
+    """
+    client = get_http_client()
+    if client is None:
+        return None, 0, 0
+        
+    url = f"https://api.stocktwits.com/api/2/streams/symbol/{ticker_symbol}.json"
+    try:
+        response = client.get(url, expire_after=cache_ttl(ticker_symbol, "sentiment"))
+        if response.status_code != 200:
+            print(f"Error fetching social sentiment: Received status code {response.status_code}")
+            return None, 0, 0
+
+        if not response.text.strip():
+            print("Error fetching social sentiment: Response is empty.")
+            return None, 0, 0
+
+        data = response.json()
+        messages = data.get("messages", [])
+        bullish_count = 0
+        bearish_count = 0
+        for msg in messages:
+            sentiment = msg.get("entities", {}).get("sentiment", {})
+            if sentiment:
+                basic = sentiment.get("basic")
+                if basic == "Bullish":
+                    bullish_count += 1
+                elif basic == "Bearish":
+                    bearish_count += 1
+        total = bullish_count + bearish_count
+        if total > 0:
+            bullish_ratio = bullish_count / total
+            return bullish_ratio, bullish_count, bearish_count
+        else:
+            return None, 0, 0
+    except Exception as e:
+        print("Error fetching social sentiment:", e)
+        return None, 0, 0
+
+def compute_positive_quarterly_revenue_growth(ticker_symbol: str) -> Optional[float]:
+    """
+    Computes the percentage of quarters (in the past 5 years) with positive revenue growth.
+    Returns this percentage as a float, or None on failure.
+    """
+    yh = get_yahoo_client(ticker_symbol)
+    try:
+        q_fin = yh.quarterly_financials()
+        if not (isinstance(q_fin, pd.DataFrame) and "Total Revenue" in q_fin.index):
+            print("Total Revenue not found in quarterly financials.")
+            return None
+
+        # Convert revenue series to numeric to avoid dtype issues
+        revenue_series = q_fin.loc["Total Revenue"]
+        revenue_series = pd.to_numeric(revenue_series, errors='coerce')
+        revenue_series = revenue_series.sort_index()
+
+        pct_change = revenue_series.pct_change()
+        cutoff = pd.Timestamp.today() - pd.DateOffset(years=5)
+        try:
+            pct_change.index = pd.to_datetime(pct_change.index)
+        except Exception:
+            pass
+
+        pct_change = pct_change[pct_change.index >= cutoff]
+        total_quarters = pct_change.count()
+        if total_quarters == 0:
+            return None
+        positive_quarters = (pct_change > 0).sum()
+        percent_positive = positive_quarters / total_quarters * 100
+        return float(percent_positive)
+    except Exception as e:
+        print("Error computing quarterly revenue growth:", e)
+        return None
+
+def _calendar_earnings_date(cal: Any) -> Any:
+    """Get the first "Earnings Date" from a yfinance calendar (dict or DataFrame), None if absent."""
+    if isinstance(cal, dict):
+        if "Earnings Date" in cal and cal["Earnings Date"]:
+            return cal["Earnings Date"][0]
+    elif hasattr(cal, "empty") and not cal.empty:
+        if "Earnings Date" in cal.index:
+            return cal.loc["Earnings Date"].values[0]
+    return None
+
+def get_upcoming_earnings_call(ticker_symbol: str) -> Optional[str]:
+    """
+    Fetch upcoming earnings date using yfinance (no external session).
+    Returns YYYY-MM-DD or None.
+    """
+    yh = get_yahoo_client(ticker_symbol)
+    try:
+        earnings_date = _calendar_earnings_date(yh.calendar())
+        if not earnings_date:
+            ed = yh.earnings_dates(limit=5)
+            if hasattr(ed, "empty") and not ed.empty:
+                # Newer yfinance returns the dates as the index rather than a column
+                dates = ed["Earnings Date"] if "Earnings Date" in ed else ed.index.to_series()
+                dates = pd.to_datetime(dates)
+                if dates.dt.tz is not None:
+                    dates = dates.dt.tz_localize(None)
+                future_dates = dates[dates >= pd.Timestamp.today()].sort_values()
+                if not future_dates.empty:
+                    earnings_date = future_dates.iloc[0]
+
+        if earnings_date is not None:
+            if hasattr(earnings_date, 'strftime'):
+                return earnings_date.strftime("%Y-%m-%d")
+            return pd.to_datetime(earnings_date).strftime("%Y-%m-%d")
+        return None
+    except Exception as e:
+        print("Error fetching earnings call date:", e)
+        return None
+
+def filter_call_strikes(calls: pd.DataFrame, current_price: float,
+                        strike_range: float = OPTION_STRIKE_RANGE) -> pd.DataFrame:
+    """
+    Select the calls struck between the current price and strike_range above it.
+
+    Args:
+        calls: Option chain calls with a "strike" column
+        current_price: Current price of the underlying
+        strike_range: Width of the strike window in dollars
+
+    Returns:
+        The matching rows of calls (bounds inclusive)
+    """
+    strikes = calls["strike"].to_numpy()
+    upper = current_price + strike_range
+    # Yahoo returns chains sorted by strike: slice instead of building a mask
+    if len(strikes) > 1 and np.all(strikes[1:] >= strikes[:-1]):
+        return calls.iloc[np.searchsorted(strikes, current_price, "left"):np.searchsorted(strikes, upper, "right")]
+    return calls[(strikes >= current_price) & (strikes <= upper)]
+
+def evaluate_options(ticker_symbol: str, current_price: float, high_52: Optional[float]) -> Dict[str, Any]:
+    """
+    Checks the options chain for two expiration dates:
+      - The expiration nearest to the end of the current year.
+      - The first expiration in the new year.
+    For each expiration, filters call options to show only those with strike prices
+    at or up to OPTION_STRIKE_RANGE dollars above the current stock price.
+    Returns a dictionary with options data.
+    """
+    try:
+        yh = get_yahoo_client(ticker_symbol)
+        expirations = yh.options()
+        
+        if not expirations:
+            return {"error": "No options available for this ticker."}
+    except Exception as e:
+        return {"error": f"Error fetching options: {e}"}
+
+    # Convert expiration strings to datetime objects
+    exp_dates = []
+    for exp in expirations:
+        try:
+            dt = pd.to_datetime(exp)
+            exp_dates.append((exp, dt))
+        except Exception:
+            continue
+
+    # Separate expirations into those in the current year and next year
+    current_year = datetime.today().year
+    current_year_exps = [exp for exp, dt in exp_dates if dt.year == current_year]
+    next_year_exps = [exp for exp, dt in exp_dates if dt.year == current_year + 1]
+
+    # Choose the expiration nearest the end of the current year (if available)
+    exp_current = max(current_year_exps) if current_year_exps else None
+    # Choose the first expiration in the new year (if available)
+    exp_next = max(next_year_exps) if next_year_exps else None
+
+    result = {
+        "current_price": current_price,
+        "strike_range": f"{current_price:.2f} - {current_price + OPTION_STRIKE_RANGE:.2f}",
+        "expirations": {}
+    }
+
+    def process_expiration(expiration: str):
+        try:
+            chain = yh.option_chain(expiration)
+            filtered = filter_call_strikes(chain.calls, current_price)
+            
+            if not filtered.empty:
+                options_data = filtered[OPTION_COLUMNS].to_dict('records')
+                result["expirations"][expiration] = {
+                    "options": options_data,
+                    "count": len(filtered)
+                }
+            else:
+                result["expirations"][expiration] = {
+                    "options": [],
+                    "count": 0
+                }
+        except Exception as e:
+            result["expirations"][expiration] = {
+                "error": str(e),
+                "options": [],
+                "count": 0
+            }
+
+    if exp_current:
+        result["expirations"]["current_year"] = {"expiration": exp_current}
+        process_expiration(exp_current)
+    else:
+        result["expirations"]["current_year"] = {"error": "No expiration dates available in the current year."}
+
+    if exp_next:
+        result["expirations"]["next_year"] = {"expiration": exp_next}
+        process_expiration(exp_next)
+    else:
+        result["expirations"]["next_year"] = {"error": "No expiration dates available in the new year."}
+
+    return result
+
+# -----------------------------------------------------------------------------
+# FUNDAMENTAL PIPELINE
+# -----------------------------------------------------------------------------
+
+_pipeline_executor = ThreadPoolExecutor(max_workers=PIPELINE_MAX_WORKERS, thread_name_prefix="pipeline")
+
+def _submit_stage(name: str, timings: Dict[str, float], func, *args) -> Tuple[Future, float]:
+    """Start a pipeline stage on the shared pool, recording how long it runs."""
+    def timed():
+        start = time.monotonic()
+        try:
+            with metrics.span("stage", stage=name):
+                return func(*args)
+        finally:
+            timings[name] = time.monotonic() - start
+
+    # Carry the caller's limiter priority into the worker thread
+    ctx = contextvars.copy_context()
+    return _pipeline_executor.submit(ctx.run, timed), time.monotonic()
+
+def _stage_result(name: str, stage: Tuple[Future, float], default: Any = None) -> Any:
+    """Wait for a stage until its deadline; return default on timeout or failure."""
+    future, started = stage
+    remaining = max(0.0, started + STAGE_TIMEOUTS[name] - time.monotonic())
+    try:
+        return future.result(timeout=remaining)
+    except FuturesTimeoutError:
+        print(f"Warning: {name} stage timed out after {STAGE_TIMEOUTS[name]:.0f}s")
+    except Exception as e:
+        print(f"Warning: {name} stage failed: {e}")
+    return default
+
+def run_fundamental_pipeline(ticker_symbol: str) -> Dict[str, Any]:
+    """
+    Fetch every fundamental input for a ticker concurrently.
+
+    Company data, social sentiment, revenue growth and the earnings date are
+    independent and start together; the options chain starts as soon as company
+    data provides the current price. Yahoo and StockTwits calls still go through
+    their host limiters, so the wall-clock time approaches the slowest branch.
+
+    Returns:
+        Dict with fundamental_data, social_sentiment, positive_growth_percent,
+        earnings_date, fundamental_score, options_data and per-stage timings
+    """
+    timings: Dict[str, float] = {}
+    start = time.monotonic()
+
+    company = _submit_stage("company", timings, fetch_company_data, ticker_symbol)
+    sentiment = _submit_stage("sentiment", timings, get_social_sentiment, ticker_symbol)
+    growth = _submit_stage("growth", timings, compute_positive_quarterly_revenue_growth, ticker_symbol)
+    earnings = _submit_stage("earnings", timings, get_upcoming_earnings_call, ticker_symbol)
+
+    fundamental_data = _stage_result("company", company)
+
+    options_data = None
+    options = None
+    if fundamental_data and fundamental_data.get('current_price') and fundamental_data.get('high_52'):
+        options = _submit_stage(
+            "options", timings, evaluate_options,
+            ticker_symbol, fundamental_data['current_price'], fundamental_data.get('high_52')
+        )
+
+    social_sentiment = _stage_result("sentiment", sentiment)
+    positive_growth_percent = _stage_result("growth", growth)
+    earnings_date = _stage_result("earnings", earnings)
+    if options is not None:
+        options_data = _stage_result("options", options)
+
+    score = None
+    if fundamental_data:
+        score = fundamental_score(fundamental_data, positive_growth_percent, earnings_date)
+
+    timings["total"] = time.monotonic() - start
+    stage_text = ", ".join(f"{name} {secs:.2f}s" for name, secs in timings.items() if name != "total")
+    print(f"Fundamental pipeline for {ticker_symbol}: {timings['total']:.2f}s ({stage_text})")
+
+    return {
+        "fundamental_data": fundamental_data,
+        "social_sentiment": social_sentiment,
+        "positive_growth_percent": positive_growth_percent,
+        "earnings_date": earnings_date,
+        "fundamental_score": score,
+        "options_data": options_data,
+        "timings": timings,
+    }
+
+def analyze_symbol(symbol: str) -> Dict[str, Any]:
+    """
+    Run the non-UI part of an Analyze click for one symbol.
+
+    Probes 5 days of prices to validate the symbol, loads the company info
+    and runs the fundamental pipeline. Everything goes through the shared,
+    rate-limited clients, so the call can be timed end to end (e.g. against
+    recorded responses, see provider_replay.py).
+
+    Returns:
+        run_fundamental_pipeline's dict plus "stock_info"
+
+    Raises:
+        StockDataError: If Yahoo has no recent prices for the symbol (also
+            PermanentDataError when that was already found out recently)
+    """
+    yh = get_yahoo_client(symbol)
+    test_data = yh.history(period="5d")
+    if test_data.empty:
+        # yfinance returns an empty frame for unknown symbols; remember that for a while
+        _negative_cache.add(symbol, NegativeCache.ANY, "no price data found")
+        raise StockDataError(f"No price data found for symbol: {symbol}")
+
+    try:
+        stock_info = yh.info()
+    except Exception:
+        stock_info = {}
+
+    results = run_fundamental_pipeline(symbol)
+    results["stock_info"] = stock_info
+    return results
+
+# -----------------------------------------------------------------------------
+# BAR RESAMPLING
+# -----------------------------------------------------------------------------
+
+def choose_bar_size(df: pd.DataFrame) -> str:
+    """
+    Pick a candle size for the visible span so the chart stays a few hundred bars.
+
+    Returns:
+        One of the BAR_SIZES keys ("D", "W", "M", "Q")
+    """
+    if len(df) < 2:
+        return "D"
+    span_days = (df.index[-1] - df.index[0]).days
+    for max_days, bar_size in BAR_SIZE_SPANS:
+        if span_days <= max_days:
+            return bar_size
+    return "Q"
+
+def _bar_group_keys(index: pd.DatetimeIndex, bar_size: str) -> np.ndarray:
+    """Integer key per row that is constant within one weekly/monthly/quarterly bar."""
+    # Group on exchange-local calendar dates, not UTC
+    local = index.tz_localize(None) if index.tz is not None else index
+    if bar_size == "W":
+        week_start = local.normalize() - pd.to_timedelta(local.dayofweek, unit="D")
+        return np.asarray(week_start.asi8)
+    if bar_size == "M":
+        return np.asarray(local.year * 12 + local.month)
+    if bar_size == "Q":
+        return np.asarray(local.year * 4 + (local.month - 1) // 3)
+    raise ValueError(f"Unsupported bar size: {bar_size}")
+
+def aggregate_ohlcv(df: pd.DataFrame, starts: np.ndarray) -> pd.DataFrame:
+    """
+    Collapse consecutive rows into OHLCV bars.
+
+    Args:
+        df: OHLCV data sorted by date
+        starts: Sorted row positions where each new bar begins (first must be 0)
+
+    Returns:
+        One row per bar, labelled with the date of its first row
+    """
+    ends = np.append(starts[1:], len(df)) - 1
+    high = df["High"].to_numpy(dtype=np.float64)
+    low = df["Low"].to_numpy(dtype=np.float64)
+    volume = np.nan_to_num(df["Volume"].to_numpy(dtype=np.float64))
+    return pd.DataFrame({
+        "Open": df["Open"].to_numpy(dtype=np.float64)[starts],
+        "High": np.fmax.reduceat(high, starts),
+        "Low": np.fmin.reduceat(low, starts),
+        "Close": df["Close"].to_numpy(dtype=np.float64)[ends],
+        "Volume": np.add.reduceat(volume, starts),
+    }, index=df.index[starts])
+
+def resample_ohlcv(df: pd.DataFrame, bar_size: str) -> pd.DataFrame:
+    """
+    Build weekly, monthly or quarterly candles from daily bars.
+
+    Bar boundaries are found with one vectorized comparison of group keys and
+    each column is reduced with ufunc.reduceat, so the cost is linear in the
+    number of daily rows.
+
+    Args:
+        df: Daily OHLCV data sorted by date
+        bar_size: One of the BAR_SIZES keys; "D" returns df unchanged
+
+    Returns:
+        Resampled OHLCV DataFrame
+    """
+    if bar_size == "D" or df.empty:
+        return df
+    keys = _bar_group_keys(df.index, bar_size)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return aggregate_ohlcv(df, starts)
+
+# -----------------------------------------------------------------------------
+# CHART DOWNSAMPLING
+# -----------------------------------------------------------------------------
+
+def lttb_select(y: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets point selection over fixed buckets.
+
+    For each bucket keeps the point forming the largest triangle with the
+    point kept from the previous bucket and the average of the next bucket,
+    which preserves peaks and troughs far better than striding. Buckets are
+    given explicitly so every overlay lines up with the OHLC candle buckets.
+
+    Args:
+        y: Line values (NaN allowed, e.g. the warm-up of a moving average)
+        starts: Sorted row positions where each bucket begins (first must be 0)
+
+    Returns:
+        One selected row position per bucket
+    """
+    n = y.size
+    ends = np.append(starts[1:], n)
+    picks = np.empty(len(starts), dtype=np.int64)
+    prev_x, prev_y = 0.0, y[0]
+
+    for k, (lo, hi) in enumerate(zip(starts, ends)):
+        if k + 1 < len(starts):
+            next_seg = y[ends[k]:ends[k + 1]]
+            next_valid = next_seg[~np.isnan(next_seg)]
+            next_x = (ends[k] + ends[k + 1] - 1) / 2.0
+            next_y = next_valid.mean() if next_valid.size else np.nan
+        else:
+            next_x, next_y = float(hi - 1), y[hi - 1]
+
+        xs = np.arange(lo, hi, dtype=np.float64)
+        ys = y[lo:hi]
+        area = np.abs((prev_x - next_x) * (ys - prev_y) - (prev_x - xs) * (next_y - prev_y))
+        if np.isnan(area).all():
+            # No usable triangle (line not started yet): keep the latest real value
+            valid = np.flatnonzero(~np.isnan(ys))
+            pick = lo + (int(valid[-1]) if valid.size else 0)
+        else:
+            pick = lo + int(np.nanargmax(area))
+
+        picks[k] = pick
+        prev_x, prev_y = float(pick), y[pick]
+    return picks
+
+def downsample_chart(df: pd.DataFrame, overlays: List[Tuple[Any, Dict[str, Any]]],
+                     max_points: int) -> Tuple[pd.DataFrame, List[Tuple[Any, Dict[str, Any]]]]:
+    """
+    Reduce candles and overlay lines to at most max_points.
+
+    Candles are merged into equal-count OHLC buckets (high/low keep the visual
+    extremes) and every overlay picks one LTTB point from the same buckets, so
+    all series stay aligned with the candles.
+
+    Args:
+        df: OHLCV data to plot
+        overlays: (series, plot kwargs) pairs with one value per row of df
+        max_points: Maximum number of candles/points to draw
+
+    Returns:
+        (candles, overlays) ready to plot; the inputs if no reduction is needed
+    """
+    n = len(df)
+    if max_points <= 0 or n <= max_points:
+        return df, overlays
+
+    starts = np.unique(np.linspace(0, n, max_points, endpoint=False).astype(np.int64))
+    candles = aggregate_ohlcv(df, starts).rename_axis(df.index.name)
+    reduced = []
+    for data, kwargs in overlays:
+        y = np.asarray(data, dtype=np.float64)
+        reduced.append((y[lttb_select(y, starts)], kwargs))
+    return candles, reduced
+
+# -----------------------------------------------------------------------------
+# NUMPY INDICATOR KERNELS
+# -----------------------------------------------------------------------------
+
+def _rolling_extreme(values: np.ndarray, window: int, ufunc: np.ufunc) -> np.ndarray:
+    """
+    Rolling min/max with min_periods=1 that skips NaN, like pandas rolling.
+
+    Uses the van Herk/Gil-Werman scheme: per-block prefix and suffix extremes
+    let every full window be answered with one comparison, so the cost is O(n)
+    regardless of the window length.
+
+    Args:
+        values: Input series
+        window: Window length in bars
+        ufunc: np.fmin or np.fmax (the NaN-ignoring variants)
+    """
+    v = np.ascontiguousarray(values, dtype=np.float64)
+    n = v.size
+    out = np.empty(n, dtype=np.float64)
+    # The first window-1 bars use every bar so far
+    head = min(window - 1, n)
+    out[:head] = ufunc.accumulate(v[:head])
+    if n < window:
+        return out
+
+    pad = (-n) % window
+    blocks = np.concatenate([v, np.full(pad, np.nan)]).reshape(-1, window)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    # Window [i, i+window-1] = suffix of i's block combined with prefix up to the window end
+    out[window - 1:] = ufunc(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+def rolling_min_kernel(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling minimum with min_periods=1 on a float64 array."""
+    return _rolling_extreme(values, window, np.fmin)
+
+def rolling_max_kernel(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling maximum with min_periods=1 on a float64 array."""
+    return _rolling_extreme(values, window, np.fmax)
+
+def _rolling_mean_kernel(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling mean with min_periods=1 for an array without NaN."""
+    n = values.size
+    out = np.empty(n, dtype=np.float64)
+    head = min(window - 1, n)
+    out[:head] = np.cumsum(values[:head]) / np.arange(1, head + 1)
+    if n >= window:
+        # Summing each window directly (one shifted slice per lag) avoids the
+        # cancellation error a global cumsum would accumulate over long series
+        sums = values[:n - window + 1].copy()
+        for lag in range(1, window):
+            sums += values[lag:n - window + 1 + lag]
+        out[window - 1:] = sums / window
+    return out
+
+def rsi_kernel(close: np.ndarray, window: int = RSI_WINDOW) -> np.ndarray:
+    """RSI with simple rolling gain/loss averages, matching calculate_indicators."""
+    c = np.ascontiguousarray(close, dtype=np.float64)
+    delta = np.empty_like(c)
+    delta[:1] = np.nan
+    np.subtract(c[1:], c[:-1], out=delta[1:])
+    # NaN differences compare False and count as neither gain nor loss
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    rs = _rolling_mean_kernel(gain, window) / (_rolling_mean_kernel(loss, window) + 1e-10)
+    return 100 - (100 / (1 + rs))
+
+def _nan_reduce(values: np.ndarray, func) -> float:
+    """Apply a reduction to the non-NaN values, or return NaN if there are none."""
+    valid = values[~np.isnan(values)]
+    return float(func(valid)) if valid.size else np.nan
+
+def ma_column(kind: str, period: int) -> str:
+    """Column name of a moving average in the indicator frame, e.g. "SMA_50"."""
+    return f"{kind}_{period}"
+
+def sma_bank_kernel(close: np.ndarray, periods: List[int]) -> np.ndarray:
+    """
+    Simple moving averages for several periods from one cumulative sum.
+
+    Matches close.rolling(period).mean(): a window with any NaN is NaN.
+
+    Returns:
+        Array of shape (len(periods), len(close))
+    """
+    n = close.size
+    out = np.full((len(periods), n), np.nan)
+    valid = ~np.isnan(close)
+    if not valid.any():
+        return out
+    # Offsetting by one price keeps the running sum small, limiting rounding
+    offset = close[valid][0]
+    csum = np.concatenate(([0.0], np.cumsum(np.where(valid, close - offset, 0.0))))
+    ccount = np.concatenate(([0], np.cumsum(valid)))
+    for i, period in enumerate(periods):
+        if period > n:
+            continue
+        window_sum = csum[period:] - csum[:-period]
+        full = (ccount[period:] - ccount[:-period]) == period
+        out[i, period - 1:] = np.where(full, window_sum / period + offset, np.nan)
+    return out
+
+def ema_bank_kernel(close: np.ndarray, periods: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exponential moving averages (span=period) for several periods.
+
+    Matches close.ewm(span=period, adjust=False, ignore_na=True,
+    min_periods=period).mean().
+
+    Returns:
+        (values of shape (len(periods), len(close)), unmasked EMA at every bar
+        of the same shape, needed to continue the recursion incrementally)
+    """
+    series = pd.Series(close)
+    raw = np.vstack([series.ewm(span=period, adjust=False, ignore_na=True).mean().to_numpy()
+                     for period in periods]) if close.size else np.empty((len(periods), 0))
+    counts = np.cumsum(~np.isnan(close))
+    out = np.where(counts[None, :] >= np.asarray(periods)[:, None], raw, np.nan)
+    return out, raw
+
+def base_price_kernel(low: np.ndarray, close: np.ndarray,
+                      support: Optional[np.ndarray], rsi: Optional[np.ndarray],
+                      lookback: int = BASE_PRICE_LOOKBACK) -> float:
+    """Base price reduction over the last lookback bars, matching get_base_price."""
+    if close.size < lookback:
+        return np.nan
+    recent = slice(close.size - lookback, None)
+    avg_support = _nan_reduce(support[recent], np.mean) if support is not None else np.nan
+    min_low = _nan_reduce(low[recent], np.min)
+    rsi_buy = np.nan
+    if rsi is not None:
+        oversold = rsi[recent] < 30
+        if oversold.any():
+            rsi_buy = _nan_reduce(close[recent][oversold], np.min)
+
+    possibilities = [p for p in [avg_support, min_low, rsi_buy] if not np.isnan(p)]
+    if not possibilities:
+        return np.nan
+    return round(float(np.mean(possibilities)), 2)
+
+# -----------------------------------------------------------------------------
+# TECHNICAL INDICATORS
+# -----------------------------------------------------------------------------
+
+@metrics.traced("calculate_indicators")
+def calculate_indicators(df: pd.DataFrame, backend: Optional[str] = None) -> pd.DataFrame:
+    """
+    Compute Support/Resistance (20d) and RSI.
+    
+    The input is left untouched and its OHLCV columns are not copied; only
+    the new indicator columns are allocated.
+    
+    Args:
+        df: DataFrame with OHLCV data
+        backend: "numpy" or "pandas"; defaults to INDICATOR_BACKEND
+        
+    Returns:
+        DataFrame with additional indicator columns
+    """
+    if df.empty:
+        return df
+        
+    df = df.copy(deep=False)
+    
+    if (backend or INDICATOR_BACKEND) == "numpy":
+        df["Support"] = rolling_min_kernel(df["Low"].to_numpy(dtype=np.float64), SR_WINDOW)
+        df["Resistance"] = rolling_max_kernel(df["High"].to_numpy(dtype=np.float64), SR_WINDOW)
+        try:
+            df["RSI"] = rsi_kernel(df["Close"].to_numpy(dtype=np.float64), RSI_WINDOW)
+        except Exception:
+            df["RSI"] = np.nan
+        return df
+    
+    # Support/Resistance calculation
+    df["Support"] = df["Low"].rolling(window=SR_WINDOW, min_periods=1).min()
+    df["Resistance"] = df["High"].rolling(window=SR_WINDOW, min_periods=1).max()
+
+    # RSI Calculation with proper error handling
+    try:
+        delta = df["Close"].diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=RSI_WINDOW, min_periods=1).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=RSI_WINDOW, min_periods=1).mean()
+        
+        # Avoid division by zero
+        rs = gain / (loss + 1e-10)
+        df["RSI"] = 100 - (100 / (1 + rs))
+    except Exception:
+        # Fallback to NaN if calculation fails
+        df["RSI"] = np.nan
+    
+    return df
+
+def get_base_price(df: pd.DataFrame, backend: Optional[str] = None) -> float:
+    """
+    Calculate base price using support levels and RSI oversold conditions.
+    
+    Args:
+        df: DataFrame with indicator data
+        backend: "numpy" or "pandas"; defaults to INDICATOR_BACKEND
+        
+    Returns:
+        Calculated base price or NaN if calculation fails
+    """
+    if df.empty or len(df) < BASE_PRICE_LOOKBACK:
+        return np.nan
+
+    if (backend or INDICATOR_BACKEND) == "numpy":
+        try:
+            return base_price_kernel(
+                df["Low"].to_numpy(dtype=np.float64),
+                df["Close"].to_numpy(dtype=np.float64),
+                df["Support"].to_numpy(dtype=np.float64) if "Support" in df else None,
+                df["RSI"].to_numpy(dtype=np.float64) if "RSI" in df else None,
+            )
+        except Exception:
+            return np.nan
+
+    try:
+        recent = df.tail(BASE_PRICE_LOOKBACK)
+        
+        # Get support levels
+        avg_support = recent["Support"].mean() if "Support" in recent else np.nan
+        min_low = recent["Low"].min()
+        
+        # RSI-based entry point
+        rsi_buy = np.nan
+        if "RSI" in recent:
+            oversold = recent[recent["RSI"] < 30]
+            if not oversold.empty:
+                rsi_buy = oversold["Close"].min()
+
+        # Combine all possibilities
+        possibilities = [p for p in [avg_support, min_low, rsi_buy] 
+                        if not np.isnan(p)]
+        
+        if not possibilities:
+            return np.nan
+            
+        return round(float(np.mean(possibilities)), 2)
+        
+    except Exception:
+        return np.nan
+
+def calculate_moving_averages(df: pd.DataFrame, periods: Optional[List[int]] = None) -> pd.DataFrame:
+    """
+    Add the SMA and EMA bank (SMA_<n>/EMA_<n> columns) for every chart period.
+
+    All simple averages come from one cumulative-sum pass, so the chart can
+    toggle any of them without recomputing anything.
+
+    Args:
+        df: DataFrame with a Close column
+        periods: Moving average periods; defaults to MA_PERIODS
+
+    Returns:
+        DataFrame with additional moving average columns
+    """
+    periods = periods or MA_PERIODS
+    df = df.copy(deep=False)
+    close = df["Close"].to_numpy(dtype=np.float64)
+    sma = sma_bank_kernel(close, periods)
+    ema, _ = ema_bank_kernel(close, periods)
+    for i, period in enumerate(periods):
+        df[ma_column("SMA", period)] = sma[i]
+        df[ma_column("EMA", period)] = ema[i]
+    return df
+
+# -----------------------------------------------------------------------------
+# INCREMENTAL INDICATOR ENGINE
+# -----------------------------------------------------------------------------
+
+class _RollingState:
+    """
+    Rolling window state for Support/Resistance and RSI after a given bar.
+
+    Support and resistance use monotonic deques of (position, value), so each
+    bar is pushed and popped at most once. RSI keeps the last RSI_WINDOW
+    gains/losses with running sums.
+    """
+    __slots__ = ("low_q", "high_q", "gains", "losses", "gain_sum", "loss_sum", "prev_close", "pushes")
+
+    def __init__(self) -> None:
+        self.low_q: deque = deque()
+        self.high_q: deque = deque()
+        self.gains: deque = deque()
+        self.losses: deque = deque()
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.prev_close: Optional[float] = None
+        self.pushes = 0
+
+    def copy(self) -> "_RollingState":
+        """Copy the state (windows are at most SR_WINDOW long, so this is cheap)."""
+        other = _RollingState()
+        other.low_q, other.high_q = deque(self.low_q), deque(self.high_q)
+        other.gains, other.losses = deque(self.gains), deque(self.losses)
+        other.gain_sum, other.loss_sum = self.gain_sum, self.loss_sum
+        other.prev_close, other.pushes = self.prev_close, self.pushes
+        return other
+
+    def push(self, pos: int, low: float, high: float, close: float) -> Tuple[float, float, float]:
+        """
+        Add bar number pos and return its (support, resistance, rsi).
+
+        Mirrors calculate_indicators: NaN lows/highs are skipped by the rolling
+        min/max, and a NaN close difference counts as neither gain nor loss.
+        """
+        # Support: lows increasing from the front; Resistance: highs decreasing
+        if not math.isnan(low):
+            while self.low_q and self.low_q[-1][1] >= low:
+                self.low_q.pop()
+            self.low_q.append((pos, low))
+        if not math.isnan(high):
+            while self.high_q and self.high_q[-1][1] <= high:
+                self.high_q.pop()
+            self.high_q.append((pos, high))
+        while self.low_q and self.low_q[0][0] <= pos - SR_WINDOW:
+            self.low_q.popleft()
+        while self.high_q and self.high_q[0][0] <= pos - SR_WINDOW:
+            self.high_q.popleft()
+        support = self.low_q[0][1] if self.low_q else np.nan
+        resistance = self.high_q[0][1] if self.high_q else np.nan
+
+        # RSI: running gain/loss sums over the last RSI_WINDOW differences
+        delta = close - self.prev_close if self.prev_close is not None else np.nan
+        self.prev_close = close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        if len(self.gains) == RSI_WINDOW:
+            self.gain_sum -= self.gains.popleft()
+            self.loss_sum -= self.losses.popleft()
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.pushes += 1
+        if self.pushes % RSI_WINDOW == 0:
+            # Re-sum exactly once per window so add/subtract rounding cannot drift
+            self.gain_sum, self.loss_sum = math.fsum(self.gains), math.fsum(self.losses)
+        else:
+            self.gain_sum += gain
+            self.loss_sum += loss
+        count = len(self.gains)
+        rs = (self.gain_sum / count) / (self.loss_sum / count + 1e-10)
+        rsi = 100 - (100 / (1 + rs))
+        return support, resistance, rsi
+
+@dataclass
+class _SeriesState:
+    """Indicator outputs for a series plus the rolling state before its last bar."""
+    index: pd.Index
+    committed_close: float
+    rolling: _RollingState
+    support: np.ndarray
+    resistance: np.ndarray
+    rsi: np.ndarray
+    sma: np.ndarray
+    ema: np.ndarray
+    ema_raw: np.ndarray   # unmasked EMA per period after the second-to-last bar
+    ema_obs: int          # non-NaN closes up to and including that bar
+
+class IndicatorEngine:
+    """
+    Stateful, incremental version of calculate_indicators.
+
+    The first call for a series computes everything with the vectorized pandas
+    implementation and seeds the rolling state from the last bars. Later calls
+    whose frame extends the previous one only push the new bars through the
+    rolling state, so appending N bars costs O(N) instead of O(history). The
+    last bar is always treated as provisional (it may be an unfinished
+    session) and recomputed from the state before it.
+
+    The moving average bank is kept the same way: new SMA values come from the
+    last max(MA_PERIODS) closes and EMAs continue their recursion.
+
+    Results match calculate_moving_averages(calculate_indicators(df)) up to
+    floating-point rounding.
+    """
+
+    def __init__(self, max_series: int = INDICATOR_ENGINE_SIZE):
+        self.states: "OrderedDict[Any, _SeriesState]" = OrderedDict()
+        self.max_series = max_series
+        self.incremental_updates = 0
+        self.full_updates = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _columns(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get Low/High/Close as float64 arrays."""
+        return (df["Low"].to_numpy(dtype=float), df["High"].to_numpy(dtype=float),
+                df["Close"].to_numpy(dtype=float))
+
+    def _seed(self, df: pd.DataFrame) -> _SeriesState:
+        """Compute a series from scratch and build its rolling state."""
+        full = calculate_indicators(df)
+        low, high, close = self._columns(df)
+        rolling = _RollingState()
+        committed = len(df) - 1
+        # Only the bars still inside a window affect later results
+        start = max(0, committed - max(SR_WINDOW, RSI_WINDOW + 1))
+        if start > 0:
+            rolling.prev_close = close[start - 1]
+        for pos in range(start, committed):
+            rolling.push(pos, low[pos], high[pos], close[pos])
+        ema, ema_raw = ema_bank_kernel(close, MA_PERIODS)
+        return _SeriesState(
+            index=df.index,
+            committed_close=close[committed - 1] if committed > 0 else np.nan,
+            rolling=rolling,
+            support=full["Support"].to_numpy(dtype=float),
+            resistance=full["Resistance"].to_numpy(dtype=float),
+            rsi=full["RSI"].to_numpy(dtype=float),
+            sma=sma_bank_kernel(close, MA_PERIODS),
+            ema=ema,
+            ema_raw=ema_raw[:, committed - 1] if committed > 0 else np.full(len(MA_PERIODS), np.nan),
+            ema_obs=int(np.count_nonzero(~np.isnan(close[:committed]))),
+        )
+
+    @staticmethod
+    def _extends(state: _SeriesState, df: pd.DataFrame, close: np.ndarray) -> bool:
+        """Check that df continues the series held in state (O(1) spot checks)."""
+        n = len(state.index)
+        if n < 2 or len(df) < n:
+            return False
+        if df.index[0] != state.index[0] or df.index[n - 2] != state.index[n - 2]:
+            return False
+        # A split or dividend re-adjustment changes earlier closes
+        committed = close[n - 2]
+        return committed == state.committed_close or (np.isnan(committed) and np.isnan(state.committed_close))
+
+    @staticmethod
+    def _extend_averages(state: _SeriesState, close: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """Extend the SMA/EMA bank of state over the bars appended in close."""
+        n, last = len(state.index), close.size - 1
+        # SMAs: recompute just the tail, which holds every window touching a new bar
+        start = max(0, n - max(MA_PERIODS))
+        sma_tail = sma_bank_kernel(close[start:], MA_PERIODS)[:, n - 1 - start:]
+
+        periods = np.asarray(MA_PERIODS, dtype=float)
+        alpha = 2.0 / (periods + 1.0)
+        raw, obs = state.ema_raw.copy(), state.ema_obs
+        ema_tail = np.empty((len(MA_PERIODS), close.size - (n - 1)))
+        for col, pos in enumerate(range(n - 1, close.size)):
+            if pos == last:
+                # Provisional bar: its EMA is shown but not committed
+                committed_raw, committed_obs = raw.copy(), obs
+            x = close[pos]
+            if not np.isnan(x):
+                raw = np.full_like(raw, x) if obs == 0 else raw + alpha * (x - raw)
+                obs += 1
+            ema_tail[:, col] = np.where(obs >= periods, raw, np.nan)
+
+        sma = np.concatenate([state.sma[:, :n - 1], sma_tail], axis=1)
+        ema = np.concatenate([state.ema[:, :n - 1], ema_tail], axis=1)
+        return sma, ema, committed_raw, committed_obs
+
+    @metrics.traced("indicator_engine")
+    def compute(self, key: Any, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Get df with indicator and moving average columns, reusing prior state for key.
+
+        Args:
+            key: Series identity, e.g. (symbol, timeframe)
+            df: DataFrame with OHLCV data sorted by date
+
+        Returns:
+            Same result as calculate_moving_averages(calculate_indicators(df))
+        """
+        if df.empty or len(df) < 2:
+            return calculate_moving_averages(calculate_indicators(df)) if not df.empty else df
+
+        low, high, close = self._columns(df)
+        with self._lock:
+            state = self.states.get(key)
+            if state is not None and self._extends(state, df, close):
+                n = len(state.index)
+                rolling = state.rolling
+                new_values = []
+                # Commit every bar up to (not including) the new last bar
+                for pos in range(n - 1, len(df) - 1):
+                    new_values.append(rolling.push(pos, low[pos], high[pos], close[pos]))
+                # The last bar is provisional: compute it on a copy of the state
+                last = len(df) - 1
+                new_values.append(rolling.copy().push(last, low[last], high[last], close[last]))
+
+                new = np.array(new_values, dtype=float).reshape(-1, 3)
+                sma, ema, ema_raw, ema_obs = self._extend_averages(state, close)
+                state = _SeriesState(
+                    index=df.index,
+                    committed_close=close[last - 1],
+                    rolling=rolling,
+                    support=np.concatenate([state.support[:n - 1], new[:, 0]]),
+                    resistance=np.concatenate([state.resistance[:n - 1], new[:, 1]]),
+                    rsi=np.concatenate([state.rsi[:n - 1], new[:, 2]]),
+                    sma=sma,
+                    ema=ema,
+                    ema_raw=ema_raw,
+                    ema_obs=ema_obs,
+                )
+                self.incremental_updates += 1
+            else:
+                state = self._seed(df)
+                self.full_updates += 1
+
+            self.states[key] = state
+            self.states.move_to_end(key)
+            while len(self.states) > self.max_series:
+                self.states.popitem(last=False)
+
+        out = df.copy(deep=False)
+        out["Support"] = state.support
+        out["Resistance"] = state.resistance
+        out["RSI"] = state.rsi
+        for i, period in enumerate(MA_PERIODS):
+            out[ma_column("SMA", period)] = state.sma[i]
+            out[ma_column("EMA", period)] = state.ema[i]
+        return out
+
+    def reset(self, key: Any = None) -> None:
+        """Forget state for one series, or for all series when key is None."""
+        with self._lock:
+            if key is None:
+                self.states.clear()
+            else:
+                self.states.pop(key, None)
+
+# Global indicator engine instance
+_indicator_engine = IndicatorEngine()
+
+def get_chart_indicators(symbol: str, period: str) -> Tuple[pd.DataFrame, str]:
+    """
+    Get the indicator frame and candle size for a chart timeframe.
+
+    Indicators run on the symbol's whole cached chart history, resampled to the
+    candle size of the visible span, as one IndicatorEngine series per
+    (symbol, history, bar size). Its first bar never moves, so refreshes and
+    timeframe switches only push new bars through the engine; the visible
+    window is sliced from the result afterwards.
+
+    Args:
+        symbol: Stock/crypto symbol
+        period: yfinance-style period selected in the timeframe box
+
+    Returns:
+        (indicator DataFrame for the visible window, BAR_SIZES key); the frame
+        is empty if Yahoo has no data
+    """
+    fetch_period = period if period in SEPARATE_FETCH_PERIODS else CHART_HISTORY_PERIOD
+    history = get_chart_history(symbol, fetch_period)
+    if history.empty:
+        return history, "D"
+    # Column selection and renaming share the cached buffers
+    history = history[OHLCV_COLUMNS].rename_axis("Date")
+    visible = slice_period(history, period)
+    bar_size = choose_bar_size(visible)
+    df_ind = _indicator_engine.compute((symbol, fetch_period, bar_size), resample_ohlcv(history, bar_size))
+    # Start at the candle holding the first visible day
+    start = max(0, df_ind.index.searchsorted(visible.index[0], side="right") - 1)
+    return df_ind.iloc[start:], bar_size
+
+# -----------------------------------------------------------------------------
+# CUSTOM EXCEPTIONS
+# -----------------------------------------------------------------------------
+
+class StockDataError(Exception):
+    """Custom exception for stock data related errors."""
+    pass
+
+class PermanentDataError(StockDataError):
+    """A Yahoo lookup that recently failed permanently (served from the negative cache)."""
+    pass
+
+class ValidationError(Exception):
+    """Custom exception for input validation errors."""
+    pass
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+End-to-end Analyze latency against recorded Yahoo/StockTwits responses.
+
+Runs analysis_core.analyze_symbol (the non-UI part of the Analyze button:
+5d price probe, company info and the fundamental pipeline) under the
+provider_replay shim, with injected latency and 429 rate, so runs are
+reproducible offline. Without --fixtures a synthetic fixture set is written
+to a temporary directory; with --record the symbols are first recorded live.
+Fails if any call had no recording or an analysis raised.
+
+Usage:
+    python benchmarks/bench_analyze_replay.py [--runs 5] [--latency-ms 80] [--jitter-ms 40] [--rate-429 0.05]
+    python benchmarks/bench_analyze_replay.py --record AAPL MSFT --fixtures fixtures/
+    python benchmarks/bench_analyze_replay.py --fixtures fixtures/ --symbols AAPL MSFT --rps 100
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analysis_core as core  # noqa: E402
+import provider_replay  # noqa: E402
+
+SYNTHETIC_SYMBOL = "SYNTH"
+
+
+def write_synthetic_fixtures(fixture_dir: str, symbol: str = SYNTHETIC_SYMBOL) -> None:
+    """Write a recording covering every call analyze_symbol makes for one symbol."""
+    store = provider_replay.FixtureStore(fixture_dir)
+    rng = np.random.default_rng(3)
+
+    def bars(days: int) -> pd.DataFrame:
+        index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days, tz="America/New_York")
+        close = 150 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+        return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                             "Volume": rng.integers(1_000_000, 5_000_000, days).astype(float),
+                             "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+
+    year = bars(252)
+    last = float(year["Close"].iloc[-1])
+    quarters = pd.date_range(end=pd.Timestamp.today(), periods=20, freq="QE")[::-1]
+    financials = pd.DataFrame([np.linspace(120e9, 80e9, len(quarters))], index=["Total Revenue"], columns=quarters)
+    this_year = datetime.today().year
+    expirations = (f"{this_year}-12-18", f"{this_year + 1}-01-15", f"{this_year + 1}-06-18")
+    strikes = np.arange(round(last) - 20, round(last) + 20, 2.5)
+    calls = pd.DataFrame({"contractSymbol": [f"{symbol}C{s:.1f}" for s in strikes], "strike": strikes,
+                          "lastPrice": 5.0, "bid": 4.9, "ask": 5.1, "impliedVolatility": 0.3})
+    earnings = (pd.Timestamp.today() + pd.Timedelta(days=30)).date()
+
+    calls_made = [
+        ("history", (), {"period": "5d"}, year.iloc[-5:]),
+        ("get_info", (), {}, {"longName": "Synthetic Corp", "sector": "Technology", "profitMargins": 0.2,
+                              "operatingMargins": 0.25, "totalRevenue": 400e9, "totalDebt": 100e9,
+                              "operatingCashflow": 110e9}),
+        ("fast_info", (), {}, {"last_price": last, "year_high": float(year["High"].max()),
+                               "year_low": float(year["Low"].min())}),
+        ("history", (), {"period": "1y", "interval": "1d"}, year),
+        ("quarterly_financials", (), {}, financials),
+        ("calendar", (), {}, {"Earnings Date": [earnings]}),
+        ("options", (), {}, expirations),
+    ]
+    calls_made += [("option_chain", (exp,), {}, provider_replay.OptionChain(calls, calls.iloc[0:0], None))
+                   for exp in expirations]
+    for method, args, kwargs, value in calls_made:
+        store.save_yahoo(symbol, method, args, kwargs, value=value)
+
+    messages = [{"entities": {"sentiment": {"basic": "Bullish" if i % 3 else "Bearish"}}} for i in range(30)]
+    store.save_http(f"https://api.stocktwits.com/api/2/streams/symbol/{symbol}.json", None, 200,
+                    {"Content-Type": "application/json"}, json.dumps({"messages": messages}))
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of a small sample."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixtures", help="fixture directory (default: synthetic fixtures in a temp dir)")
+    parser.add_argument("--symbols", nargs="+", help="symbols to analyze (default: recorded or synthetic)")
+    parser.add_argument("--record", nargs="+", metavar="SYMBOL", help="record these symbols live into --fixtures first")
+    parser.add_argument("--runs", type=int, default=3, help="cold analyses per symbol")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=40.0)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="probability of an injected 429 per call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rps", type=float, help="override the Yahoo/StockTwits limiter rate (default: configured)")
+    args = parser.parse_args()
+
+    if args.record and not args.fixtures:
+        parser.error("--record needs --fixtures")
+    fixture_dir = args.fixtures or tempfile.mkdtemp(prefix="replay-fixtures-")
+    symbols = args.symbols or args.record
+    if args.record:
+        with provider_replay.recording(fixture_dir):
+            for symbol in args.record:
+                print(f"Recording {symbol}...")
+                core.analyze_symbol(symbol)
+    elif not args.fixtures:
+        write_synthetic_fixtures(fixture_dir)
+        symbols = symbols or [SYNTHETIC_SYMBOL]
+    if not symbols:
+        parser.error("--symbols is required with --fixtures")
+
+    if args.rps:
+        for host in (core.YAHOO_HOST, core.STOCKTWITS_HOST):
+            core._host_limiters[host] = core.TokenBucket(args.rps, name=host)
+
+    faults = provider_replay.ReplayFaults(args.latency_ms, args.jitter_ms, args.rate_429, seed=args.seed)
+    latencies = {symbol: [] for symbol in symbols}
+    failures = []
+    with provider_replay.replay(fixture_dir, faults) as shim:
+        for run in range(args.runs):
+            for symbol in symbols:
+                core._yahoo_clients.clear()  # every run starts cold
+                start = time.perf_counter()
+                try:
+                    with core.metrics.trace(f"analyze {symbol}"):
+                        core.analyze_symbol(symbol)
+                except Exception as e:
+                    failures.append(f"{symbol} run {run + 1}: {type(e).__name__}: {e}")
+                    continue
+                latencies[symbol].append(time.perf_counter() - start)
+        stats = shim.stats()
+
+    print(f"fixtures: {fixture_dir}; latency {args.latency_ms:.0f}+{args.jitter_ms:.0f} ms, "
+          f"429 rate {args.rate_429:.0%}, seed {args.seed}")
+    print(f"{'symbol':<10}{'runs':>6}{'median (s)':>12}{'p95 (s)':>10}{'max (s)':>10}")
+    for symbol, times in latencies.items():
+        if times:
+            print(f"{symbol:<10}{len(times):>6}{statistics.median(times):>12.2f}"
+                  f"{percentile(times, 95):>10.2f}{max(times):>10.2f}")
+    spans = {}
+    for trace in core.metrics.recent():
+        for name, seconds in trace.totals().items():
+            spans.setdefault(name, []).append(seconds)
+    print("median span time per analysis (thread-seconds): " +
+          ", ".join(f"{name} {statistics.median(values):.2f}s" for name, values in sorted(spans.items())))
+    limiter = core.limiter_stats()
+    waits = ", ".join(f"{host} {s['total_wait']:.2f}s over {s['acquisitions']}" for host, s in limiter.items())
+    print(f"replayed calls {stats['calls']}, injected 429s {stats['rate_limited']}, missing {stats['missing']}")
+    print(f"limiter wait: {waits or '-'}")
+
+    if stats["missing"]:
+        failures.append(f"{stats['missing']} calls had no recording")
+    if failures:
+        print("FAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the chart data path (cache hit -> prepare -> indicators).
+
+Compares the legacy pipeline, which deep-copied the OHLCV frame on cache
+insert, cache hit, column selection and in calculate_indicators, against the
+current zero-copy pipeline on a minute-bar history (1M bars, about 46 MiB,
+by default) so the copies dominate the measurement. Each mode runs in its own
+interpreter so peak RSS is not shared between them. Fails (exit status 1)
+unless the current pipeline's peak traced memory is at least
+--min-saving-frames frame sizes below the legacy one and its peak RSS is lower.
+
+Usage:
+    python benchmarks/bench_cache_memory.py [--bars 1000000] [--updates 20] [--min-saving-frames 2.5]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analysis_core as analyzer  # noqa: E402
+
+
+def make_minute_frame(bars: int) -> pd.DataFrame:
+    """Build a synthetic one-minute OHLCV frame with the given number of bars."""
+    rng = np.random.default_rng(42)
+    index = pd.date_range(end="2025-01-03 16:00", periods=bars, freq="min", tz="America/New_York")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+    spread = np.abs(rng.normal(0, 0.5, len(index)))
+    return pd.DataFrame({
+        "Open": close + rng.normal(0, 0.2, len(index)),
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 5_000_000, len(index)).astype(float),
+    }, index=index)
+
+
+def legacy_update(cache: dict, key: str) -> pd.DataFrame:
+    """Replicate the pre-change chart update: three full copies per update."""
+    df = cache[key].copy()                                   # DataCache.get
+    df = df[["Open", "High", "Low", "Close", "Volume"]].copy()
+    df.index.name = "Date"
+    out = df.copy()                                          # calculate_indicators
+    out["Support"] = out["Low"].rolling(window=20, min_periods=1).min()
+    out["Resistance"] = out["High"].rolling(window=20, min_periods=1).max()
+    delta = out["Close"].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14, min_periods=1).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=1).mean()
+    out["RSI"] = 100 - (100 / (1 + gain / (loss + 1e-10)))
+    return out
+
+
+def current_update(cache: "analyzer.DataCache", symbol: str, period: str) -> pd.DataFrame:
+    """Run the current chart update path."""
+    df = cache.get(symbol, period)
+    df = df[analyzer.OHLCV_COLUMNS].rename_axis("Date")
+    return analyzer.calculate_indicators(df)
+
+
+def peak_rss_bytes() -> int:
+    """Get the peak resident set size of this process, or -1 if unavailable."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS reports bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        try:
+            import psutil
+            return int(psutil.Process().memory_info().peak_wset)
+        except Exception:
+            return -1
+
+
+def run_mode(mode: str, bars: int, updates: int) -> dict:
+    """Run one mode in this process and return its measurements."""
+    frame = make_minute_frame(bars)
+    tracemalloc.start()
+    baseline_rss = peak_rss_bytes()
+
+    held = []  # the app keeps the latest frame alive as current_df
+    if mode == "legacy":
+        cache = {"SYM_1m": frame.copy()}
+        for _ in range(updates):
+            held = [legacy_update(cache, "SYM_1m")]
+    else:
+        cache = analyzer.DataCache()
+        cache.set("SYM", "1m", frame)
+        for _ in range(updates):
+            held = [current_update(cache, "SYM", "1m")]
+
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "mode": mode,
+        "rows": len(frame),
+        "frame_bytes": int(frame.memory_usage(deep=True).sum()),
+        "peak_traced_bytes": peak_traced,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "rss_before_bytes": baseline_rss,
+        "result_rows": len(held[0]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bars", type=int, default=1_000_000)
+    parser.add_argument("--updates", type=int, default=20)
+    parser.add_argument("--min-saving-frames", type=float, default=2.5,
+                        help="required peak traced memory saving, in frame sizes")
+    parser.add_argument("--mode", choices=["legacy", "current"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.bars, args.updates)))
+        return
+
+    results = {}
+    for mode in ("legacy", "current"):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--mode", mode,
+             "--bars", str(args.bars), "--updates", str(args.updates)],
+            capture_output=True, text=True, check=True,
+        )
+        results[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    mib = 1024 * 1024
+    frame_bytes = results["legacy"]["frame_bytes"]
+    print(f"minute-bar frame: {results['legacy']['rows']} rows, "
+          f"{frame_bytes / mib:.2f} MiB; {args.updates} chart updates")
+    print(f"{'mode':<10}{'peak traced (MiB)':>20}{'peak RSS (MiB)':>18}")
+    for mode, res in results.items():
+        rss = res["peak_rss_bytes"] / mib if res["peak_rss_bytes"] > 0 else float("nan")
+        print(f"{mode:<10}{res['peak_traced_bytes'] / mib:>20.2f}{rss:>18.1f}")
+
+    legacy, current = results["legacy"], results["current"]
+    saving = (legacy["peak_traced_bytes"] - current["peak_traced_bytes"]) / frame_bytes
+    print(f"peak traced saving: {saving:.1f} frame sizes")
+    failures = []
+    if saving < args.min_saving_frames:
+        failures.append(f"peak traced memory saved {saving:.1f} frame sizes, expected at least {args.min_saving_frames}")
+    if 0 < legacy["peak_rss_bytes"] <= current["peak_rss_bytes"]:
+        failures.append("peak RSS of the current pipeline is not below the legacy one")
+    if failures:
+        print("FAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
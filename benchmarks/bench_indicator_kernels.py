@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Indicator backend benchmark: NumPy kernels vs the pandas reference path.
+
+Times calculate_indicators and get_base_price with both backends on 1k,
+100k and 1M bars and fails if the results differ.
+
+Usage:
+    python benchmarks/bench_indicator_kernels.py [--sizes 1000 100000 1000000] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analysis_core as analyzer  # noqa: E402
+
+INDICATOR_COLUMNS = ["Support", "Resistance", "RSI"]
+
+
+def make_ohlcv(bars: int, seed: int = 7) -> pd.DataFrame:
+    """Build a random-walk OHLCV frame with a few missing values."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("1990-01-01", periods=bars, freq="min")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    spread = np.abs(rng.normal(0, 0.5, bars))
+    df = pd.DataFrame({
+        "Open": close,
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000, 100_000, bars).astype(float),
+    }, index=index)
+    # Gaps exercise the NaN-skipping paths of both backends
+    holes = rng.integers(0, bars, max(1, bars // 1000))
+    df.iloc[holes, df.columns.get_loc("Low")] = np.nan
+    return df
+
+
+def best_of(repeat: int, func, *args, **kwargs) -> float:
+    """Best wall-clock time of several runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_parity(df: pd.DataFrame) -> None:
+    """Assert that both backends produce the same indicators and base price."""
+    ref = analyzer.calculate_indicators(df, backend="pandas")
+    fast = analyzer.calculate_indicators(df, backend="numpy")
+    for col in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(
+            fast[col].to_numpy(), ref[col].to_numpy(),
+            rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=f"{col} differs",
+        )
+    ref_base = analyzer.get_base_price(ref, backend="pandas")
+    fast_base = analyzer.get_base_price(ref, backend="numpy")
+    assert (np.isnan(ref_base) and np.isnan(fast_base)) or ref_base == fast_base, \
+        f"base price differs: pandas={ref_base} numpy={fast_base}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'bars':>10}  {'indicators pandas':>18}  {'numpy':>10}  {'speedup':>8}"
+          f"  {'base pandas':>12}  {'numpy':>10}  {'speedup':>8}")
+    for bars in args.sizes:
+        df = make_ohlcv(bars)
+        check_parity(df)
+        ind = analyzer.calculate_indicators(df)
+
+        t_pd = best_of(args.repeat, analyzer.calculate_indicators, df, backend="pandas")
+        t_np = best_of(args.repeat, analyzer.calculate_indicators, df, backend="numpy")
+        b_pd = best_of(args.repeat, analyzer.get_base_price, ind, backend="pandas")
+        b_np = best_of(args.repeat, analyzer.get_base_price, ind, backend="numpy")
+        print(f"{bars:>10}  {t_pd * 1e3:>15.2f} ms  {t_np * 1e3:>7.2f} ms  {t_pd / t_np:>7.1f}x"
+              f"  {b_pd * 1e6:>9.0f} us  {b_np * 1e6:>7.0f} us  {b_pd / b_np:>7.1f}x")
+    print("Results identical across backends.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Startup budget check for both GUI entry points and the headless core.
+
+Imports each module in a fresh interpreter under ``python -X importtime`` and
+fails if its cumulative import time exceeds the budget, or if any of the heavy
+libraries that are supposed to load lazily (yfinance, matplotlib, mplfinance,
+requests, requests_cache) were imported before the window could appear. The
+analysis core must also import without tkinter. When a display is available
+it also times process start to the first mapped window of each GUI script.
+
+Usage:
+    python benchmarks/bench_startup.py [--budget-ms 800] [--window-budget-ms 2000] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = ["yfinance", "matplotlib", "mplfinance", "requests", "requests_cache"]
+# Module -> (modules it must not import at startup, has a window)
+SCRIPTS = {
+    "SC_Automated_Analysis": (LAZY_MODULES, True),
+    "manual_stock_analyzer": (LAZY_MODULES, True),
+    "analysis_core": (LAZY_MODULES + ["tkinter"], False),
+}
+
+IMPORT_PROBE = """
+import json, sys
+import {module}
+print(json.dumps(sorted(m for m in {forbidden!r} if m in sys.modules)))
+"""
+
+WINDOW_PROBE = """
+import tkinter as tk
+import {module}
+root = tk.Tk()
+app = {module}.StockAnalyzerApp(root)
+root.update()
+print("mapped", flush=True)
+app.cleanup()
+root.destroy()
+"""
+
+
+def import_time_us(module: str, forbidden: list) -> tuple:
+    """Import module in a fresh interpreter; return (cumulative us, forbidden modules it loaded)."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_PROBE.format(module=module, forbidden=forbidden)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    cumulative = None
+    for line in out.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1])
+    if cumulative is None:
+        raise RuntimeError(f"no importtime entry for {module}:\n{out.stderr[-2000:]}")
+    return cumulative, json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def time_to_window_s(module: str) -> float:
+    """Seconds from process start until the app's window has been mapped."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", WINDOW_PROBE.format(module=module)],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    for line in proc.stdout:
+        if line.strip() == "mapped":
+            elapsed = time.perf_counter() - start
+            proc.wait()
+            return elapsed
+    proc.wait()
+    raise RuntimeError(f"window did not appear for {module}:\n{proc.stderr.read()[-2000:]}")
+
+
+def display_available() -> bool:
+    """Check whether Tk can open a window here."""
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=800.0, help="cumulative import time budget per script")
+    parser.add_argument("--window-budget-ms", type=float, default=2000.0, help="process start to mapped window")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per script; the best is compared")
+    args = parser.parse_args()
+
+    failures = []
+    check_window = display_available()
+    print(f"{'module':<24}{'import (ms)':>12}{'window (ms)':>13}  eagerly imported")
+    for module, (forbidden, has_window) in SCRIPTS.items():
+        runs = [import_time_us(module, forbidden) for _ in range(args.repeat)]
+        best_ms = min(us for us, _ in runs) / 1e3
+        eager = sorted(set().union(*(set(loaded) for _, loaded in runs)))
+
+        window = "skipped" if has_window else "-"
+        if check_window and has_window:
+            window_ms = min(time_to_window_s(module) for _ in range(args.repeat)) * 1e3
+            window = f"{window_ms:.0f}"
+            if window_ms > args.window_budget_ms:
+                failures.append(f"{module}: window after {window_ms:.0f} ms (budget {args.window_budget_ms:.0f})")
+
+        print(f"{module:<24}{best_ms:>12.0f}{window:>13}  {', '.join(eager) or '-'}")
+        if best_ms > args.budget_ms:
+            failures.append(f"{module}: import took {best_ms:.0f} ms (budget {args.budget_ms:.0f})")
+        if eager:
+            failures.append(f"{module}: imported {', '.join(eager)} at import")
+
+    if not check_window:
+        print("No display: time-to-window not measured (import time only).")
+    if failures:
+        print("FAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
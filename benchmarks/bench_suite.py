@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the analysis hot paths with JSON results and a regression gate.
+
+Times calculate_indicators and get_base_price on synthetic OHLCV from 1k to
+1M bars, fundamental_score over many synthetic inputs, filter_call_strikes on
+synthetic option chains and an off-screen Agg chart render.
+Results are written as JSON; given a baseline JSON, any case whose best time
+is more than --threshold percent slower fails the run (exit status 1).
+
+Usage:
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --baseline results.json --threshold 15 [--quick] [--only indicators]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analysis_core as core  # noqa: E402
+from bench_indicator_kernels import make_ohlcv  # noqa: E402
+
+OHLCV_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+QUICK_OHLCV_SIZES = [1_000, 10_000, 100_000]
+SCORE_INPUTS = 10_000
+CHAIN_SIZES = [200, 5_000]
+CHAIN_LOOKUPS = 200            # filter calls per timed run (two expirations per analysis)
+RENDER_SIZES = [1_000, 100_000]
+RENDER_PIXELS = (1200, 800)
+
+
+def make_option_chain(strikes: int, current_price: float, seed: int = 11) -> pd.DataFrame:
+    """Build a calls table shaped like yfinance's option_chain().calls, sorted by strike."""
+    rng = np.random.default_rng(seed)
+    strike = np.round(np.linspace(current_price * 0.2, current_price * 3.0, strikes) * 2) / 2
+    intrinsic = np.maximum(current_price - strike, 0)
+    last = intrinsic + rng.uniform(0.05, 5.0, strikes)
+    return pd.DataFrame({
+        "contractSymbol": [f"SYNTH{i:06d}C" for i in range(strikes)],
+        "strike": strike,
+        "lastPrice": last,
+        "bid": last * 0.98,
+        "ask": last * 1.02,
+        "impliedVolatility": rng.uniform(0.1, 1.2, strikes),
+    })
+
+
+def make_fundamental_inputs(count: int, seed: int = 5) -> list:
+    """Build (data, positive growth %, earnings date) tuples covering passes, fails and gaps."""
+    rng = np.random.default_rng(seed)
+    inputs = []
+    for i in range(count):
+        missing = rng.random(6) < 0.1
+        price = float(rng.uniform(5, 500))
+        data = {
+            "current_price": price,
+            "high_52": price * float(rng.uniform(1.0, 2.0)),
+            "low_52": price * float(rng.uniform(0.4, 1.0)),
+            "profit_margin": None if missing[0] else float(rng.normal(0.12, 0.1)),
+            "operating_margin": None if missing[1] else float(rng.normal(0.15, 0.1)),
+            "quarterly_revenue_change": None if missing[2] else float(rng.normal(0.04, 0.08)),
+            "revenue": None if missing[3] else float(rng.uniform(1e8, 4e11)),
+            "total_debt": None if missing[4] else float(rng.uniform(0, 2e11)),
+            "operating_cash_flow": None if missing[5] else float(rng.uniform(-1e9, 1e11)),
+        }
+        growth = None if i % 17 == 0 else float(rng.uniform(20, 100))
+        earnings = None if i % 5 == 0 else f"2026-{1 + i % 12:02d}-15"
+        inputs.append((data, growth, earnings))
+    return inputs
+
+
+def time_case(func, repeat: int) -> dict:
+    """Run func repeat times after one warm-up; return best/median seconds."""
+    func()
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {"best_s": min(runs), "median_s": statistics.median(runs), "repeat": repeat}
+
+
+def build_cases(quick: bool) -> list:
+    """Return (name, callable, units) for every benchmark case."""
+    cases = []
+    for bars in QUICK_OHLCV_SIZES if quick else OHLCV_SIZES:
+        df = make_ohlcv(bars)
+        ind = core.calculate_indicators(df)
+        cases.append((f"indicators/{bars}", lambda df=df: core.calculate_indicators(df), bars))
+        cases.append((f"base_price/{bars}", lambda ind=ind: core.get_base_price(ind), bars))
+
+    inputs = make_fundamental_inputs(SCORE_INPUTS)
+    cases.append((f"fundamental_score/{SCORE_INPUTS}",
+                  lambda: [core.fundamental_score(*args) for args in inputs], SCORE_INPUTS))
+
+    for strikes in CHAIN_SIZES:
+        chain = make_option_chain(strikes, 150.0)
+        prices = np.linspace(100.0, 200.0, CHAIN_LOOKUPS)
+        cases.append((f"filter_call_strikes/{strikes}",
+                      lambda chain=chain, prices=prices: [core.filter_call_strikes(chain, p) for p in prices],
+                      CHAIN_LOOKUPS))
+
+    if core.module_available("matplotlib", "mplfinance", "PIL"):
+        import matplotlib
+        matplotlib.use("Agg")
+        import SC_Automated_Analysis as analyzer
+
+        view = analyzer.ChartView()
+        handles = [analyzer.mpl_lines.Line2D([], [], color="green", linestyle="--", label="Support")]
+        for bars in RENDER_SIZES:
+            df = core.calculate_indicators(make_ohlcv(bars).rename_axis("Date").dropna())
+
+            def render(df=df):
+                overlays = [(df["Support"], dict(color="green", linestyle="--", width=1.5)),
+                            (df["Resistance"], dict(color="red", linestyle="--", width=1.5))]
+                # render() downsamples to the plot width itself, as in the app
+                view.render(df, overlays, "BENCH", handles, ["Support"], size=RENDER_PIXELS)
+
+            cases.append((f"render_agg/{bars}", render, bars))
+    else:
+        print("matplotlib/mplfinance not installed: skipping render_agg cases")
+    return cases
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """List cases whose best time regressed by more than threshold percent."""
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        change = (res["best_s"] / base["best_s"] - 1) * 100
+        res["change_pct"] = round(change, 1)
+        if change > threshold:
+            regressions.append(f"{name}: {base['best_s'] * 1e3:.2f} ms -> {res['best_s'] * 1e3:.2f} ms ({change:+.0f}%)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0, help="allowed slowdown per case, in percent")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case; the best is compared")
+    parser.add_argument("--quick", action="store_true", help="skip the 1M-bar cases")
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'case':<32}{'best (ms)':>12}{'median (ms)':>13}{'per unit (us)':>15}")
+    for name, func, units in build_cases(args.quick):
+        if args.only and args.only not in name:
+            continue
+        res = time_case(func, args.repeat)
+        res["units"] = units
+        results[name] = res
+        print(f"{name:<32}{res['best_s'] * 1e3:>12.2f}{res['median_s'] * 1e3:>13.2f}"
+              f"{res['best_s'] / units * 1e6:>15.3f}")
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "indicator_backend": core.INDICATOR_BACKEND,
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        report["baseline"] = {"file": args.baseline, "timestamp": baseline.get("timestamp"),
+                              "threshold_pct": args.threshold}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Results written to {args.output}")
+
+    if regressions:
+        print(f"FAIL: slower than baseline by more than {args.threshold:.0f}%")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    if args.baseline:
+        print("PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Behaviour check for bulk_download_history against a fake yf.download.
+
+Covers:
+- chunking: BULK_DOWNLOAD_THREADS symbols per yf.download call, with the Yahoo
+  limiter charged for a chunk just before its call, never in advance
+- NODATA skipping: symbols yfinance returns as all-NaN columns (or omits) are
+  left out of the result and the history store
+- tail grouping: stale stored histories are refreshed with one tail download
+  per last-stored date, and only unknown symbols are downloaded in full
+- current stored histories and DataCache entries need no download at all
+Fails (exit status 1) on any mismatch.
+
+Usage:
+    python benchmarks/check_bulk_download.py
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analysis_core as core  # noqa: E402
+
+NO_DATA = {"NODATA"}       # returned as all-NaN columns, like a delisted ticker
+OMITTED = {"GONE"}         # missing from the result altogether
+LAST_DATE = "2026-06-30"
+
+
+def bars(end: str, days: int) -> pd.DataFrame:
+    """Daily bars shaped like one ticker's block of a yf.download result."""
+    index = pd.bdate_range(end=end, periods=days)
+    close = np.linspace(50.0, 60.0, days)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": 1e6, "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+
+
+class FakeDownload:
+    """Stand-in for yf.download recording each call and the limiter tokens taken before it."""
+
+    def __init__(self, limiter: "core.TokenBucket"):
+        self.limiter = limiter
+        self.calls = []
+
+    def __call__(self, tickers, **kwargs) -> pd.DataFrame:
+        tokens = self.limiter.stats()["acquisitions"]
+        self.calls.append({"symbols": list(tickers), "tokens": tokens,
+                           **{k: kwargs[k] for k in ("period", "start") if k in kwargs}})
+        frames = {}
+        for symbol in tickers:
+            if symbol in OMITTED:
+                continue
+            df = bars(LAST_DATE, 300)
+            if "start" in kwargs:
+                df = df[df.index >= kwargs["start"]]
+            if symbol in NO_DATA:
+                df = df * np.nan
+            frames[symbol] = df
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+
+def main() -> None:
+    import yfinance
+
+    core._history_store = core.HistoryStore(tempfile.mkdtemp(prefix="bulk-check-"))
+    core._data_cache = core.DataCache()
+    limiter = core.TokenBucket(1000.0, name=core.YAHOO_HOST)
+    core._host_limiters[core.YAHOO_HOST] = limiter
+    fake = FakeDownload(limiter)
+    yfinance.download = fake
+    failures = []
+    step = core.BULK_DOWNLOAD_THREADS
+
+    # Full downloads: chunked, tokens taken per chunk, no-data symbols skipped
+    symbols = [f"S{i:02d}" for i in range(2 * step + 1)] + sorted(NO_DATA | OMITTED)
+    result = core.bulk_download_history(symbols, "1y")
+    sizes = [len(call["symbols"]) for call in fake.calls]
+    print(f"full download calls: {sizes}, tokens before each: {[c['tokens'] for c in fake.calls]}")
+    if any(size > step for size in sizes) or sum(sizes) != len(symbols):
+        failures.append(f"expected chunks of at most {step} covering {len(symbols)} symbols, got {sizes}")
+    if [call["tokens"] for call in fake.calls] != list(np.cumsum(sizes)):
+        failures.append("limiter tokens were not taken chunk by chunk just before each call")
+    skipped = (NO_DATA | OMITTED) & set(result)
+    if skipped or len(result) != 2 * step + 1:
+        failures.append(f"no-data symbols in the result: {sorted(skipped)}; {len(result)} symbols returned")
+    if any(core._history_store.load(symbol)[0] is not None for symbol in NO_DATA | OMITTED):
+        failures.append("no-data symbols were written to the history store")
+
+    # Served from the DataCache: no download
+    fake.calls.clear()
+    core.bulk_download_history(symbols[:3], "1y")
+    if fake.calls:
+        failures.append(f"DataCache hits still downloaded: {fake.calls}")
+
+    # Stale stored histories: one tail download per last-stored date
+    core._data_cache = core.DataCache()
+    core._history_store.save("S00", bars("2026-06-25", 250)[core.OHLCV_COLUMNS], "1y")
+    core._history_store.save("S01", bars("2026-06-26", 250)[core.OHLCV_COLUMNS], "1y")
+    core._history_store.save("S02", bars("2026-06-26", 250)[core.OHLCV_COLUMNS], "1y")
+    current = core._history_store.is_current
+    core._history_store.is_current = lambda symbol: symbol == "S03"
+    fake.calls.clear()
+    result = core.bulk_download_history(["S00", "S01", "S02", "S03", "NEW"], "1y")
+    core._history_store.is_current = current
+    plan = sorted((call.get("start") or call.get("period"), tuple(call["symbols"])) for call in fake.calls)
+    print(f"refresh calls: {plan}")
+    expected = sorted([("2026-06-25", ("S00",)), ("2026-06-26", ("S01", "S02")), ("1y", ("NEW",))])
+    if plan != expected:
+        failures.append(f"expected {expected}, got {plan}")
+    if any(str(result[s].index[-1].date()) != LAST_DATE for s in ("S00", "S01", "S02")):
+        failures.append("tail refresh did not extend the stored histories")
+
+    if failures:
+        print("FAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Reuse check for the chart's incremental indicators.
+
+Serves a 20-year daily history from the DataCache and asks get_chart_indicators
+for several timeframes, then appends bars one day at a time and refreshes, the
+way Update Chart does. After each timeframe's first (seeding) computation,
+every refresh must be an incremental IndicatorEngine update, and each result
+must equal a full recompute on the whole history sliced to the visible window.
+Fails (exit status 1) on any full recompute or mismatch.
+
+Usage:
+    python benchmarks/check_chart_indicators.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analysis_core as core  # noqa: E402
+
+SYMBOL = "CHRT"
+PERIODS = ("6mo", "1y", "5y", "max")   # daily, daily, weekly and monthly candles
+REFRESHES = 5
+
+
+def make_history(days: int) -> pd.DataFrame:
+    """Random-walk daily bars shaped like a stored history."""
+    rng = np.random.default_rng(11)
+    index = pd.bdate_range(end="2026-06-30", periods=days)
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                         "Volume": rng.integers(1_000_000, 5_000_000, days).astype(float)}, index=index)
+
+
+def reference(history: pd.DataFrame, period: str, bar_size: str) -> pd.DataFrame:
+    """Full recompute of the chart frame on the whole history."""
+    history = history.rename_axis("Date")
+    full = core.calculate_moving_averages(core.calculate_indicators(core.resample_ohlcv(history, bar_size)))
+    start = core.slice_period(history, period).index[0]
+    return full.iloc[max(0, full.index.searchsorted(start, side="right") - 1):]
+
+
+def main() -> None:
+    core._data_cache = core.DataCache()
+    engine = core._indicator_engine = core.IndicatorEngine()
+    full = make_history(20 * 252 + REFRESHES)
+    failures = []
+
+    for visible in range(len(full) - REFRESHES, len(full) + 1):
+        history = full.iloc[:visible]
+        core._data_cache.set(SYMBOL, core.CHART_HISTORY_PERIOD, history)
+        for period in PERIODS:
+            df_ind, bar_size = core.get_chart_indicators(SYMBOL, period)
+            expected = reference(history, period, bar_size)
+            try:
+                pd.testing.assert_frame_equal(df_ind, expected[df_ind.columns], check_exact=False, rtol=1e-9)
+            except AssertionError as e:
+                failures.append(f"{period} ({bar_size}) with {visible} bars differs: {str(e).splitlines()[0]}")
+
+    seeded = len(engine.states)
+    print(f"series: {sorted(engine.states)}; full updates {engine.full_updates}, "
+          f"incremental updates {engine.incremental_updates}")
+    if engine.full_updates != seeded:
+        failures.append(f"expected {seeded} full computations (one per series), got {engine.full_updates}")
+
+    if failures:
+        print("FAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Refresh check for the persistent history store around dividends.
+
+Loads a symbol whose last stored bar is an ex-dividend day several times
+against a fake Yahoo download (with the store treated as stale, so every load
+refreshes). The tail request re-fetches that last bar, and its dividend is
+already reflected in the stored prices, so only the first load may download
+the full period. A dividend on a genuinely new bar must still trigger a full
+refetch. Fails (exit status 1) if either does not hold.
+
+Usage:
+    python benchmarks/check_history_refresh.py
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analysis_core as core  # noqa: E402
+
+SYMBOL = "DIVCO"
+
+
+def make_history(days: int, dividend_days: tuple) -> pd.DataFrame:
+    """Daily bars shaped like yfinance history, with dividends on the given row positions."""
+    index = pd.bdate_range(end="2026-06-30", periods=days, tz="America/New_York")
+    close = np.linspace(100.0, 120.0, days)
+    df = pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                       "Volume": 1_000_000.0, "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+    for day in dividend_days:
+        df.iloc[day, df.columns.get_loc("Dividends")] = 0.5
+    return df
+
+
+class FakeYahoo:
+    """Stand-in for _download_history serving a growing history."""
+
+    def __init__(self, full: pd.DataFrame, visible: int):
+        self.full = full
+        self.visible = visible
+        self.calls = []
+
+    def __call__(self, symbol: str, **kwargs) -> pd.DataFrame:
+        self.calls.append(kwargs)
+        df = self.full.iloc[:self.visible]
+        if "start" in kwargs:
+            return df[df.index.strftime("%Y-%m-%d") >= kwargs["start"]]
+        return df
+
+
+def main() -> None:
+    core._history_store = core.HistoryStore(tempfile.mkdtemp(prefix="history-check-"))
+    core._history_store.is_current = lambda symbol: False   # every load refreshes
+    failures = []
+
+    # Ex-dividend on the 300th bar, which is the last one stored after the first load
+    full = make_history(310, dividend_days=(299, 305))
+    fake = FakeYahoo(full, visible=300)
+    core._download_history = fake
+
+    core.load_price_history(SYMBOL, "max")
+    for visible in (300, 301, 302):
+        fake.visible = visible
+        core.load_price_history(SYMBOL, "max")
+    full_fetches = [call for call in fake.calls if "period" in call]
+    print(f"loads after an ex-dividend last bar: {fake.calls}")
+    if len(full_fetches) != 1:
+        failures.append(f"expected 1 full download, got {len(full_fetches)}")
+
+    # A new bar with a dividend re-adjusts earlier prices: full refetch expected
+    fake.calls.clear()
+    fake.visible = 306
+    df = core.load_price_history(SYMBOL, "max")
+    print(f"load with a new dividend bar: {fake.calls}")
+    if not any("period" in call for call in fake.calls):
+        failures.append("a dividend on a new bar did not trigger a full download")
+    if len(df) != 306:
+        failures.append(f"expected 306 bars after refresh, got {len(df)}")
+
+    if failures:
+        print("FAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Soak test for the persistent chart view.
+
+Drives ChartView.submit() many times with fresh data, the way the app does:
+the render worker draws into the Agg buffer and the finished image is handed
+back through master.after() to _show(), which swaps a new PhotoImage into the
+label. Before and after the loop it counts live matplotlib Figures and
+PhotoImages (via gc) and Tk images, and checks resident memory. Exits with
+status 1 if any of them grows.
+
+With a display a real Tk window is used. Without one the Tk thread is stood
+in for by a queue of after() callbacks drained on the main thread, so the
+submit path is still exercised but no PhotoImage is created (run under
+xvfb-run to cover it).
+
+Usage:
+    python benchmarks/soak_chart_view.py [--updates 1000] [--bars 250] [--max-growth-mb 25]
+"""
+
+import argparse
+import gc
+import os
+import sys
+
+import matplotlib
+matplotlib.use("Agg")
+
+import matplotlib.figure  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analysis_core as core  # noqa: E402
+import SC_Automated_Analysis as analyzer  # noqa: E402
+
+
+def current_rss_bytes() -> int:
+    """Get the current resident set size of this process."""
+    try:
+        import psutil
+        return int(psutil.Process().memory_info().rss)
+    except ImportError:
+        # Linux fallback: second field of statm is resident pages
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def make_frame(bars: int, rng: np.random.Generator) -> pd.DataFrame:
+    """Build a random OHLCV frame with indicator columns."""
+    index = pd.bdate_range(end="2025-01-03", periods=bars)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    spread = np.abs(rng.normal(0, 0.5, bars))
+    df = pd.DataFrame({
+        "Open": close + rng.normal(0, 0.2, bars),
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 5_000_000, bars).astype(float),
+    }, index=index).rename_axis("Date")
+    return core.calculate_indicators(df)
+
+
+class OffscreenMaster:
+    """Stand-in for the Tk root: after() callbacks queue up until drain() runs them."""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms: int, func, *args) -> None:
+        self.pending.append((func, args))
+
+    def drain(self) -> None:
+        while self.pending:
+            func, args = self.pending.pop(0)
+            func(*args)
+
+
+def display_available() -> bool:
+    """Check whether Tk can open a window here."""
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def live_objects() -> dict:
+    """Count live Figures and PhotoImages after a full collection."""
+    gc.collect()
+    counts = {"figures": 0, "photo_images": 0}
+    for obj in gc.get_objects():
+        if isinstance(obj, matplotlib.figure.Figure):
+            counts["figures"] += 1
+        elif type(obj).__name__ == "PhotoImage" and type(obj).__module__ == "PIL.ImageTk":
+            counts["photo_images"] += 1
+    return counts
+
+
+def submit_once(view: "analyzer.ChartView", df: pd.DataFrame, flush) -> None:
+    """Submit one update the way the app does (MAs, overlays, legend) and wait until it is shown."""
+    overlays = [
+        (df["Close"].rolling(10).mean(), dict(color="#FF6B6B")),
+        (df["Close"].rolling(50).mean(), dict(color="#96CEB4")),
+        (df["Support"], dict(color="green", linestyle="--", width=1.5)),
+        (df["Resistance"], dict(color="red", linestyle="--", width=1.5)),
+    ]
+    handles = [analyzer.mpl_lines.Line2D([], [], color="green", linestyle="--", label="Support")]
+    view.submit(df, overlays, "SOAK", handles, ["Support"], on_error=lambda message: print(message))
+    # The single render worker runs jobs in order: once this no-op is done the render has finished
+    view._executor.submit(lambda: None).result()
+    flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--bars", type=int, default=250)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--max-growth-mb", type=float, default=25.0)
+    args = parser.parse_args()
+
+    root = None
+    if display_available():
+        import tkinter as tk
+        root = tk.Tk()
+        root.geometry("1200x800")
+        view = analyzer.ChartView(root)
+        root.update()
+
+        def flush() -> None:
+            root.update()
+
+        def tk_images() -> int:
+            return len(root.tk.call("image", "names"))
+    else:
+        print("No display: submit path without PhotoImage (run under xvfb-run for the full path)")
+        master = OffscreenMaster()
+        view = analyzer.ChartView()
+        view.master = master
+        flush = master.drain
+
+        def tk_images() -> int:
+            return 0
+
+    rng = np.random.default_rng(0)
+    baseline_rss = None
+    baseline = None
+    baseline_images = 0
+
+    for i in range(args.updates):
+        submit_once(view, make_frame(args.bars, rng), flush)
+        if i + 1 == args.warmup:
+            # Caches (fonts, text layout) fill during the first renders
+            baseline_rss = current_rss_bytes()
+            baseline = live_objects()
+            baseline_images = tk_images()
+        if (i + 1) % 100 == 0:
+            print(f"update {i + 1:>5}: rss={current_rss_bytes() / 2**20:.1f} MiB {live_objects()} "
+                  f"tk images={tk_images()}")
+
+    growth_mb = (current_rss_bytes() - (baseline_rss or current_rss_bytes())) / 2**20
+    final = live_objects()
+    baseline = baseline or final
+    images = tk_images()
+    view.close()
+    if root is not None:
+        root.destroy()
+
+    failures = []
+    if growth_mb > args.max_growth_mb:
+        failures.append(f"RSS grew {growth_mb:.1f} MiB (limit {args.max_growth_mb:.1f})")
+    for name, count in final.items():
+        if count > baseline[name]:
+            failures.append(f"live {name}: {baseline[name]} after warm-up, {count} at the end")
+    if images > baseline_images:
+        failures.append(f"Tk images: {baseline_images} after warm-up, {images} at the end")
+
+    print(f"RSS growth after warm-up: {growth_mb:.1f} MiB; live objects {baseline} -> {final}; "
+          f"Tk images {baseline_images} -> {images}")
+    if failures:
+        print("FAIL")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
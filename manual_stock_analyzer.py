@@ -11,169 +11,30 @@ Automated Stock and Crypto Technical Analyzer
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-import time
-from functools import lru_cache
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Optional, Any
 from concurrent.futures import ThreadPoolExecutor
 
 # Core data libraries
 import pandas as pd
 import numpy as np
 
-# Try to import heavy libraries with fallback
-try:
-    import yfinance as yf
-    YFINANCE_AVAILABLE = True
-except ImportError:
-    print("Warning: yfinance not available. Please install with: pip install yfinance")
-    YFINANCE_AVAILABLE = False
+# Data loading, caching and indicators shared with the full analyzer
+from analysis_core import (
+    LazyModule, module_available, preload_modules, yf, YFINANCE_AVAILABLE, OHLCV_COLUMNS,
+    get_yahoo_client, get_chart_history, calculate_indicators, get_base_price, metrics, StockDataError,
+)
 
-try:
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    from matplotlib.lines import Line2D
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
+# Plotting libraries are imported on first use so the window can appear first
+MATPLOTLIB_AVAILABLE = module_available("matplotlib")
+if not MATPLOTLIB_AVAILABLE:
     print("Warning: matplotlib not available. Please install with: pip install matplotlib")
-    MATPLOTLIB_AVAILABLE = False
+mpl_tkagg = LazyModule("matplotlib.backends.backend_tkagg")
+mpl_lines = LazyModule("matplotlib.lines")
 
-try:
-    import mplfinance as mpf
-    MPLFINANCE_AVAILABLE = True
-except ImportError:
+MPLFINANCE_AVAILABLE = module_available("mplfinance")
+if not MPLFINANCE_AVAILABLE:
     print("Warning: mplfinance not available. Please install with: pip install mplfinance")
-    MPLFINANCE_AVAILABLE = False
-
-# -----------------------------------------------------------------------------
-# DATA CACHING AND PERFORMANCE
-# -----------------------------------------------------------------------------
-
-class DataCache:
-    """Simple cache for stock data to improve performance."""
-    
-    def __init__(self, max_size: int = 32, ttl_seconds: int = 300):
-        self.cache: Dict[str, Tuple[pd.DataFrame, float]] = {}
-        self.max_size = max_size
-        self.ttl_seconds = ttl_seconds
-    
-    def _is_expired(self, timestamp: float) -> bool:
-        """Check if cached data is expired."""
-        return time.time() - timestamp > self.ttl_seconds
-    
-    def get(self, symbol: str, period: str) -> Optional[pd.DataFrame]:
-        """Get cached data if available and not expired."""
-        key = f"{symbol.upper()}_{period}"
-        if key in self.cache:
-            data, timestamp = self.cache[key]
-            if not self._is_expired(timestamp):
-                return data.copy()
-            else:
-                del self.cache[key]
-        return None
-    
-    def set(self, symbol: str, period: str, data: pd.DataFrame) -> None:
-        """Cache the data."""
-        key = f"{symbol.upper()}_{period}"
-        
-        # Simple LRU: remove oldest if cache is full
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(self.cache.keys(), 
-                           key=lambda k: self.cache[k][1])
-            del self.cache[oldest_key]
-        
-        self.cache[key] = (data.copy(), time.time())
-
-# Global cache instance
-_data_cache = DataCache()
-
-# -----------------------------------------------------------------------------
-# TECHNICAL INDICATORS
-# -----------------------------------------------------------------------------
-
-def calculate_indicators(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Compute Support/Resistance (20d) and RSI.
-    
-    Args:
-        df: DataFrame with OHLCV data
-        
-    Returns:
-        DataFrame with additional indicator columns
-    """
-    if df.empty:
-        return df
-        
-    df = df.copy()
-    
-    # Support/Resistance calculation
-    df["Support"] = df["Low"].rolling(window=20, min_periods=1).min()
-    df["Resistance"] = df["High"].rolling(window=20, min_periods=1).max()
-
-    # RSI Calculation with proper error handling
-    try:
-        delta = df["Close"].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14, min_periods=1).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=1).mean()
-        
-        # Avoid division by zero
-        rs = gain / (loss + 1e-10)
-        df["RSI"] = 100 - (100 / (1 + rs))
-    except Exception:
-        # Fallback to NaN if calculation fails
-        df["RSI"] = np.nan
-    
-    return df
-
-def get_base_price(df: pd.DataFrame) -> float:
-    """
-    Calculate base price using support levels and RSI oversold conditions.
-    
-    Args:
-        df: DataFrame with indicator data
-        
-    Returns:
-        Calculated base price or NaN if calculation fails
-    """
-    if df.empty or len(df) < 20:
-        return np.nan
-
-    try:
-        recent = df.tail(20)
-        
-        # Get support levels
-        avg_support = recent["Support"].mean() if "Support" in recent else np.nan
-        min_low = recent["Low"].min()
-        
-        # RSI-based entry point
-        rsi_buy = np.nan
-        if "RSI" in recent:
-            oversold = recent[recent["RSI"] < 30]
-            if not oversold.empty:
-                rsi_buy = oversold["Close"].min()
-
-        # Combine all possibilities
-        possibilities = [p for p in [avg_support, min_low, rsi_buy] 
-                        if not np.isnan(p)]
-        
-        if not possibilities:
-            return np.nan
-            
-        return round(float(np.mean(possibilities)), 2)
-        
-    except Exception:
-        return np.nan
-
-# -----------------------------------------------------------------------------
-# CUSTOM EXCEPTIONS
-# -----------------------------------------------------------------------------
-
-class StockDataError(Exception):
-    """Custom exception for stock data related errors."""
-    pass
-
-class ValidationError(Exception):
-    """Custom exception for input validation errors."""
-    pass
+mpf = LazyModule("mplfinance")
 
 # -----------------------------------------------------------------------------
 # MAIN APPLICATION CLASS
@@ -331,13 +192,13 @@ class StockAnalyzerApp:
             return False
         return bool(re.match(self.symbol_pattern, symbol))
     
-    def display_stock_info(self, ticker: str, stock_info: Any) -> None:
+    def display_stock_info(self, ticker: str, stock_info: Dict[str, Any]) -> None:
         """
         Display basic stock/crypto information.
         
         Args:
             ticker: Stock/crypto symbol
-            stock_info: yfinance Ticker object
+            stock_info: Company info dict from YahooClient.info()
         """
         # Clear existing info
         for widget in self.info_frame.winfo_children():
@@ -346,8 +207,8 @@ class StockAnalyzerApp:
         info_text = f"Symbol: {ticker.upper()}\n"
         
         try:
-            if hasattr(stock_info, 'info') and stock_info.info:
-                info = stock_info.info
+            if stock_info:
+                info = stock_info
                 info_text += f"Name: {info.get('longName', info.get('shortName', 'N/A'))}\n"
                 
                 # Only show relevant info based on asset type
@@ -409,26 +270,30 @@ class StockAnalyzerApp:
             if not YFINANCE_AVAILABLE:
                 raise ImportError("yfinance is not available. Please install it with: pip install yfinance")
             
-            # Validate symbol by trying to get stock info
-            stock = yf.Ticker(symbol)
-            
-            # Test if we can get price data (with timeout)
-            test_data = stock.history(period="5d")
+            # Validate the symbol through the shared, rate-limited Yahoo client
+            yh = get_yahoo_client(symbol)
+            test_data = yh.history(period="5d")
             if test_data.empty:
                 raise StockDataError(f"No price data found for symbol: {symbol}")
             
+            # Load company info here, off the Tk thread
+            try:
+                stock_info = yh.info()
+            except Exception:
+                stock_info = {}
+            
             # Update UI in main thread
-            self.root.after(0, self._on_analysis_success, symbol, stock)
+            self.root.after(0, self._on_analysis_success, symbol, stock_info)
             
         except StockDataError as e:
             self.root.after(0, self._on_analysis_error, str(e))
         except Exception as e:
             self.root.after(0, self._on_analysis_error, f"Error analyzing {symbol}: {str(e)}")
     
-    def _on_analysis_success(self, symbol: str, stock: Any) -> None:
+    def _on_analysis_success(self, symbol: str, stock_info: Dict[str, Any]) -> None:
         """Handle successful analysis."""
         self.current_symbol = symbol
-        self.display_stock_info(symbol, stock)
+        self.display_stock_info(symbol, stock_info)
         self.update_chart()
         self.analyze_button.config(state="normal", text="Analyze")
     
@@ -455,27 +320,18 @@ class StockAnalyzerApp:
             # Get timeframe
             period = self.timeframe_map[self.timeframe_var.get()]
             
-            # Check cache first
-            df = _data_cache.get(self.current_symbol, period)
+            # Check if yfinance is available
+            if not YFINANCE_AVAILABLE:
+                raise ImportError("yfinance is not available. Please install it with: pip install yfinance")
+            
+            # Shared cache and history store (no download on timeframe switch)
+            df = get_chart_history(self.current_symbol, period)
             
-            if df is None:
-                # Check if yfinance is available
-                if not YFINANCE_AVAILABLE:
-                    raise ImportError("yfinance is not available. Please install it with: pip install yfinance")
-                
-                # Fetch data
-                stock = yf.Ticker(self.current_symbol)
-                df = stock.history(period=period)
-                
-                if df.empty:
-                    raise StockDataError(f"No data for {self.current_symbol} in '{period}' timeframe.")
-                
-                # Cache the data
-                _data_cache.set(self.current_symbol, period, df)
+            if df.empty:
+                raise StockDataError(f"No data for {self.current_symbol} in '{period}' timeframe.")
             
-            # Prepare data
-            df = df[["Open", "High", "Low", "Close", "Volume"]].copy()
-            df.index.name = "Date"
+            # Prepare data (column selection and renaming share the cached buffers)
+            df = df[OHLCV_COLUMNS].rename_axis("Date")
             
             # Calculate indicators
             df_ind = calculate_indicators(df)
@@ -526,18 +382,19 @@ class StockAnalyzerApp:
             mav_colors = [self.ma_color_map[ma] for ma in mav_list]
             
             # Create the plot
-            fig, axlist = mpf.plot(
-                df_ind,
-                type="candle",
-                mav=mav_list if mav_list else None,
-                mavcolors=mav_colors if mav_list else None,
-                addplot=addplots or [],
-                volume=True,
-                style="charles",
-                returnfig=True,
-                figsize=(12, 8),
-                tight_layout=True
-            )
+            with metrics.span("mpf_plot"):
+                fig, axlist = mpf.plot(
+                    df_ind,
+                    type="candle",
+                    mav=mav_list if mav_list else None,
+                    mavcolors=mav_colors if mav_list else None,
+                    addplot=addplots or [],
+                    volume=True,
+                    style="charles",
+                    returnfig=True,
+                    figsize=(12, 8),
+                    tight_layout=True
+                )
             
             # Add legend
             main_ax = axlist[0]
@@ -547,28 +404,28 @@ class StockAnalyzerApp:
             # Add MA legends
             for ma in mav_list:
                 color = self.ma_color_map[ma]
-                legend_handles.append(Line2D([], [], color=color, linewidth=2, label=f"{ma}-day MA"))
+                legend_handles.append(mpl_lines.Line2D([], [], color=color, linewidth=2, label=f"{ma}-day MA"))
                 legend_labels.append(f"{ma}-day MA")
                 
             # Add indicator legends
             if "Support" in df_ind and df_ind["Support"].notna().any():
                 sup_label = f"Support (20d): ${last_support:.2f}" if not np.isnan(last_support) else "Support (20d)"
-                legend_handles.append(Line2D([], [], color="green", linestyle="--", linewidth=1.5, label=sup_label))
+                legend_handles.append(mpl_lines.Line2D([], [], color="green", linestyle="--", linewidth=1.5, label=sup_label))
                 legend_labels.append(sup_label)
                 
             if "Resistance" in df_ind and df_ind["Resistance"].notna().any():
                 res_label = f"Resistance (20d): ${last_resistance:.2f}" if not np.isnan(last_resistance) else "Resistance (20d)"
-                legend_handles.append(Line2D([], [], color="red", linestyle="--", linewidth=1.5, label=res_label))
+                legend_handles.append(mpl_lines.Line2D([], [], color="red", linestyle="--", linewidth=1.5, label=res_label))
                 legend_labels.append(res_label)
                 
             if not np.isnan(base_price):
                 bp_label = f"Base Price: ${base_price:.2f}"
-                legend_handles.append(Line2D([], [], color="orange", linestyle="--", linewidth=1.5, label=bp_label))
+                legend_handles.append(mpl_lines.Line2D([], [], color="orange", linestyle="--", linewidth=1.5, label=bp_label))
                 legend_labels.append(bp_label)
                 
             if below_5p:
                 b5_label = f"5% Below Base: ${below_5p:.2f}"
-                legend_handles.append(Line2D([], [], color="purple", linestyle="--", linewidth=1.5, label=b5_label))
+                legend_handles.append(mpl_lines.Line2D([], [], color="purple", linestyle="--", linewidth=1.5, label=b5_label))
                 legend_labels.append(b5_label)
                 
             # Add RSI info to title
@@ -582,8 +439,9 @@ class StockAnalyzerApp:
                 main_ax.legend(legend_handles, legend_labels, loc="upper left", fontsize=9, framealpha=0.9)
                 
             # Display chart
-            self.canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-            self.canvas.draw()
+            self.canvas = mpl_tkagg.FigureCanvasTkAgg(fig, master=self.chart_frame)
+            with metrics.span("canvas_draw"):
+                self.canvas.draw()
             self.canvas.get_tk_widget().pack(fill="both", expand=True)
             
             # Show analysis summary
@@ -662,6 +520,10 @@ def main() -> None:
         # Set focus to symbol entry
         app.symbol_entry.focus()
         
+        # Import the charting and data libraries once the window is up
+        root.after(100, lambda: threading.Thread(target=preload_modules, args=([mpl_lines, mpl_tkagg, mpf, yf],),
+                                                 name="import-warmup", daemon=True).start())
+        
         # Handle window closing
         def on_closing():
             app.cleanup()
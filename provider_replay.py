@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Record-and-replay stand-in for Yahoo Finance and StockTwits
+- Recording mode wraps the real yfinance module and the StockTwits HTTP
+  session and saves every response to a local fixture directory
+- Replay mode serves those fixtures offline through the same call sites
+  (YahooClient, yf.download, HttpClient.get), so limiters, retries,
+  single-flight and caches behave exactly as they do live
+- Replay can inject latency (with seeded jitter) and a rate of 429 responses
+  so end-to-end timings such as analyze_symbol are reproducible
+
+Fixture layout:
+    <dir>/yahoo/<SYMBOL>/<method>-<hash>.pkl      one yfinance call each
+    <dir>/yahoo/_download/download-<hash>.pkl     yf.download calls
+    <dir>/http/<host>/<hash>.json                 one HTTP GET each
+
+Yahoo fixtures are pickles; only replay directories you recorded yourself.
+
+Usage:
+    with recording("fixtures/"):
+        analyze_symbol("AAPL")
+    with replay("fixtures/", ReplayFaults(latency_ms=80, rate_429=0.05)):
+        analyze_symbol("AAPL")
+
+    # Or run an app offline:
+    STOCK_ANALYZER_REPLAY=fixtures/ python SC_Automated_Analysis.py
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import analysis_core as core
+
+# -----------------------------------------------------------------------------
+# CONFIGURATION
+# -----------------------------------------------------------------------------
+
+RECORD_ENV = "STOCK_ANALYZER_RECORD"      # fixture directory to record into
+REPLAY_ENV = "STOCK_ANALYZER_REPLAY"      # fixture directory to replay from
+RATE_LIMIT_MESSAGE = "Too Many Requests. Rate limited. Try after a while."  # as raised by yfinance
+
+# Stand-in for yfinance's option_chain() result, which does not pickle portably
+OptionChain = namedtuple("OptionChain", ["calls", "puts", "underlying"])
+
+class FixtureMissing(LookupError):
+    """Replay was asked for a call that was never recorded."""
+
+class ReplayedError(Exception):
+    """An upstream failure that was recorded and is raised again on replay."""
+
+class ReplayRateLimitError(Exception):
+    """Injected Yahoo 429 (same message as yfinance's rate-limit error)."""
+
+@dataclass
+class ReplayFaults:
+    """
+    Faults injected into every replayed call.
+
+    Attributes:
+        latency_ms: Fixed delay added to each call
+        jitter_ms: Extra uniform random delay of up to this much
+        rate_429: Probability that a call is answered with HTTP 429 instead
+        retry_after: Retry-After header value sent with injected HTTP 429s
+        seed: Seed for the jitter and 429 draws, so runs repeat exactly
+    """
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    rate_429: float = 0.0
+    retry_after: Optional[float] = 0.1
+    seed: int = 0
+
+# -----------------------------------------------------------------------------
+# FIXTURE STORE
+# -----------------------------------------------------------------------------
+
+def _safe_name(text: str) -> str:
+    """Make a symbol or host usable as a directory name."""
+    return re.sub(r"[^A-Za-z0-9.\-]", "_", text) or "_"
+
+def call_key(method: str, args: Tuple[Any, ...] = (), kwargs: Optional[Dict[str, Any]] = None) -> str:
+    """Stable file stem for a call; arguments must be passed the same way when recording and replaying."""
+    signature = repr((method, tuple(args), sorted((kwargs or {}).items())))
+    return f"{method}-{hashlib.sha1(signature.encode('utf-8')).hexdigest()[:12]}"
+
+class FixtureStore:
+    """Reads and writes recorded responses under one fixture directory."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+
+    def _yahoo_path(self, symbol: str, key: str) -> str:
+        return os.path.join(self.root_dir, "yahoo", _safe_name(symbol.upper()), key + ".pkl")
+
+    def _http_path(self, url: str, params: Any) -> str:
+        host = urlparse(url).hostname or "unknown"
+        return os.path.join(self.root_dir, "http", _safe_name(host), call_key("get", (url,), {"params": params}) + ".json")
+
+    def _write(self, path: str, write: Callable[[Any], None], mode: str) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, mode) as fh:
+                write(fh)
+            os.replace(tmp_path, path)
+
+    def save_yahoo(self, symbol: str, method: str, args: Tuple[Any, ...], kwargs: Dict[str, Any],
+                   value: Any = None, error: Optional[BaseException] = None) -> None:
+        """Record a yfinance result (or the error it raised)."""
+        path = self._yahoo_path(symbol, call_key(method, args, kwargs))
+        # A failed attempt must not overwrite a successful retry of the same call
+        if error is not None and os.path.exists(path):
+            return
+        payload = {"call": f"{symbol}.{method}{args!r} {kwargs!r}", "value": value}
+        if error is not None:
+            payload["error"] = f"{type(error).__name__}: {error}"
+        self._write(path, lambda fh: pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL), "wb")
+
+    def load_yahoo(self, symbol: str, method: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        """Return a recorded yfinance result, re-raising a recorded error."""
+        path = self._yahoo_path(symbol, call_key(method, args, kwargs))
+        try:
+            with open(path, "rb") as fh:
+                payload = pickle.load(fh)
+        except FileNotFoundError:
+            raise FixtureMissing(f"No recording for {symbol}.{method}{args!r} {kwargs!r} ({path})") from None
+        if "error" in payload:
+            raise ReplayedError(payload["error"])
+        return payload["value"]
+
+    def save_http(self, url: str, params: Any, status: int, headers: Dict[str, str], body: str) -> None:
+        """Record an HTTP GET response."""
+        payload = {"url": url, "params": params, "status": status, "headers": headers, "body": body}
+        self._write(self._http_path(url, params),
+                    lambda fh: json.dump(payload, fh, ensure_ascii=False), "w")
+
+    def load_http(self, url: str, params: Any) -> Dict[str, Any]:
+        """Return a recorded HTTP GET response as a dict."""
+        path = self._http_path(url, params)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            raise FixtureMissing(f"No recording for GET {url} params={params!r} ({path})") from None
+
+# -----------------------------------------------------------------------------
+# FAULT INJECTION
+# -----------------------------------------------------------------------------
+
+class FaultInjector:
+    """Applies ReplayFaults to each call and counts what was served."""
+
+    def __init__(self, faults: ReplayFaults):
+        self.faults = faults
+        self._rng = random.Random(faults.seed)
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "rate_limited": 0, "missing": 0}
+
+    def before_call(self) -> bool:
+        """Sleep the injected latency; return True when this call should get a 429."""
+        with self._lock:
+            self.counts["calls"] += 1
+            delay = self.faults.latency_ms + self._rng.random() * self.faults.jitter_ms
+            limited = self._rng.random() < self.faults.rate_429
+            if limited:
+                self.counts["rate_limited"] += 1
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        return limited
+
+    def missing(self) -> None:
+        with self._lock:
+            self.counts["missing"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+# -----------------------------------------------------------------------------
+# YFINANCE SHIMS
+# -----------------------------------------------------------------------------
+
+class _ShimTicker:
+    """
+    The subset of yf.Ticker that YahooClient uses.
+
+    Subclasses decide whether _call goes to the network (recording) or to
+    the fixture directory (replay).
+    """
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker.upper()
+
+    def _call(self, method: str, args: Tuple[Any, ...], kwargs: Dict[str, Any],
+              fetch: Callable[[Any], Any]) -> Any:
+        raise NotImplementedError
+
+    @property
+    def fast_info(self) -> Dict[str, Any]:
+        return self._call("fast_info", (), {}, lambda real: dict(real.fast_info or {}))
+
+    def get_info(self) -> Dict[str, Any]:
+        return self._call("get_info", (), {}, lambda real: dict(real.get_info() or {}))
+
+    def history(self, *args, **kwargs):
+        return self._call("history", args, kwargs, lambda real: real.history(*args, **kwargs))
+
+    @property
+    def quarterly_financials(self):
+        return self._call("quarterly_financials", (), {}, lambda real: real.quarterly_financials)
+
+    @property
+    def options(self):
+        return self._call("options", (), {}, lambda real: tuple(real.options or ()))
+
+    def option_chain(self, *args, **kwargs) -> OptionChain:
+        def fetch(real):
+            chain = real.option_chain(*args, **kwargs)
+            return OptionChain(chain.calls, chain.puts, getattr(chain, "underlying", None))
+        return self._call("option_chain", args, kwargs, fetch)
+
+    @property
+    def calendar(self):
+        return self._call("calendar", (), {}, lambda real: real.calendar)
+
+    def get_earnings_dates(self, *args, **kwargs):
+        return self._call("get_earnings_dates", args, kwargs, lambda real: real.get_earnings_dates(*args, **kwargs))
+
+class RecordingTicker(_ShimTicker):
+    """yf.Ticker wrapper that saves every result (and error) it sees."""
+
+    def __init__(self, ticker: str, store: FixtureStore, real_yf: Any):
+        super().__init__(ticker)
+        self._store = store
+        self._real = real_yf.Ticker(ticker)
+
+    def _call(self, method, args, kwargs, fetch):
+        try:
+            value = fetch(self._real)
+        except Exception as e:
+            self._store.save_yahoo(self.ticker, method, args, kwargs, error=e)
+            raise
+        self._store.save_yahoo(self.ticker, method, args, kwargs, value=value)
+        return value
+
+class ReplayTicker(_ShimTicker):
+    """yf.Ticker stand-in that serves recorded results with injected faults."""
+
+    def __init__(self, ticker: str, store: FixtureStore, injector: FaultInjector):
+        super().__init__(ticker)
+        self._store = store
+        self._injector = injector
+
+    def _call(self, method, args, kwargs, fetch):
+        if self._injector.before_call():
+            raise ReplayRateLimitError(RATE_LIMIT_MESSAGE)
+        try:
+            return self._store.load_yahoo(self.ticker, method, args, kwargs)
+        except FixtureMissing:
+            self._injector.missing()
+            raise
+
+class YFinanceShim:
+    """
+    Module-like object installed in place of analysis_core.yf.
+
+    Provides Ticker and download; when recording, any other attribute is
+    taken from the real yfinance module.
+    """
+
+    def __init__(self, ticker_factory: Callable[[str], _ShimTicker],
+                 download: Callable[..., Any], real_yf: Any = None):
+        self.Ticker = ticker_factory
+        self.download = download
+        self._real = real_yf
+
+    def __getattr__(self, attr: str) -> Any:
+        if self._real is None:
+            raise AttributeError(f"yfinance.{attr} is not available in replay mode")
+        return getattr(self._real, attr)
+
+def _download_args(tickers: Any) -> Tuple[str, ...]:
+    """Normalize the tickers argument of yf.download for the fixture key."""
+    if isinstance(tickers, str):
+        tickers = tickers.replace(",", " ").split()
+    return tuple(str(t).upper() for t in tickers)
+
+# -----------------------------------------------------------------------------
+# HTTP SESSION SHIMS
+# -----------------------------------------------------------------------------
+
+class RecordingSession:
+    """Wraps HttpClient's session and saves every GET response."""
+
+    def __init__(self, session: Any, store: FixtureStore):
+        self._session = session
+        self._store = store
+        self.headers = session.headers
+
+    def get(self, url: str, params: Any = None, **kwargs) -> "core.requests.Response":
+        resp = self._session.get(url, params=params, **kwargs)
+        self._store.save_http(url, params, resp.status_code, dict(resp.headers), resp.text)
+        return resp
+
+class ReplaySession:
+    """Stand-in for HttpClient's session that answers GETs from fixtures."""
+
+    def __init__(self, store: FixtureStore, injector: FaultInjector, headers: Optional[Dict[str, str]] = None):
+        self._store = store
+        self._injector = injector
+        self.headers = dict(headers or {})
+
+    @staticmethod
+    def _response(url: str, status: int, headers: Dict[str, str], body: str) -> "core.requests.Response":
+        resp = core.requests.Response()
+        resp.url = url
+        resp.status_code = status
+        resp.headers.update(headers)
+        resp._content = body.encode("utf-8")
+        resp.encoding = "utf-8"
+        return resp
+
+    def get(self, url: str, params: Any = None, **kwargs) -> "core.requests.Response":
+        if self._injector.before_call():
+            retry_after = self._injector.faults.retry_after
+            headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+            return self._response(url, 429, headers, "")
+        try:
+            recorded = self._store.load_http(url, params)
+        except FixtureMissing:
+            self._injector.missing()
+            raise
+        # Content-Encoding/Length describe the original wire bytes, not the stored text
+        headers = {k: v for k, v in recorded["headers"].items()
+                   if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")}
+        return self._response(url, recorded["status"], headers, recorded["body"])
+
+# -----------------------------------------------------------------------------
+# INSTALLATION
+# -----------------------------------------------------------------------------
+
+class ProviderShim:
+    """
+    Handle for an installed recording or replay shim.
+
+    Installing swaps analysis_core.yf and the shared HttpClient's session and
+    clears the YahooClient registry, so every later Yahoo or StockTwits call
+    goes through the shim. The history store, DataCache and NegativeCache are
+    swapped for empty ones (the store in a temp dir), so a run never reads or
+    writes ~/.stock_analyzer and records the same calls every time.
+    uninstall() restores the originals.
+    """
+
+    def __init__(self, mode: str, fixture_dir: str, faults: Optional[ReplayFaults] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown provider shim mode: {mode}")
+        self.mode = mode
+        self.store = FixtureStore(fixture_dir)
+        self.injector = FaultInjector(faults or ReplayFaults())
+        self._saved: Dict[str, Any] = {}
+
+    def install(self) -> "ProviderShim":
+        if self._saved:
+            return self
+        self._saved["yf"] = core.yf
+        if self.mode == "record":
+            real_yf = core.yf._load() if isinstance(core.yf, core.LazyModule) else core.yf
+
+            def download(tickers, *args, **kwargs):
+                symbols = _download_args(tickers)
+                try:
+                    value = real_yf.download(list(symbols), *args, **kwargs)
+                except Exception as e:
+                    self.store.save_yahoo("_download", "download", (symbols,) + args, kwargs, error=e)
+                    raise
+                self.store.save_yahoo("_download", "download", (symbols,) + args, kwargs, value=value)
+                return value
+
+            core.yf = YFinanceShim(lambda t: RecordingTicker(t, self.store, real_yf), download, real_yf)
+        else:
+            def download(tickers, *args, **kwargs):
+                if self.injector.before_call():
+                    raise ReplayRateLimitError(RATE_LIMIT_MESSAGE)
+                return self.store.load_yahoo("_download", "download", (_download_args(tickers),) + args, kwargs)
+
+            core.yf = YFinanceShim(lambda t: ReplayTicker(t, self.store, self.injector), download)
+
+        client = core.get_http_client()
+        if client is not None:
+            self._saved["session"] = client.session
+            if self.mode == "record":
+                client.session = RecordingSession(client.session, self.store)
+            else:
+                client.session = ReplaySession(self.store, self.injector, client.session.headers)
+
+        self._saved["caches"] = (core._history_store, core._data_cache, core._negative_cache)
+        self._saved["history_dir"] = tempfile.mkdtemp(prefix="provider-shim-")
+        core._history_store = core.HistoryStore(self._saved["history_dir"])
+        core._data_cache = core.DataCache()
+        core._negative_cache = core.NegativeCache()
+
+        # Clients created earlier hold real yf.Ticker objects and cached responses
+        core._yahoo_clients.clear()
+        return self
+
+    def uninstall(self) -> None:
+        if not self._saved:
+            return
+        core.yf = self._saved.pop("yf")
+        if "session" in self._saved:
+            core.get_http_client().session = self._saved.pop("session")
+        core._history_store, core._data_cache, core._negative_cache = self._saved.pop("caches")
+        shutil.rmtree(self._saved.pop("history_dir"), ignore_errors=True)
+        core._yahoo_clients.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Replayed calls, injected 429s and fixture misses so far."""
+        return self.injector.stats()
+
+@contextmanager
+def recording(fixture_dir: str):
+    """Record every Yahoo and StockTwits response made inside the block."""
+    shim = ProviderShim("record", fixture_dir).install()
+    try:
+        yield shim
+    finally:
+        shim.uninstall()
+
+@contextmanager
+def replay(fixture_dir: str, faults: Optional[ReplayFaults] = None):
+    """Serve every Yahoo and StockTwits call inside the block from fixtures."""
+    shim = ProviderShim("replay", fixture_dir, faults).install()
+    try:
+        yield shim
+    finally:
+        shim.uninstall()
+
+def install_from_env() -> Optional[ProviderShim]:
+    """
+    Install a shim when STOCK_ANALYZER_RECORD or STOCK_ANALYZER_REPLAY is set.
+
+    Replay faults can be set with STOCK_ANALYZER_REPLAY_LATENCY_MS,
+    STOCK_ANALYZER_REPLAY_JITTER_MS, STOCK_ANALYZER_REPLAY_429_RATE and
+    STOCK_ANALYZER_REPLAY_SEED.
+    """
+    if os.environ.get(REPLAY_ENV):
+        env = os.environ.get
+        faults = ReplayFaults(
+            latency_ms=float(env("STOCK_ANALYZER_REPLAY_LATENCY_MS", 0)),
+            jitter_ms=float(env("STOCK_ANALYZER_REPLAY_JITTER_MS", 0)),
+            rate_429=float(env("STOCK_ANALYZER_REPLAY_429_RATE", 0)),
+            seed=int(env("STOCK_ANALYZER_REPLAY_SEED", 0)),
+        )
+        print(f"Replaying Yahoo/StockTwits responses from {os.environ[REPLAY_ENV]}")
+        return ProviderShim("replay", os.environ[REPLAY_ENV], faults).install()
+    if os.environ.get(RECORD_ENV):
+        print(f"Recording Yahoo/StockTwits responses to {os.environ[RECORD_ENV]}")
+        return ProviderShim("record", os.environ[RECORD_ENV]).install()
+    return None
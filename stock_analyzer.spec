@@ -17,12 +17,14 @@ a = Analysis(
         'yfinance',
         'matplotlib',
         'mplfinance',
+        'tenacity',  # imported lazily, invisible to the analysis
         'tkinter',
         'concurrent.futures',
         'threading',
         'functools',
         'typing',
         'matplotlib.backends.backend_tkagg',
+        'matplotlib.lines',  # imported lazily, invisible to the analysis
         'PIL',
         'PIL._tkinter_finder',
     ],
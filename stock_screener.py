@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Batch Stock Screener - headless fundamental + technical screening
+- Reads a ticker universe from a file (one symbol per line, # comments allowed)
+- Bulk-downloads 1y daily history per batch of tickers (through the history
+  store), then fetches company data, revenue growth and earnings date through
+  the shared, rate-limited Yahoo client (I/O threads)
+- Scores fundamentals and computes indicators/base price in a process pool
+- Streams one row per ticker to CSV (or Parquet) as results complete
+- Resumable: rerunning with the same output skips tickers already written
+
+Usage:
+    python stock_screener.py screen tickers.txt -o results.csv [--workers 4] [--io-workers 4]
+    python stock_screener.py screen tickers.txt -o results.parquet
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analysis_core import (
+    PARQUET_AVAILABLE, YFINANCE_AVAILABLE, PRIORITY_BACKGROUND, run_with_priority,
+    get_yahoo_client, bulk_download_history, fetch_company_data, compute_positive_quarterly_revenue_growth,
+    get_upcoming_earnings_call, fundamental_score, calculate_indicators, get_base_price,
+)
+from provider_replay import install_from_env
+
+# -----------------------------------------------------------------------------
+# SCREENER CONFIGURATION
+# -----------------------------------------------------------------------------
+
+SCREEN_HISTORY_PERIOD = "1y"    # daily bars used for the technical columns
+SCREEN_IO_WORKERS = 4           # concurrent fetches (all share the Yahoo host limiter)
+SCREEN_MAX_IN_FLIGHT = 64       # tickers fetched or scored but not yet written
+SCREEN_BULK_BATCH = 32          # tickers whose history is bulk-downloaded together
+PILLARS = ["profitability", "growth", "balance_sheet", "market_pos", "forward"]
+
+RESULT_COLUMNS = [
+    "symbol", "status", "error",
+    "fundamental_status", "fundamental_score", *[f"pillar_{name}" for name in PILLARS],
+    "current_price", "high_52", "low_52", "week_52_change", "quarterly_revenue_change",
+    "positive_growth_pct", "earnings_date",
+    "last_close", "support", "resistance", "rsi", "base_price", "below_base_5pct", "bars",
+]
+
+# -----------------------------------------------------------------------------
+# TICKER UNIVERSE
+# -----------------------------------------------------------------------------
+
+def read_tickers(path: str) -> List[str]:
+    """
+    Read ticker symbols from a text or CSV file.
+
+    Blank lines and text after "#" are ignored; several symbols may share a
+    line separated by commas or whitespace. Duplicates are dropped, keeping
+    the first occurrence.
+    """
+    seen: Set[str] = set()
+    tickers = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            for token in line.split("#", 1)[0].replace(",", " ").split():
+                symbol = token.strip().upper()
+                if symbol and symbol != "SYMBOL" and symbol not in seen:
+                    seen.add(symbol)
+                    tickers.append(symbol)
+    return tickers
+
+# -----------------------------------------------------------------------------
+# PER-TICKER WORK
+# -----------------------------------------------------------------------------
+
+def fetch_inputs(symbol: str, history: Optional[pd.DataFrame] = None
+                 ) -> Tuple[Dict[str, Any], Optional[float], Optional[str], pd.DataFrame]:
+    """
+    Fetch everything a ticker's row needs (runs on an I/O thread).
+
+    A 1y daily history from the batch's bulk download is put in the Yahoo
+    client cache first, so neither fetch_company_data nor the technical
+    columns request it again; without one it is fetched once and shared.
+    """
+    if history is not None:
+        get_yahoo_client(symbol).seed_history(history, period=SCREEN_HISTORY_PERIOD, interval="1d")
+    data = fetch_company_data(symbol)
+    growth = compute_positive_quarterly_revenue_growth(symbol)
+    earnings = get_upcoming_earnings_call(symbol)
+    history = get_yahoo_client(symbol).history(period=SCREEN_HISTORY_PERIOD, interval="1d")
+    return data, growth, earnings, history
+
+def _scalar(value: Any) -> Any:
+    """Convert NumPy scalars and NaN to plain values for the output file."""
+    if value is None:
+        return None
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+def score_symbol(symbol: str, data: Dict[str, Any], growth: Optional[float],
+                 earnings: Optional[str], history: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Score fundamentals and compute the technical columns (runs in a worker process).
+
+    Returns:
+        One result row keyed by RESULT_COLUMNS
+    """
+    score = fundamental_score(data, growth, earnings)
+    row: Dict[str, Any] = {
+        "symbol": symbol,
+        "status": "ok",
+        "fundamental_status": score["status"],
+        "fundamental_score": score["score"],
+        "positive_growth_pct": growth,
+        "earnings_date": earnings,
+    }
+    for name in PILLARS:
+        row[f"pillar_{name}"] = score["pillars"][name]["pass"]
+    for key in ("current_price", "high_52", "low_52", "week_52_change", "quarterly_revenue_change"):
+        row[key] = data.get(key)
+
+    if history is not None and not history.empty:
+        df_ind = calculate_indicators(history)
+        base_price = get_base_price(df_ind)
+        last = df_ind.iloc[-1]
+        row.update({
+            "last_close": last["Close"],
+            "support": last["Support"],
+            "resistance": last["Resistance"],
+            "rsi": last["RSI"],
+            "base_price": base_price,
+            "below_base_5pct": round(base_price * 0.95, 2) if not np.isnan(base_price) else None,
+            "bars": len(df_ind),
+        })
+    return {key: _scalar(row.get(key)) for key in RESULT_COLUMNS}
+
+def error_row(symbol: str, error: BaseException) -> Dict[str, Any]:
+    """Result row for a ticker that could not be fetched or scored."""
+    return {**{key: None for key in RESULT_COLUMNS}, "symbol": symbol, "status": "error",
+            "error": f"{type(error).__name__}: {error}"}
+
+# -----------------------------------------------------------------------------
+# RESULT OUTPUT
+# -----------------------------------------------------------------------------
+
+class ResultWriter:
+    """
+    Append-only CSV journal of result rows, flushed after every row.
+
+    CSV output is written to directly. Parquet cannot be appended to safely,
+    so rows go to a "<output>.partial.csv" journal that finish() converts
+    once every ticker is done. A rerun skips tickers whose latest row (in the
+    journal, or in a finished Parquet file) is "ok"; tickers that failed are
+    screened again and their new row supersedes the old one when finish()
+    rewrites the output with one row per ticker.
+    """
+
+    def __init__(self, output: str):
+        self.output = output
+        self.parquet = output.lower().endswith(".parquet")
+        if self.parquet and not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow is required for Parquet output. Please install it with: pip install pyarrow")
+        self.journal = f"{output}.partial.csv" if self.parquet else output
+        self._repair_tail()
+        new_file = not os.path.exists(self.journal) or os.path.getsize(self.journal) == 0
+        self._fh = open(self.journal, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._fh, fieldnames=RESULT_COLUMNS)
+        if new_file:
+            self._writer.writeheader()
+            self._fh.flush()
+
+    def _repair_tail(self) -> None:
+        """Drop a half-written last row left by an interrupted run."""
+        if not os.path.exists(self.journal):
+            return
+        with open(self.journal, "rb+") as fh:
+            data = fh.read()
+            if data and not data.endswith(b"\n"):
+                fh.truncate(data.rfind(b"\n") + 1)
+
+    def _latest_rows(self) -> Dict[str, Dict[str, str]]:
+        """Latest journal row per symbol, in order of first appearance."""
+        latest: Dict[str, Dict[str, str]] = {}
+        with open(self.journal, newline="", encoding="utf-8") as fh:
+            for row in csv.DictReader(fh):
+                if row.get("symbol"):
+                    latest[row["symbol"]] = row
+        return latest
+
+    def completed(self) -> Set[str]:
+        """Symbols screened successfully by earlier runs (failed ones are retried)."""
+        done = set()
+        if self.parquet and os.path.exists(self.output):
+            previous = pd.read_parquet(self.output, columns=["symbol", "status"])
+            done.update(previous.loc[previous["status"] == "ok", "symbol"])
+        for symbol, row in self._latest_rows().items():
+            if row.get("status") == "ok":
+                done.add(symbol)
+            else:
+                done.discard(symbol)
+        return done
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._writer.writerow(row)
+        self._fh.flush()
+
+    def finish(self) -> None:
+        """Close the journal and write the output with only the latest row per ticker."""
+        self._fh.close()
+        if self.parquet:
+            rows = pd.read_csv(self.journal)
+            if os.path.exists(self.output):
+                # Rows from an earlier finished run, superseded by any rescreened ticker
+                rows = pd.concat([pd.read_parquet(self.output), rows], ignore_index=True)
+            rows = rows.drop_duplicates(subset="symbol", keep="last")
+            rows.to_parquet(self.output, index=False)
+            os.remove(self.journal)
+            return
+
+        latest = self._latest_rows()
+        tmp_path = self.journal + ".tmp"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, fieldnames=RESULT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(latest.values())
+        os.replace(tmp_path, self.journal)
+
+    def close(self) -> None:
+        """Close the journal, leaving it in place for a later resume."""
+        self._fh.close()
+
+# -----------------------------------------------------------------------------
+# SCREEN COMMAND
+# -----------------------------------------------------------------------------
+
+def screen(tickers: Iterable[str], output: str, workers: Optional[int] = None,
+           io_workers: int = SCREEN_IO_WORKERS, max_in_flight: int = SCREEN_MAX_IN_FLIGHT) -> int:
+    """
+    Screen a ticker universe, streaming one row per ticker to output.
+
+    Histories are bulk-downloaded SCREEN_BULK_BATCH tickers at a time, then
+    each ticker's remaining fetches run on io_workers threads. All of it runs
+    at background limiter priority, so the process-wide Yahoo rate limit is
+    respected however many run at once. Scoring and indicators run on a
+    process pool. At most max_in_flight tickers are held in memory between
+    fetch and write.
+
+    Returns:
+        Number of rows written by this run
+    """
+    writer = ResultWriter(output)
+    done = writer.completed()
+    todo = [symbol for symbol in tickers if symbol not in done]
+    total = len(done) + len(todo)
+    if done:
+        print(f"Resuming: {len(done)} of {total} tickers already screened in {output}")
+
+    pending = iter(todo)
+    prefetches: Dict[Future, List[str]] = {}
+    fetches: Dict[Future, str] = {}
+    scores: Dict[Future, str] = {}
+    written = 0
+    failed = 0
+    start = time.monotonic()
+
+    io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="screen-io")
+    cpu_pool = ProcessPoolExecutor(max_workers=workers)
+
+    def in_flight() -> int:
+        return sum(len(batch) for batch in prefetches.values()) + len(fetches) + len(scores)
+
+    def refill() -> None:
+        while in_flight() < max_in_flight:
+            batch = list(itertools.islice(pending, min(SCREEN_BULK_BATCH, max_in_flight - in_flight())))
+            if not batch:
+                return
+            future = io_pool.submit(run_with_priority, PRIORITY_BACKGROUND,
+                                    bulk_download_history, batch, SCREEN_HISTORY_PERIOD)
+            prefetches[future] = batch
+
+    def start_fetches(batch: List[str], histories: Dict[str, pd.DataFrame]) -> None:
+        # Tickers the bulk download had no data for are fetched on their own
+        for symbol in batch:
+            future = io_pool.submit(run_with_priority, PRIORITY_BACKGROUND, fetch_inputs, symbol, histories.get(symbol))
+            fetches[future] = symbol
+
+    def record(row: Dict[str, Any]) -> None:
+        nonlocal written, failed
+        writer.write(row)
+        written += 1
+        failed += row["status"] == "error"
+        rate = written / max(time.monotonic() - start, 1e-9)
+        result = row["error"] if row["status"] == "error" else f"{row['fundamental_status']} {row['fundamental_score']}/5"
+        print(f"[{len(done) + written}/{total}] {row['symbol']}: {result} ({rate:.2f} tickers/s)")
+
+    try:
+        refill()
+        while prefetches or fetches or scores:
+            finished, _ = wait(list(prefetches) + list(fetches) + list(scores), return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future in prefetches:
+                    batch = prefetches.pop(future)
+                    try:
+                        histories = future.result()
+                    except Exception as e:
+                        print(f"Warning: bulk history download failed for {len(batch)} tickers: {e}")
+                        histories = {}
+                    start_fetches(batch, histories)
+                elif future in fetches:
+                    symbol = fetches.pop(future)
+                    try:
+                        inputs = future.result()
+                    except Exception as e:
+                        record(error_row(symbol, e))
+                        continue
+                    scores[cpu_pool.submit(score_symbol, symbol, *inputs)] = symbol
+                else:
+                    symbol = scores.pop(future)
+                    try:
+                        row = future.result()
+                    except Exception as e:
+                        row = error_row(symbol, e)
+                    record(row)
+            refill()
+    except KeyboardInterrupt:
+        for future in list(prefetches) + list(fetches) + list(scores):
+            future.cancel()
+        writer.close()
+        print(f"\nInterrupted after {written} tickers; rerun the same command to resume.")
+        raise
+    finally:
+        io_pool.shutdown(wait=False, cancel_futures=True)
+        cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+    writer.finish()
+    elapsed = time.monotonic() - start
+    print(f"Screened {written} tickers in {elapsed:.1f}s ({failed} errors); results in {output}")
+    return written
+
+# -----------------------------------------------------------------------------
+# MAIN
+# -----------------------------------------------------------------------------
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Headless stock screener")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    screen_cmd = commands.add_parser("screen", help="screen a ticker universe from a file")
+    screen_cmd.add_argument("tickers", help="file with one ticker per line (or comma separated)")
+    screen_cmd.add_argument("-o", "--output", required=True, help="results file (.csv or .parquet)")
+    screen_cmd.add_argument("--workers", type=int, default=None, help="scoring processes (default: CPU count)")
+    screen_cmd.add_argument("--io-workers", type=int, default=SCREEN_IO_WORKERS,
+                            help="concurrent fetches, all under the shared Yahoo rate limit")
+    args = parser.parse_args(argv)
+
+    if not YFINANCE_AVAILABLE:
+        print("yfinance is required but not installed. Please install it with: pip install yfinance")
+        return 1
+
+    install_from_env()
+    tickers = read_tickers(args.tickers)
+    if not tickers:
+        print(f"No tickers found in {args.tickers}")
+        return 1
+    try:
+        screen(tickers, args.output, workers=args.workers, io_workers=args.io_workers)
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())